@@ -0,0 +1,133 @@
+"""
+Append-only manifest of published blog posts.
+
+Each published post adds one JSON line (slug, title, description, pubDate,
+author, tags, hash) to a manifest inside the Astro project. The blog builds its
+listing and tag pages from this file instead of loading and sorting every
+post. Lines are appended in publish order, so the newest post is last. A
+refreshed post appends its slug again: the last line's fields win, but the
+post keeps the position of its first line, so refreshing an old post does
+not move it to the top of the listing.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Union
+
+from .file_utils import atomic_write_text, file_lock
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FIELDS = ("slug", "title", "description", "pubDate", "author", "tags", "hash")
+
+_FRONTMATTER = re.compile(r"\A---\s*\n(.*?)\n---\s*\n", re.DOTALL)
+
+
+class BlogManifest:
+    """Incremental index of the posts in the Astro blog"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        # Shared by the API and worker processes publishing into the same blog
+        self._lock_path = self.path.with_name(f".{self.path.name}.lock")
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        """Record a published post (O(1): one appended line)"""
+        record = {field: entry.get(field) for field in MANIFEST_FIELDS}
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock, file_lock(self._lock_path):
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def load(self) -> List[Dict[str, Any]]:
+        """All posts, newest first, one entry per slug"""
+        if not self.path.exists():
+            return []
+
+        entries: Dict[str, Dict[str, Any]] = {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line from a crash mid-append
+                    continue
+                # A later line updates the entry without moving it (dicts keep insertion order)
+                entries[entry["slug"]] = entry
+        return list(reversed(entries.values()))
+
+    def compact(self) -> int:
+        """Rewrite the manifest without superseded lines; returns the number of posts"""
+        with self._lock, file_lock(self._lock_path):
+            entries = list(reversed(self.load()))
+            atomic_write_text(
+                self.path,
+                "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+            )
+        return len(entries)
+
+    def rebuild(self, blog_dir: Union[str, Path]) -> int:
+        """
+        Recreate the manifest from the markdown files in the blog directory
+
+        Used once for posts published before the manifest existed.
+
+        Returns:
+            Number of posts indexed
+        """
+        entries = []
+        for post_path in Path(blog_dir).glob("*.md"):
+            frontmatter = parse_frontmatter(post_path.read_text(encoding="utf-8"))
+            if not frontmatter.get("title") or not frontmatter.get("pubDate"):
+                logger.warning(f"Manifest: skipping {post_path.name}, missing title or pubDate")
+                continue
+            entries.append({
+                "slug": post_path.stem,
+                "title": frontmatter["title"],
+                "description": frontmatter.get("description"),
+                "pubDate": frontmatter["pubDate"],
+                "author": frontmatter.get("author"),
+                "tags": frontmatter.get("tags") or [],
+                "hash": None
+            })
+
+        # Oldest first, matching append order
+        entries.sort(key=lambda entry: entry["pubDate"])
+        with self._lock, file_lock(self._lock_path):
+            atomic_write_text(
+                self.path,
+                "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+            )
+        logger.info(f"Manifest: rebuilt {self.path} with {len(entries)} posts")
+        return len(entries)
+
+
+def parse_frontmatter(markdown: str) -> Dict[str, Any]:
+    """
+    Read the flat frontmatter the publisher writes (quoted strings and
+    JSON-style tag arrays)
+    """
+    match = _FRONTMATTER.match(markdown)
+    if not match:
+        return {}
+
+    fields: Dict[str, Any] = {}
+    for line in match.group(1).splitlines():
+        key, sep, value = line.partition(":")
+        if not sep:
+            continue
+        value = value.strip()
+        try:
+            fields[key.strip()] = json.loads(value)
+        except json.JSONDecodeError:
+            fields[key.strip()] = value.strip("'\"")
+    return fields
+
@@ -0,0 +1,106 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+# How often blocking waits (queue slots, subprocesses) re-check for cancellation
+POLL_SECONDS = 0.25
+
+
+class JobAborted(Exception):
+    """A job stopped before completion because it was cancelled or ran out of time"""
+
+
+class JobCancelled(JobAborted):
+    """The job was cancelled by a client"""
+
+
+class DeadlineExceeded(JobAborted):
+    """The job's deadline passed"""
+
+
+class CancelToken:
+    """Cancellation flag and optional deadline shared by every stage of one job"""
+
+    def __init__(self, timeout: Optional[float] = None):
+        """
+        Args:
+            timeout: Seconds from now until the deadline, or None for no deadline
+        """
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        """Request cancellation; running stages stop at their next check"""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    @property
+    def aborted(self) -> bool:
+        return self.cancelled or self.expired
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left until the deadline (None if there is no deadline)"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self, stage: str = "") -> None:
+        """
+        Raise if the job was cancelled or its deadline passed
+
+        Raises:
+            JobCancelled: If cancel() was called
+            DeadlineExceeded: If the deadline passed
+        """
+        where = f" before {stage}" if stage else ""
+        if self.cancelled:
+            raise JobCancelled(f"Job cancelled{where}")
+        if self.expired:
+            raise DeadlineExceeded(f"Job deadline exceeded{where}")
+
+    def timeout(self, default: float) -> float:
+        """Timeout for a blocking call: the default, capped by the time left"""
+        self.check()
+        remaining = self.remaining()
+        return default if remaining is None else min(default, remaining)
+
+
+# Token of the job running in the current context (set by cancel_scope)
+_current_token: ContextVar[Optional[CancelToken]] = ContextVar("cancel_token", default=None)
+
+
+@contextmanager
+def cancel_scope(token: Optional[CancelToken]) -> Iterator[None]:
+    """Make a token visible to every stage called from this block"""
+    reset = _current_token.set(token)
+    try:
+        yield
+    finally:
+        _current_token.reset(reset)
+
+
+def current_token() -> Optional[CancelToken]:
+    """Get the token of the job running in the current context"""
+    return _current_token.get()
+
+
+def check_cancelled(stage: str = "") -> None:
+    """Raise if the current job was cancelled or its deadline passed"""
+    token = _current_token.get()
+    if token is not None:
+        token.check(stage)
+
+
+def call_timeout(default: float) -> float:
+    """Timeout for a blocking call made by the current job"""
+    token = _current_token.get()
+    return default if token is None else token.timeout(default)
@@ -0,0 +1,94 @@
+import json
+import logging
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+from .file_utils import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages in execution order
+STAGES = ("research", "outline", "draft", "final")
+
+
+class CheckpointStore:
+    """Per-job, per-stage checkpoints so interrupted generations can resume"""
+
+    def __init__(self, checkpoint_dir: str = "./checkpoints"):
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+
+    def save_request(self, job_id: str, request: Dict[str, Any]) -> None:
+        """Persist the original request so the job can be resumed after a restart"""
+        atomic_write_json(self._job_dir(job_id) / "request.json", request)
+
+    def load_request(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Load the original request of a job, if checkpointed"""
+        return self._read(self._job_dir(job_id) / "request.json")
+
+    def save(self, job_id: str, stage: str, data: Dict[str, Any]) -> None:
+        """
+        Persist the output of a completed stage
+
+        Args:
+            job_id: Job identifier
+            stage: One of STAGES
+            data: JSON-serializable stage output
+        """
+        if stage not in STAGES:
+            raise ValueError(f"Unknown pipeline stage: {stage}")
+        atomic_write_json(self._job_dir(job_id) / f"{stage}.json", data)
+        logger.debug(f"Checkpoint saved: {job_id}/{stage}")
+
+    def load(self, job_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Load all completed stages of a job
+
+        Stages are only returned up to the first missing one, so a resume
+        never skips a stage whose inputs were not checkpointed.
+        """
+        completed = {}
+        for stage in STAGES:
+            data = self._read(self._job_dir(job_id) / f"{stage}.json")
+            if data is None:
+                break
+            completed[stage] = data
+        return completed
+
+    def last_stage(self, job_id: str) -> Optional[str]:
+        """Name of the last completed stage, or None"""
+        completed = self.load(job_id)
+        return list(completed)[-1] if completed else None
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """List checkpointed jobs that can be resumed"""
+        jobs = []
+        for job_dir in sorted(self.checkpoint_dir.iterdir()):
+            if job_dir.is_dir() and (job_dir / "request.json").exists():
+                jobs.append({
+                    "job_id": job_dir.name,
+                    "last_stage": self.last_stage(job_dir.name)
+                })
+        return jobs
+
+    def delete(self, job_id: str) -> None:
+        """Remove all checkpoints of a job"""
+        shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+
+    def _job_dir(self, job_id: str) -> Path:
+        # Job ids come from API paths; never let them escape the checkpoint dir
+        if not job_id or "/" in job_id or "\\" in job_id or job_id.startswith("."):
+            raise ValueError(f"Invalid job id: {job_id}")
+        return self.checkpoint_dir / job_id
+
+    @staticmethod
+    def _read(path: Path) -> Optional[Dict[str, Any]]:
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Unreadable checkpoint {path}: {e}")
+            return None
@@ -1,46 +1,181 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.chains import LLMChain
-from typing import Dict, Any
+import logging
+import time
+from typing import Dict, Any, Tuple, TYPE_CHECKING
+
+from .outline import (
+    Outline, OutlineSection, OutlineParseError, OutlineRepairStats,
+    parse_outline, repair_outline
+)
+from .llm_pool import get_llm_pool
+from .model_router import DEFAULT_MODEL, get_model_router
+from .tokens import estimate_tokens
+from utils.tracing import span
+
+if TYPE_CHECKING:
+    from langchain.chains import LLMChain
+
+logger = logging.getLogger(__name__)
+
+# Editing rules shared by the EditorAgent and the combined write+edit prompt
+EDITOR_REQUIREMENTS = (
+    "- Remove ALL placeholders like '(Insert content here)', '(Experience 1)', etc.\n"
+    "- Replace any generic content with specific, detailed information\n"
+    "- Ensure all lists have actual, specific items with details\n"
+    "- Remove any instructional text or notes to editors\n"
+    "- Make sure every section has substantial, useful content\n"
+    "- Improve readability and SEO optimization\n"
+    "- REMOVE ALL image references including ![image], .jpg, .png, .gif, or any visual media mentions\n"
+    "- Keep only text-based content that works without images\n"
+    "- Keep only the final, publication-ready content\n"
+)
+
+
+def estimate_prompt_tokens(chain: "LLMChain", inputs: Dict[str, Any]) -> int:
+    """Estimate the input tokens of a chain call with the given inputs"""
+    return estimate_tokens(chain.prompt.format(**inputs))
+
+
+def _make_chain(template: str, temperature: float, output_key: str, stage: str) -> "LLMChain":
+    """Build an LLM chain; langchain is imported here so importing this module stays cheap"""
+    from langchain.chains import LLMChain
+    from langchain.prompts import ChatPromptTemplate
+
+    return LLMChain(
+        # Model chosen per call by the stage's routing policy (shared pool clients)
+        llm=get_model_router().runnable(stage, temperature),
+        prompt=ChatPromptTemplate.from_template(template),
+        output_key=output_key
+    )
+
+
+def _invoke(chain: "LLMChain", inputs: Dict[str, Any]) -> str:
+    """Run a chain inside the pool's concurrency limit and rate budget"""
+    pool = get_llm_pool()
+    input_tokens = estimate_prompt_tokens(chain, inputs)
+    # The router records the model actually used (and any fallback or hedge) on the span
+    with span("llm.call", output_key=chain.output_key, model=DEFAULT_MODEL,
+              input_tokens=input_tokens) as call_span:
+        queued_at = time.perf_counter()
+        with pool.slot(input_tokens):
+            call_span.set_attribute("pool_wait_ms", round((time.perf_counter() - queued_at) * 1000, 1))
+            # The router caps each request (including its retries) by the job's remaining time
+            output = chain.invoke(inputs)[chain.output_key]
+        output_tokens = estimate_tokens(output)
+        call_span.set_attribute("output_tokens", output_tokens)
+    pool.record_tokens(output_tokens)
+    return output
 
 
 class PlannerAgent:
     """Content planner agent with competitive intelligence"""
 
-    def __init__(self):
+    def __init__(self, max_retries: int = 1):
         self.chain = self._build_chain()
+        self.repair_chain = self._build_repair_chain()
+        self.max_retries = max_retries
+        self.outline_stats = OutlineRepairStats()
 
-    def _build_chain(self) -> LLMChain:
-        prompt = ChatPromptTemplate.from_template(
+    def _build_chain(self) -> "LLMChain":
+        template = (
             "You are a senior editor. Generate a competitive outline for a blog post about: {topic}.\n"
             "SEO Keyword: {keyword}. Tone: {tone}.\n\n"
             "COMPETITIVE ANALYSIS:\n"
-            "Top competitors: {competitors}\n"
-            "People also ask: {people_ask}\n"
+            "Top competitors:\n{competitors}\n"
+            "People also ask:\n{people_ask}\n"
             "Related searches: {related_searches}\n"
-            "Trending topics: {trending}\n\n"
+            "Trending topics:\n{trending}\n\n"
             "Create an outline that OUTPERFORMS the competition using these insights.\n"
             "Return JSON with title, meta_description, sections (heading+bullets)."
         )
-        return LLMChain(
-            llm=ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.2),
-            prompt=prompt,
-            output_key="outline"
+        return _make_chain(template, temperature=0.2, output_key="outline", stage="planner")
+
+    def _build_repair_chain(self) -> "LLMChain":
+        # Small prompt: only the broken outline is sent back, not the research data
+        template = (
+            "The following blog outline is not valid JSON or does not match the schema.\n"
+            "Error: {error}\n"
+            "Outline: {outline}\n\n"
+            "Return ONLY valid JSON of the form "
+            "{{\"title\": str, \"meta_description\": str, "
+            "\"sections\": [{{\"heading\": str, \"bullets\": [str]}}]}}, "
+            "keeping the original content. No code fences, no commentary."
         )
+        return _make_chain(template, temperature=0.0, output_key="outline", stage="planner")
 
     def generate_outline(self, data: Dict[str, Any]) -> str:
         """Generate competitive outline based on research data"""
-        return self.chain.invoke(data)["outline"]
+        return _invoke(self.chain, data)
+
+    def generate_structured_outline(self, data: Dict[str, Any]) -> Tuple[str, Outline]:
+        """
+        Generate an outline and validate it before any downstream stage runs
+
+        Malformed output is handled from cheapest to most expensive: local
+        repair, a small LLM repair call, then re-running the planner.
+
+        Returns:
+            (raw planner output, validated Outline)
+
+        Raises:
+            OutlineParseError: If no valid outline could be produced
+        """
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.outline_stats.record("planner_retries")
+                logger.warning(f"Planner: Retrying outline generation ({attempt}/{self.max_retries})")
+
+            raw = self.generate_outline(data)
+
+            try:
+                outline = parse_outline(raw)
+                self.outline_stats.record("parsed")
+                return raw, outline
+            except OutlineParseError as e:
+                last_error = e
+
+            try:
+                outline = repair_outline(raw)
+                self.outline_stats.record("local_repairs")
+                logger.info("Planner: Outline repaired locally")
+                return raw, outline
+            except OutlineParseError as e:
+                last_error = e
+
+            try:
+                repaired = _invoke(self.repair_chain, {"outline": raw, "error": str(last_error)})
+                outline = repair_outline(repaired)
+                self.outline_stats.record("llm_repairs")
+                logger.info("Planner: Outline repaired by LLM")
+                return repaired, outline
+            except OutlineParseError as e:
+                last_error = e
+
+        self.outline_stats.record("failures")
+        raise OutlineParseError(f"Planner did not produce a valid outline: {last_error}")
 
 
 class WriterAgent:
     """Content writer agent"""
 
-    def __init__(self):
+    def __init__(self, include_editor_requirements: bool = False):
+        # In combined mode the writer also applies the editor's rules so the
+        # separate edit pass can usually be skipped
+        self.include_editor_requirements = include_editor_requirements
+        self.editing_rules = (
+            "BEFORE RETURNING, SELF-EDIT THE POST FOR SEO AND CLARITY:\n" + EDITOR_REQUIREMENTS + "\n"
+            if include_editor_requirements else ""
+        )
+        # Prompt tokens every write call pays for the embedded editing rules
+        self.editing_rules_tokens = estimate_tokens(self.editing_rules) if self.editing_rules else 0
         self.chain = self._build_chain()
+        self.section_chain = self._build_section_chain()
+
+    def _build_chain(self) -> "LLMChain":
+        editing_rules = self.editing_rules
 
-    def _build_chain(self) -> LLMChain:
-        prompt = ChatPromptTemplate.from_template(
+        template = (
             "Write a complete, detailed markdown blog post in {tone} tone.\n"
             "Main keyword: {keyword}.\n"
             "Outline: {outline}\n\n"
@@ -54,21 +189,52 @@ class WriterAgent:
             "- Use proper markdown formatting\n"
             "- DO NOT include any image references, ![image], .jpg, .png, or any visual media\n"
             "- Focus on text-based content only\n\n"
+            + editing_rules +
             "Return only the complete markdown content with no placeholders, instructions, or image references."
         )
-        return LLMChain(
-            llm=ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.25),
-            prompt=prompt,
-            output_key="draft"
+        return _make_chain(template, temperature=0.25, output_key="draft", stage="writer")
+
+    def _build_section_chain(self) -> "LLMChain":
+        template = (
+            "You are writing ONE section of a markdown blog post titled \"{title}\" in {tone} tone.\n"
+            "Main keyword: {keyword}.\n"
+            "Full post structure (for context only): {headings}\n\n"
+            "Section to write: {heading}\n"
+            "Points to cover:\n{bullets}\n\n"
+            "IMPORTANT REQUIREMENTS:\n"
+            "- Write SPECIFIC, detailed content that covers every point\n"
+            "- Do NOT repeat the section heading and do NOT write other sections\n"
+            "- Use ### for any sub-headings, never # or ##\n"
+            "- NO placeholders, instructions, or image references\n"
+            "- Include real examples, facts, and actionable information\n\n"
+            "Return only the markdown body of this section."
         )
+        return _make_chain(template, temperature=0.25, output_key="section", stage="writer")
 
     def write_content(self, outline: str, keyword: str, tone: str) -> str:
         """Write content based on outline"""
-        return self.chain.invoke({
+        return _invoke(self.chain, {
             "outline": outline,
             "keyword": keyword,
             "tone": tone
-        })["draft"]
+        })
+
+    def section_inputs(self, outline: Outline, section: OutlineSection,
+                       keyword: str, tone: str) -> Dict[str, Any]:
+        """Build the prompt inputs for one outline section"""
+        return {
+            "title": outline.title or keyword,
+            "headings": " | ".join(s.heading for s in outline.sections),
+            "heading": section.heading,
+            "bullets": "\n".join(f"- {bullet}" for bullet in section.bullets) or "- Cover the most useful aspects of this heading",
+            "keyword": keyword,
+            "tone": tone
+        }
+
+    def write_section(self, outline: Outline, section: OutlineSection,
+                      keyword: str, tone: str) -> str:
+        """Write the body of a single outline section"""
+        return _invoke(self.section_chain, self.section_inputs(outline, section, keyword, tone))
 
 
 class EditorAgent:
@@ -77,28 +243,20 @@ class EditorAgent:
     def __init__(self):
         self.chain = self._build_chain()
 
-    def _build_chain(self) -> LLMChain:
-        prompt = ChatPromptTemplate.from_template(
+    def _build_chain(self) -> "LLMChain":
+        template = (
             "Edit and polish the following markdown for better SEO and clarity.\n"
             "Markdown: {draft}\n\n"
             "CRITICAL EDITING REQUIREMENTS:\n"
-            "- Remove ALL placeholders like '(Insert content here)', '(Experience 1)', etc.\n"
-            "- Replace any generic content with specific, detailed information\n"
-            "- Ensure all lists have actual, specific items with details\n"
-            "- Remove any instructional text or notes to editors\n"
-            "- Make sure every section has substantial, useful content\n"
-            "- Improve readability and SEO optimization\n"
-            "- REMOVE ALL image references including ![image], .jpg, .png, .gif, or any visual media mentions\n"
-            "- Keep only text-based content that works without images\n"
-            "- Keep only the final, publication-ready content\n\n"
+            + EDITOR_REQUIREMENTS + "\n"
             "Return only the clean, complete markdown without any placeholders, editorial notes, or image references."
         )
-        return LLMChain(
-            llm=ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.0),
-            prompt=prompt,
-            output_key="final_post"
-        )
+        return _make_chain(template, temperature=0.0, output_key="final_post", stage="editor")
 
     def edit_content(self, draft: str) -> str:
         """Edit and polish content"""
-        return self.chain.invoke({"draft": draft})["final_post"]
\ No newline at end of file
+        return _invoke(self.chain, {"draft": draft})
+
+    def edit_section(self, section_markdown: str) -> str:
+        """Edit and polish a single section body"""
+        return _invoke(self.chain, {"draft": section_markdown})
\ No newline at end of file
@@ -1,28 +1,116 @@
+import atexit
+import base64
+import fcntl
+import gzip
 import json
 import logging
-import chromadb
+import os
+import threading
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from pathlib import Path
 import hashlib
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
+# embedded: this process opens the Chroma files itself (one process only).
+# http: a Chroma server owns the files (`chroma run --path ./seo_cache --port 8001`)
+# and every API, worker and CLI process is a client of it.
+CACHE_MODES = ("embedded", "http")
+
+# Snapshot file: gzipped JSON lines, a header followed by one entry per line
+SNAPSHOT_FORMAT = "seo-cache-snapshot"
+SNAPSHOT_VERSION = 1
+# Conflicts are resolved per topic: "newer" keeps the most recently fetched SERP data,
+# "keep" only adds topics the cache lacks, "replace" lets the snapshot win
+SNAPSHOT_POLICIES = ("newer", "keep", "replace")
+# Entries read from or written to Chroma per call
+SNAPSHOT_BATCH = 1000
+
+
+# Owner locks on embedded stores held by this process, by resolved directory
+_owner_locks: Dict[str, Any] = {}
+_owner_locks_lock = threading.Lock()
+
 
 class SEOContentCache:
     """Semantic cache system for SEO content to avoid costly API calls"""
 
-    def __init__(self, cache_dir: str = "./seo_cache"):
+    def __init__(self, cache_dir: str = "./seo_cache", mode: Optional[str] = None,
+                 flush_interval: Optional[float] = None, batch_size: Optional[int] = None):
+        """
+        Args:
+            cache_dir: Chroma directory (embedded mode)
+            mode: "embedded" or "http" (defaults to CACHE_MODE)
+            flush_interval: Seconds writes are buffered before being sent in a
+                batch, bounding how stale other readers are (defaults to
+                CACHE_FLUSH_SECONDS; 0 writes synchronously)
+            batch_size: Buffered writes that trigger an early flush (defaults
+                to CACHE_WRITE_BATCH)
+        """
         self.cache_dir = Path(cache_dir)
-        self.cache_dir.mkdir(exist_ok=True)
-
-        # Initialize ChromaDB
-        self.client = chromadb.PersistentClient(path=str(self.cache_dir))
+        self.mode = (mode or os.getenv("CACHE_MODE", "embedded")).lower()
+        if self.mode not in CACHE_MODES:
+            raise ValueError(f"Unknown CACHE_MODE: {self.mode}")
+        self.flush_interval = float(os.getenv("CACHE_FLUSH_SECONDS", "1.0")) \
+            if flush_interval is None else flush_interval
+        self.batch_size = int(os.getenv("CACHE_WRITE_BATCH", "32")) if batch_size is None else batch_size
+
+        # Initialize ChromaDB (imported here, it is slow to load)
+        import chromadb
+        if self.mode == "http":
+            self.client = chromadb.HttpClient(
+                host=os.getenv("CHROMA_HOST", "localhost"),
+                port=int(os.getenv("CHROMA_PORT", "8001"))
+            )
+        else:
+            self.cache_dir.mkdir(exist_ok=True)
+            self._claim_owner()
+            self.client = chromadb.PersistentClient(path=str(self.cache_dir))
         self.collection = self.client.get_or_create_collection(
             name="seo_topics",
             metadata={"hnsw:space": "cosine"}
         )
 
+        # Buffered writes by document id, sent by a background flusher
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._pending_lock = threading.Condition()
+        self._flusher: Optional[threading.Thread] = None
+        self._stats = {"writes": 0, "flushes": 0, "flush_errors": 0, "pending_hits": 0}
+        self._flush_failing = False
+
+        # Warm a new node from a snapshot (only when the collection is still empty)
+        snapshot_path = os.getenv("CACHE_SNAPSHOT_PATH")
+        if snapshot_path:
+            self._warm_from_snapshot(snapshot_path)
+
+    def _claim_owner(self) -> None:
+        """
+        Take the embedded store for this process; a second process opening it
+        would corrupt its index, so that process refuses to start instead
+
+        Raises:
+            RuntimeError: If another process has the store open
+        """
+        key = str(self.cache_dir.resolve())
+        with _owner_locks_lock:
+            if key in _owner_locks:
+                # Already ours (another cache instance in this process)
+                return
+            lock_file = open(self.cache_dir / ".owner.lock", "w")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                raise RuntimeError(
+                    f"{self.cache_dir} is already open in another process; run a Chroma server "
+                    f"and set CACHE_MODE=http to share the research cache between processes"
+                )
+            # Held until the process exits
+            _owner_locks[key] = lock_file
+
     def find_similar_analysis(self, topic: str, similarity_threshold: float = 0.82) -> Dict[str, Any]:
         """
         Search for similar SEO analysis in cache
@@ -34,6 +122,11 @@ class SEOContentCache:
         Returns:
             Dict with found status and cached data if available
         """
+        # Entries written by this process but not flushed yet
+        pending = self._find_pending(topic)
+        if pending is not None:
+            return pending
+
         try:
             results = self.collection.query(
                 query_texts=[topic],
@@ -46,20 +139,8 @@ class SEOContentCache:
             for i, distance in enumerate(results['distances'][0]):
                 similarity = 1 - distance
                 if similarity >= similarity_threshold:
-                    metadata = results['metadatas'][0][i]
-
-                    return {
-                        'found': True,
-                        'similarity': similarity,
-                        'original_topic': results['documents'][0][i],
-                        'serp_data': json.loads(metadata['serp_data']),
-                        'competitors': json.loads(metadata['competitors']),
-                        'people_also_ask': json.loads(metadata['people_also_ask']),
-                        'related_searches': json.loads(metadata['related_searches']),
-                        'trending_topics': json.loads(metadata.get('trending_topics', '[]')),
-                        'cached_date': metadata['date'],
-                        'id': results['ids'][0][i]
-                    }
+                    return self._hit(results['ids'][0][i], results['documents'][0][i],
+                                     results['metadatas'][0][i], similarity)
 
             return {'found': False}
 
@@ -67,7 +148,31 @@ class SEOContentCache:
             logger.error(f"Error searching cache: {e}")
             return {'found': False}
 
-    def cache_serp_analysis(self, topic: str, competitive_data: Dict, trending_data: List) -> bool:
+    @staticmethod
+    def _hit(doc_id: str, document: str, metadata: Dict[str, Any], similarity: float) -> Dict[str, Any]:
+        return {
+            'found': True,
+            'similarity': similarity,
+            'original_topic': document,
+            'serp_data': json.loads(metadata['serp_data']),
+            'competitors': json.loads(metadata['competitors']),
+            'people_also_ask': json.loads(metadata['people_also_ask']),
+            'related_searches': json.loads(metadata['related_searches']),
+            'trending_topics': json.loads(metadata.get('trending_topics', '[]')),
+            'cached_date': metadata['date'],
+            'id': doc_id
+        }
+
+    def _find_pending(self, topic: str) -> Optional[Dict[str, Any]]:
+        with self._pending_lock:
+            for doc_id, entry in self._pending.items():
+                if entry['document'] == topic:
+                    self._stats['pending_hits'] += 1
+                    return self._hit(doc_id, entry['document'], entry['metadata'], 1.0)
+        return None
+
+    def cache_serp_analysis(self, topic: str, competitive_data: Dict, trending_data: List,
+                            cached_at: Optional[datetime] = None) -> bool:
         """
         Cache complete SERP analysis data
 
@@ -75,15 +180,21 @@ class SEOContentCache:
             topic: The analyzed topic
             competitive_data: Competitive analysis from ResearchAgent
             trending_data: Trending topics data
+            cached_at: Time the SERP data was fetched (defaults to now, set when
+                backfilling; the entry is then only written if it is newer than
+                the cached one)
 
         Returns:
-            Success status
+            Success status (False also when a backfilled entry was older)
         """
         try:
-            # Create unique ID
+            # One entry per topic: a fresh analysis or a backfill replaces the previous one
+            backfill = cached_at is not None
+            cached_at = cached_at or datetime.now()
             topic_hash = hashlib.md5(topic.encode()).hexdigest()
-            timestamp = int(datetime.now().timestamp())
-            doc_id = f"serp_{topic_hash}_{timestamp}"
+            doc_id = f"serp_{topic_hash}"
+            if backfill and self._cached_date(doc_id) >= cached_at.isoformat():
+                return False
 
             # Prepare metadata
             metadata = {
@@ -92,16 +203,26 @@ class SEOContentCache:
                 'people_also_ask': json.dumps(competitive_data.get('people_also_ask', [])),
                 'related_searches': json.dumps(competitive_data.get('related_searches', [])),
                 'trending_topics': json.dumps(trending_data),
-                'date': datetime.now().isoformat(),
+                'date': cached_at.isoformat(),
                 'topic_hash': topic_hash
             }
 
-            # Store in ChromaDB
-            self.collection.add(
-                documents=[topic],
-                metadatas=[metadata],
-                ids=[doc_id]
-            )
+            if self.flush_interval <= 0:
+                # Store in ChromaDB
+                self.collection.upsert(
+                    documents=[topic],
+                    metadatas=[metadata],
+                    ids=[doc_id]
+                )
+                self._stats['writes'] += 1
+                return True
+
+            with self._pending_lock:
+                self._pending[doc_id] = {'document': topic, 'metadata': metadata}
+                self._stats['writes'] += 1
+                self._ensure_flusher()
+                if len(self._pending) >= self.batch_size:
+                    self._pending_lock.notify()
 
             return True
 
@@ -109,6 +230,244 @@ class SEOContentCache:
             logger.error(f"Error caching analysis: {e}")
             return False
 
+    def _cached_date(self, doc_id: str) -> str:
+        """Date of the entry cached under doc_id (buffered or stored), or "" if there is none"""
+        with self._pending_lock:
+            entry = self._pending.get(doc_id)
+        if entry is not None:
+            return entry['metadata']['date']
+        stored = self.collection.get(ids=[doc_id], include=["metadatas"])
+        return stored['metadatas'][0].get('date', "") if stored['ids'] else ""
+
+    def flush(self) -> bool:
+        """Send buffered writes now; returns False if the upsert failed (they stay buffered)"""
+        with self._pending_lock:
+            batch = dict(self._pending)
+        if not batch:
+            return True
+
+        try:
+            self.collection.upsert(
+                documents=[entry['document'] for entry in batch.values()],
+                metadatas=[entry['metadata'] for entry in batch.values()],
+                ids=list(batch)
+            )
+        except Exception as e:
+            self._stats['flush_errors'] += 1
+            # Retried every interval; only log when the store starts failing
+            if not self._flush_failing:
+                logger.error(f"Error flushing {len(batch)} cache writes: {e}")
+            self._flush_failing = True
+            return False
+
+        self._flush_failing = False
+        with self._pending_lock:
+            for doc_id, entry in batch.items():
+                # Keep entries rewritten while the batch was in flight
+                if self._pending.get(doc_id) is entry:
+                    del self._pending[doc_id]
+            self._stats['flushes'] += 1
+        return True
+
+    def _ensure_flusher(self) -> None:
+        # Started on the first buffered write (caller holds the lock)
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="cache-flusher", daemon=True)
+            self._flusher.start()
+            atexit.register(self.flush)
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._pending_lock:
+                self._pending_lock.wait(timeout=self.flush_interval)
+            self.flush()
+
+    def _embedding_function_name(self) -> str:
+        function = getattr(self.collection, "_embedding_function", None)
+        try:
+            return function.name()
+        except Exception:
+            return type(function).__name__
+
+    def _iter_entries(self, include: List[str]):
+        """Yield the collection's entries in batches (ids plus the requested fields)"""
+        offset = 0
+        while True:
+            batch = self.collection.get(include=include, limit=SNAPSHOT_BATCH, offset=offset)
+            if not batch['ids']:
+                return
+            yield batch
+            offset += len(batch['ids'])
+
+    def export_snapshot(self, path: str) -> Dict[str, Any]:
+        """
+        Write the cache to a compressed, versioned snapshot file
+
+        Documents, metadata (the SERP payloads) and embeddings are exported,
+        so importing needs no embedding model calls. The file is written to a
+        temporary name and renamed, so readers never see a partial snapshot.
+
+        Args:
+            path: Snapshot file to write (conventionally *.jsonl.gz)
+
+        Returns:
+            Dict with the entry count, embedding dimension and file size
+        """
+        self.flush()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+
+        count = 0
+        dimension = None
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+            f.write(json.dumps({
+                "format": SNAPSHOT_FORMAT,
+                "version": SNAPSHOT_VERSION,
+                "created_at": datetime.now().isoformat(),
+                "collection": self.collection.name,
+                "embedding_function": self._embedding_function_name(),
+                "count": self.collection.count()
+            }) + "\n")
+            for batch in self._iter_entries(["documents", "metadatas", "embeddings"]):
+                for doc_id, document, metadata, embedding in zip(
+                        batch['ids'], batch['documents'], batch['metadatas'], batch['embeddings']):
+                    vector = np.asarray(embedding, dtype="<f4")
+                    dimension = dimension or len(vector)
+                    f.write(json.dumps({
+                        "id": doc_id,
+                        "document": document,
+                        "metadata": metadata,
+                        # float32 little-endian, base64: a third of the size of a JSON float list
+                        "embedding": base64.b64encode(vector.tobytes()).decode("ascii")
+                    }, ensure_ascii=False) + "\n")
+                    count += 1
+        os.replace(tmp_path, path)
+
+        logger.info(f"Exported {count} cache entries to {path}")
+        return {"entries": count, "dimension": dimension, "bytes": path.stat().st_size, "path": str(path)}
+
+    @staticmethod
+    def read_snapshot_header(path: str) -> Dict[str, Any]:
+        """
+        Read and validate a snapshot's header
+
+        Raises:
+            ValueError: If the file is not a snapshot of a supported version
+        """
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            try:
+                header = json.loads(f.readline())
+            except json.JSONDecodeError:
+                header = {}
+        if header.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"{path} is not a cache snapshot")
+        if header.get("version", 0) > SNAPSHOT_VERSION:
+            raise ValueError(
+                f"{path} is snapshot version {header['version']}; this version reads up to {SNAPSHOT_VERSION}"
+            )
+        return header
+
+    def import_snapshot(self, path: str, policy: str = "newer",
+                        max_age_days: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Bulk-load a snapshot with its stored embeddings
+
+        Args:
+            path: Snapshot file written by export_snapshot
+            policy: Conflict rule for topics already cached ("newer", "keep" or "replace")
+            max_age_days: Skip entries whose SERP data is older than this
+
+        Returns:
+            Dict with counts of imported, skipped (conflict or age) and replaced entries
+
+        Raises:
+            ValueError: For an unknown policy, an unsupported snapshot, or
+                embeddings from a different embedding function
+        """
+        if policy not in SNAPSHOT_POLICIES:
+            raise ValueError(f"Unknown snapshot policy: {policy}")
+        header = self.read_snapshot_header(path)
+        # Vectors from another model would make similarity search meaningless
+        if header.get("embedding_function") != self._embedding_function_name():
+            raise ValueError(
+                f"Snapshot embeddings come from '{header.get('embedding_function')}', "
+                f"this cache uses '{self._embedding_function_name()}'"
+            )
+        self.flush()
+
+        # Newest cached date and entry ids per topic
+        existing: Dict[str, Dict[str, Any]] = {}
+        for batch in self._iter_entries(["metadatas"]):
+            for doc_id, metadata in zip(batch['ids'], batch['metadatas']):
+                topic = existing.setdefault(metadata.get('topic_hash', doc_id), {"date": "", "ids": []})
+                topic["ids"].append(doc_id)
+                topic["date"] = max(topic["date"], metadata.get('date', ""))
+
+        cutoff = (datetime.now().timestamp() - max_age_days * 86400) if max_age_days else None
+        stats = {"imported": 0, "skipped_conflict": 0, "skipped_age": 0, "replaced": 0}
+        batch: Dict[str, List[Any]] = {"ids": [], "documents": [], "metadatas": [], "embeddings": []}
+        # Cached entries of topics the snapshot supersedes, deleted with the next batch
+        superseded = set()
+        deletes: List[str] = []
+
+        def write_batch():
+            if deletes:
+                self.collection.delete(ids=list(deletes))
+                stats["replaced"] += len(deletes)
+                deletes.clear()
+            if batch["ids"]:
+                self.collection.upsert(**batch)
+                stats["imported"] += len(batch["ids"])
+                for values in batch.values():
+                    values.clear()
+
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            f.readline()
+            for line in f:
+                entry = json.loads(line)
+                metadata = entry["metadata"]
+                date = metadata.get('date', "")
+                if cutoff and date and datetime.fromisoformat(date).timestamp() < cutoff:
+                    stats["skipped_age"] += 1
+                    continue
+
+                topic_key = metadata.get('topic_hash', entry["id"])
+                current = existing.get(topic_key)
+                if current and topic_key not in superseded:
+                    if policy == "keep" or (policy == "newer" and current["date"] >= date):
+                        stats["skipped_conflict"] += 1
+                        continue
+                    # The snapshot's entries replace the topic's cached ones
+                    superseded.add(topic_key)
+                    deletes.extend(doc_id for doc_id in current["ids"] if doc_id != entry["id"])
+
+                batch["ids"].append(entry["id"])
+                batch["documents"].append(entry["document"])
+                batch["metadatas"].append(metadata)
+                batch["embeddings"].append(np.frombuffer(base64.b64decode(entry["embedding"]), dtype="<f4"))
+                if len(batch["ids"]) >= SNAPSHOT_BATCH:
+                    write_batch()
+        write_batch()
+
+        logger.info(
+            f"Imported {stats['imported']} cache entries from {path} (policy {policy}, "
+            f"{stats['skipped_conflict']} conflicts skipped, {stats['replaced']} replaced)"
+        )
+        return stats
+
+    def _warm_from_snapshot(self, path: str) -> None:
+        try:
+            if self.collection.count() > 0:
+                return
+            if not Path(path).exists():
+                logger.warning(f"Cache snapshot {path} not found; starting with an empty cache")
+                return
+            max_age = os.getenv("CACHE_SNAPSHOT_MAX_AGE_DAYS")
+            self.import_snapshot(path, policy="keep", max_age_days=float(max_age) if max_age else None)
+        except Exception as e:
+            logger.error(f"Error importing cache snapshot {path}: {e}")
+
     def adapt_cached_data(self, original_topic: str, new_topic: str, cached_data: Dict) -> Dict[str, Any]:
         """
         Adapt cached analysis data for a new similar topic
@@ -189,10 +548,17 @@ class SEOContentCache:
             all_items = self.collection.get()
             total_items = len(all_items['ids']) if all_items['ids'] else 0
 
+            with self._pending_lock:
+                pending = len(self._pending)
+
             return {
                 'total_cached_topics': total_items,
-                'cache_directory': str(self.cache_dir),
-                'collection_name': self.collection.name
+                'cache_mode': self.mode,
+                'cache_directory': str(self.cache_dir) if self.mode == "embedded" else None,
+                'collection_name': self.collection.name,
+                'pending_writes': pending,
+                'flush_interval_seconds': self.flush_interval,
+                **self._stats
             }
 
         except Exception as e:
@@ -201,6 +567,8 @@ class SEOContentCache:
     def clear_cache(self) -> bool:
         """Clear all cached data"""
         try:
+            with self._pending_lock:
+                self._pending.clear()
             self.client.delete_collection(name="seo_topics")
             self.collection = self.client.get_or_create_collection(
                 name="seo_topics",
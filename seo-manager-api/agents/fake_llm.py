@@ -0,0 +1,96 @@
+"""
+Offline stand-in for the Gemini chat model (LLM_BACKEND=fake)
+
+Replies after a simulated latency with a long tail, and can be made to
+throttle (429) or time out, so routing, hedging and fallbacks can be
+exercised without API keys. Outline prompts get a valid JSON outline and
+everything else gets markdown built from the prompt's words.
+
+Per-model behaviour comes from FAKE_LLM_PROFILES, e.g.
+{"gemini-1.5-flash": {"latency": 0.2, "tail_probability": 0.05,
+"tail_latency": 3.0, "throttle_rate": 0.1}}
+"""
+
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+_WORD = re.compile(r"[A-Za-z][A-Za-z-]{3,}")
+
+DEFAULT_PROFILE = {"latency": 0.05, "tail_probability": 0.0, "tail_latency": 1.0, "throttle_rate": 0.0}
+
+
+class ResourceExhausted(Exception):
+    """Simulated 429, named like google.api_core's exception"""
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model with simulated latency, throttling and timeouts"""
+
+    model: str
+    latency: float = 0.05
+    tail_probability: float = 0.0
+    tail_latency: float = 1.0
+    throttle_rate: float = 0.0
+    seed: Optional[int] = None
+
+    _random: random.Random = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._random = random.Random(self.seed)
+
+    @classmethod
+    def from_env(cls, model: str) -> "FakeChatModel":
+        """Build a fake for a model name from FAKE_LLM_PROFILES and FAKE_LLM_SEED"""
+        profiles = json.loads(os.getenv("FAKE_LLM_PROFILES", "{}") or "{}")
+        seed = os.getenv("FAKE_LLM_SEED")
+        return cls(model=model, seed=int(seed) if seed else None,
+                   **{**DEFAULT_PROFILE, **profiles.get(model, profiles.get("*", {}))})
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        with self._lock:
+            throttled = self._random.random() < self.throttle_rate
+            delay = self.tail_latency if self._random.random() < self.tail_probability else \
+                self._random.uniform(0.5, 1.5) * self.latency
+
+        if throttled:
+            raise ResourceExhausted(f"429 Resource has been exhausted ({self.model})")
+
+        timeout = kwargs.get("timeout")
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"{self.model} did not respond within {timeout:.1f}s")
+        time.sleep(delay)
+
+        prompt = "\n".join(str(message.content) for message in messages)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(prompt)))])
+
+    def _reply(self, prompt: str) -> str:
+        words = _WORD.findall(prompt)[:40] or ["content"]
+        if "JSON" in prompt:
+            return json.dumps({
+                "title": " ".join(words[:6]).title(),
+                "meta_description": " ".join(words[:20]),
+                "sections": [
+                    {"heading": f"{word.title()} essentials", "bullets": words[i:i + 3]}
+                    for i, word in enumerate(words[:4])
+                ]
+            })
+        return "\n\n".join(
+            f"{' '.join(words[i:i + 12]).capitalize()} ({self.model})." for i in range(0, len(words), 12)
+        )
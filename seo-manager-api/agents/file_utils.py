@@ -0,0 +1,77 @@
+"""
+Atomic file writes and cross-process file locks.
+
+Content is written to a hidden temporary file in the target directory and
+then renamed over the destination, so readers (and file watchers) only ever
+see complete files. Files shared by the API and worker processes (manifest,
+indexes, archive segments, the Astro build) are guarded with flock on a
+sidecar lock file, which also serializes threads of one process.
+"""
+
+import fcntl
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Union
+
+from .cancellation import POLL_SECONDS, current_token
+from utils.tracing import span
+
+
+def atomic_write_text(path: Union[str, Path], content: str) -> Path:
+    """Atomically write text to a file, creating parent directories"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with span("file.write", path=str(path), chars=len(content)):
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    return path
+
+
+def atomic_write_json(path: Union[str, Path], data: Any) -> Path:
+    """Atomically write data as pretty-printed JSON"""
+    return atomic_write_text(path, json.dumps(data, ensure_ascii=False, indent=2))
+
+
+@contextmanager
+def file_lock(path: Union[str, Path]) -> Iterator[None]:
+    """
+    Hold an exclusive flock on a lock file for the duration of the block
+
+    A job waiting for the lock still stops when it is cancelled.
+
+    Raises:
+        JobAborted: If the current job is cancelled or times out while waiting
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    token = current_token()
+    with open(path, "a") as lock_file:
+        if token is None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    token.check(f"lock on {path.name}")
+                    time.sleep(POLL_SECONDS)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
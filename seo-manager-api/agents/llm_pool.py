@@ -0,0 +1,234 @@
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Iterator, Optional
+
+from .cancellation import POLL_SECONDS, current_token
+
+logger = logging.getLogger(__name__)
+
+# Queue priorities (lower is served first)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+_WINDOW_SECONDS = 60.0
+
+# Priority applied to LLM calls made by the current job (set by the job scheduler)
+_current_priority: ContextVar[int] = ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: int) -> Iterator[None]:
+    """Run the block with the given LLM queue priority"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class LLMClientPool:
+    """
+    Process-wide Gemini client registry with a shared concurrency limit and
+    per-minute request/token budget
+
+    One chat model client (and so one HTTP/gRPC channel) is kept per model
+    name; stages that need a different temperature bind it per call instead
+    of creating their own client. Callers waiting for a slot are served in
+    priority order, then arrival order, so a burst of jobs queues locally
+    instead of being throttled by the API.
+    """
+
+    def __init__(self, max_concurrency: int = 8, requests_per_minute: int = 0,
+                 tokens_per_minute: int = 0):
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+
+        self._llms: Dict[str, Any] = {}
+        self._llms_lock = threading.Lock()
+
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._active = 0
+        # (timestamp, requests, tokens) entries inside the rate window
+        self._window = deque()
+
+        self._stats = {
+            "requests": 0,
+            "estimated_tokens": 0,
+            "total_wait_seconds": 0.0,
+            "max_queue_depth": 0,
+            "budget_waits": 0
+        }
+
+    def get_llm(self, model: str):
+        """Get the shared chat model client for a model name"""
+        with self._llms_lock:
+            llm = self._llms.get(model)
+            if llm is None:
+                if os.getenv("LLM_BACKEND", "gemini").lower() == "fake":
+                    # Offline backend with simulated latency and throttling
+                    from .fake_llm import FakeChatModel
+                    llm = FakeChatModel.from_env(model)
+                else:
+                    from langchain_google_genai import ChatGoogleGenerativeAI
+                    # The model router owns retries (with fallback and the job's deadline);
+                    # client retries would hide failures from it and overrun deadlines
+                    llm = ChatGoogleGenerativeAI(model=model, max_retries=int(os.getenv("GEMINI_MAX_RETRIES", "0")))
+                self._llms[model] = llm
+                logger.info(f"LLM pool: created client for {model}")
+            return llm
+
+    def bind(self, model: str, temperature: float):
+        """Get a runnable for a model with a per-call temperature, sharing the model's client"""
+        return self.get_llm(model).bind(generation_config={"temperature": temperature})
+
+    @contextmanager
+    def slot(self, estimated_tokens: int = 0, priority: Optional[int] = None) -> Iterator[None]:
+        """
+        Block until a concurrency slot and rate budget are available
+
+        Args:
+            estimated_tokens: Expected tokens of the call, charged against the budget
+            priority: Queue priority (PRIORITY_INTERACTIVE or PRIORITY_BATCH),
+                defaults to the priority of the current job
+        """
+        if priority is None:
+            priority = _current_priority.get()
+        ticket = (priority, next(self._sequence))
+        wait_start = time.perf_counter()
+        # A cancelled job gives up its place in the queue instead of spending quota
+        token = current_token()
+        poll = POLL_SECONDS if token is not None else None
+
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], len(self._waiting))
+            waited_for_budget = False
+
+            while True:
+                if token is not None and token.aborted:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self._cond.notify_all()
+                    token.check("LLM call")
+
+                now = time.monotonic()
+                if self._waiting[0] == ticket and self._active < self.max_concurrency:
+                    retry_in = self._budget_delay(now, estimated_tokens)
+                    if retry_in <= 0:
+                        break
+                    waited_for_budget = True
+                    self._cond.wait(timeout=min(retry_in, poll or retry_in))
+                else:
+                    self._cond.wait(timeout=poll)
+
+            heapq.heappop(self._waiting)
+            self._active += 1
+            self._window.append((time.monotonic(), 1, estimated_tokens))
+            self._stats["requests"] += 1
+            self._stats["estimated_tokens"] += estimated_tokens
+            self._stats["total_wait_seconds"] += time.perf_counter() - wait_start
+            if waited_for_budget:
+                self._stats["budget_waits"] += 1
+            # The next ticket in line may be able to proceed too
+            self._cond.notify_all()
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def try_acquire(self, estimated_tokens: int = 0) -> bool:
+        """
+        Take a slot only if one is free right now, with nobody queued ahead and
+        budget left (used for optional requests such as hedges); pair with release()
+        """
+        with self._cond:
+            if self._waiting or self._active >= self.max_concurrency \
+                    or self._budget_delay(time.monotonic(), estimated_tokens) > 0:
+                return False
+            self._active += 1
+            self._window.append((time.monotonic(), 1, estimated_tokens))
+            self._stats["requests"] += 1
+            self._stats["estimated_tokens"] += estimated_tokens
+            return True
+
+    def release(self) -> None:
+        """Give back a slot taken with try_acquire"""
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def record_tokens(self, tokens: int) -> None:
+        """Charge tokens that were only known after a call (e.g. the output) to the budget"""
+        if tokens <= 0:
+            return
+        with self._cond:
+            self._window.append((time.monotonic(), 0, tokens))
+            self._stats["estimated_tokens"] += tokens
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool usage statistics"""
+        with self._cond:
+            self._expire(time.monotonic())
+            return {
+                **self._stats,
+                "total_wait_seconds": round(self._stats["total_wait_seconds"], 3),
+                "active": self._active,
+                "queued": len(self._waiting),
+                "requests_last_minute": sum(entry[1] for entry in self._window),
+                "tokens_last_minute": sum(entry[2] for entry in self._window),
+                "max_concurrency": self.max_concurrency,
+                "requests_per_minute": self.requests_per_minute,
+                "tokens_per_minute": self.tokens_per_minute,
+                "models": sorted(self._llms)
+            }
+
+    def _expire(self, now: float) -> None:
+        while self._window and now - self._window[0][0] >= _WINDOW_SECONDS:
+            self._window.popleft()
+
+    def _budget_delay(self, now: float, estimated_tokens: int) -> float:
+        """Seconds until the rate budget admits another call (0 if it does now)"""
+        self._expire(now)
+        if not self._window:
+            return 0.0
+
+        requests = sum(entry[1] for entry in self._window)
+        tokens = sum(entry[2] for entry in self._window)
+        over_requests = self.requests_per_minute and requests + 1 > self.requests_per_minute
+        over_tokens = self.tokens_per_minute and tokens + estimated_tokens > self.tokens_per_minute
+
+        if not over_requests and not over_tokens:
+            return 0.0
+        # Wait for the oldest entry to leave the window, then re-check
+        return max(0.01, _WINDOW_SECONDS - (now - self._window[0][0]))
+
+
+_pool: Optional[LLMClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_llm_pool() -> LLMClientPool:
+    """Get the process-wide LLM client pool, configured from the environment"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = LLMClientPool(
+                    max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "8")),
+                    requests_per_minute=int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "0")),
+                    tokens_per_minute=int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "0"))
+                )
+    return _pool
@@ -1,16 +1,40 @@
+import contextvars
+import hashlib
 import json
 import logging
 import os
+import re
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
-from .research_agent import ResearchAgent
-from .smart_research_agent import SmartResearchAgent
-from .content_agents import PlannerAgent, WriterAgent, EditorAgent
+from .blog_manifest import BlogManifest, parse_frontmatter
+from .cancellation import (
+    CancelToken, JobAborted, POLL_SECONDS, call_timeout, cancel_scope, check_cancelled, current_token
+)
+from .checkpoints import CheckpointStore
+from .content_agents import PlannerAgent, WriterAgent, EditorAgent, estimate_prompt_tokens
+from .file_utils import atomic_write_json, atomic_write_text, file_lock
+from .outline import Outline, OutlineSection, format_section, stitch_sections
+from .post_index import PostIndex
+from .preview_cache import get_preview_cache, valid_slug
+from .prompt_context import build_planner_context
+from .quality import find_quality_issues
+from .refresh import assign_changes, diff_research, match_outline, split_sections, summarize_diff
+from .seo_score import score_post
+from .stage_limits import StageLimiter
+from .tokens import estimate_tokens
+from utils.logger_config import log_context, update_log_context
+from utils.tracing import span
+
+# Frontmatter block of an Astro post
+_FRONTMATTER = re.compile(r"\A---\s*\n(.*?)\n---\s*\n", re.DOTALL)
 
 # Configuration
 class Config:
@@ -19,31 +43,108 @@ class Config:
     DEFAULT_OUTPUT_DIR = "./output_hierarchical"
     ASTRO_BLOG_DIR = "../seo-manager-blog/src/content/blog"
     ASTRO_PROJECT_DIR = "../seo-manager-blog"
+    # Append-only index of published posts, read by the blog's listing and tag pages
+    BLOG_MANIFEST_PATH = os.getenv("BLOG_MANIFEST_PATH", "../seo-manager-blog/src/data/posts.jsonl")
+    # "standard": planner -> writer -> editor
+    # "combined": writer applies the editor's rules, edit pass only on failed quality check
+    # "sectioned": outline sections are written and edited in parallel, then stitched
+    PIPELINE_MODE = os.getenv("PIPELINE_MODE", "standard")
+    PIPELINE_MODES = ("standard", "combined", "sectioned")
+    # Maximum number of outline sections drafted concurrently in sectioned mode
+    SECTION_CONCURRENCY = int(os.getenv("SECTION_CONCURRENCY", "4"))
+    # Per-job stage checkpoints for resuming interrupted generations ("" disables)
+    CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", "./checkpoints")
+    # Upper bound on the Astro production build
+    BUILD_TIMEOUT_SECONDS = 300
+    # Characters of npm build output kept in logs
+    BUILD_LOG_TAIL_CHARS = 2000
+    # Author written to post frontmatter and the manifest
+    POST_AUTHOR = "SEO Manager"
+    # Duplicate posts: "return" the existing post, "record" it in metrics, or "off"
+    DEDUP_POLICY = os.getenv("DEDUP_POLICY", "return")
+    DEDUP_POLICIES = ("return", "record", "off")
+    DEDUP_TOPIC_THRESHOLD = float(os.getenv("DEDUP_TOPIC_THRESHOLD", "0.8"))
+    DEDUP_CONTENT_THRESHOLD = float(os.getenv("DEDUP_CONTENT_THRESHOLD", "0.8"))
+    # Token budget for the research data in the planner prompt (0 = unlimited)
+    PLANNER_CONTEXT_TOKENS = int(os.getenv("PLANNER_CONTEXT_TOKENS", "800"))
+    # Local SEO score (0-100) gating the edit pass (0 disables either gate):
+    # in combined mode a draft scoring below SEO_EDIT_BELOW is edited even without quality issues,
+    # in standard mode a clean draft scoring at least SEO_SKIP_EDIT_AT skips the edit pass
+    SEO_EDIT_BELOW = float(os.getenv("SEO_EDIT_BELOW", "0"))
+    SEO_SKIP_EDIT_AT = float(os.getenv("SEO_SKIP_EDIT_AT", "0"))
+    # Edit pass latency assumed for time-saved metrics until one runs (0 = use recent posts only)
+    EDIT_SECONDS_ESTIMATE = float(os.getenv("EDIT_SECONDS_ESTIMATE", "0"))
+    # Recent posts whose edit latency seeds the estimate at startup
+    EDIT_LATENCY_HISTORY = 20
 
 
 class ManagerAgent:
     """Orchestrates the multi-agent blog post generation workflow"""
 
     def __init__(self, output_dir: str = None, use_smart_cache: bool = True,
-                 astro_blog_dir: str = None, astro_project_dir: str = None):
+                 astro_blog_dir: str = None, astro_project_dir: str = None,
+                 pipeline_mode: str = None, checkpoint_dir: str = None,
+                 stage_limiter: StageLimiter = None, manifest_path: str = None,
+                 dedup_policy: str = None):
         # Use config defaults if not provided
         self.output_dir = Path(output_dir or Config.DEFAULT_OUTPUT_DIR)
-        self.output_dir.mkdir(exist_ok=True)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._index_lock = threading.Lock()
         self.astro_blog_dir = Path(astro_blog_dir or Config.ASTRO_BLOG_DIR)
         self.astro_project_dir = Path(astro_project_dir or Config.ASTRO_PROJECT_DIR)
+        self.manifest = BlogManifest(manifest_path or Config.BLOG_MANIFEST_PATH)
+        if not self.manifest.path.exists() and any(self.astro_blog_dir.glob("*.md")):
+            # Index posts published before the manifest existed
+            self.manifest.rebuild(self.astro_blog_dir)
         self.use_smart_cache = use_smart_cache
+        self.pipeline_mode = pipeline_mode or Config.PIPELINE_MODE
+        if self.pipeline_mode not in Config.PIPELINE_MODES:
+            raise ValueError(f"Unknown pipeline mode: {self.pipeline_mode}")
+
+        # Concurrency limits per stage group, shared by all jobs using this manager
+        self.stage_limiter = stage_limiter or StageLimiter.from_env()
+
+        self.dedup_policy = dedup_policy or Config.DEDUP_POLICY
+        if self.dedup_policy not in Config.DEDUP_POLICIES:
+            raise ValueError(f"Unknown dedup policy: {self.dedup_policy}")
+        self.post_index = None
+        if self.dedup_policy != "off":
+            index_path = self.output_dir / "post_index.jsonl"
+            rebuild = not index_path.exists()
+            self.post_index = PostIndex(
+                index_path,
+                topic_threshold=Config.DEDUP_TOPIC_THRESHOLD,
+                content_threshold=Config.DEDUP_CONTENT_THRESHOLD
+            )
+            if rebuild:
+                # Index posts generated before deduplication existed
+                self.post_index.rebuild(self._iter_index())
+
+        checkpoint_dir = Config.CHECKPOINT_DIR if checkpoint_dir is None else checkpoint_dir
+        self.checkpoints = CheckpointStore(checkpoint_dir) if checkpoint_dir else None
+
+        # Rendered HTML of finished posts, served by the API until the static build has them
+        self.previews = get_preview_cache()
+
+        # Running average of edit pass latency, used to report time saved by skipped edits
+        self._avg_edit_seconds = self._seed_edit_latency()
 
-        # Initialize agents
+        # Initialize agents (research agents pull in serpapi/chromadb, so import on use)
         if use_smart_cache:
+            from .smart_research_agent import SmartResearchAgent
             self.researcher = SmartResearchAgent()
         else:
+            from .research_agent import ResearchAgent
             self.researcher = ResearchAgent()
 
         self.planner = PlannerAgent()
-        self.writer = WriterAgent()
+        self.writer = WriterAgent(include_editor_requirements=self.pipeline_mode == "combined")
         self.editor = EditorAgent()
 
-    def generate_blog_post(self, topic: str, keyword: str, tone: str) -> Dict[str, Any]:
+    def generate_blog_post(self, topic: str, keyword: str, tone: str,
+                           job_id: Optional[str] = None,
+                           cancel_token: Optional[CancelToken] = None,
+                           allow_duplicate: bool = False) -> Dict[str, Any]:
         """
         Generate a competitive blog post using multi-agent workflow
 
@@ -51,56 +152,250 @@ class ManagerAgent:
             topic: The main topic for the blog post
             keyword: SEO keyword to target
             tone: Writing tone (e.g., 'professional', 'casual', 'technical')
+            job_id: Optional job identifier. Each completed stage is checkpointed
+                under this id, and stages already checkpointed are not re-run.
+            cancel_token: Optional cancellation flag and deadline. It is checked
+                between stages and bounds in-flight SerpAPI, LLM and build calls.
+            allow_duplicate: Generate and publish even if a post on the same topic
+                (or with nearly the same text) was already published
 
         Returns:
             Dict containing the generated content and metadata
+
+        Raises:
+            JobCancelled: If the token was cancelled
+            DeadlineExceeded: If the token's deadline passed
         """
-        logger.info("Manager: Starting competitive research...")
+        with cancel_scope(cancel_token or current_token()), \
+                span("generate_blog_post", trace_key=job_id, job_id=job_id or "", topic=topic,
+                     keyword=keyword, tone=tone, pipeline_mode=self.pipeline_mode) as job_span, \
+                log_context(job_id=job_id, trace_id=job_span.trace_id):
+            result = self._generate_blog_post(topic, keyword, tone, job_id, allow_duplicate)
+            job_span.set_attributes(
+                llm_calls=result["metrics"].get("llm_calls", 0),
+                duplicate=bool(result["metrics"].get("duplicate"))
+            )
+            return result
 
-        # Research phase with smart caching
-        research_context = f"{topic}, {keyword}"
+    @staticmethod
+    def _enter_stage(stage: str) -> None:
+        """Stop if the job was cancelled, otherwise tag subsequent log records with the stage"""
+        check_cancelled(stage)
+        update_log_context(stage=stage)
 
-        if self.use_smart_cache:
-            # Use smart research with caching
-            smart_result = self.researcher.smart_competitive_analysis(keyword=research_context)
-            competitive_data = {
-                'top_competitors': smart_result['top_competitors'],
-                'people_also_ask': smart_result['people_also_ask'],
-                'related_searches': smart_result['related_searches']
-            }
-            trending_data = smart_result['trending_topics']
+    def _generate_blog_post(self, topic: str, keyword: str, tone: str,
+                            job_id: Optional[str], allow_duplicate: bool) -> Dict[str, Any]:
+        checkpoints = {}
+        if job_id and self.checkpoints:
+            checkpoints = self.checkpoints.load(job_id)
 
-            # Add cache info to results
-            if smart_result.get('adaptation_info'):
-                logger.info(f"Adapted from: {smart_result['adaptation_info']['based_on']}")
+        # A post on the same topic skips research, all LLM calls and the rebuild
+        duplicate = None
+        if self.post_index is not None and not allow_duplicate and not checkpoints:
+            duplicate = self.post_index.find_topic_duplicate(topic, keyword, tone)
+            if duplicate:
+                logger.info(
+                    f"Manager: '{topic}' duplicates published post {duplicate['slug']} "
+                    f"(topic similarity {duplicate['similarity']})"
+                )
+                existing = self._duplicate_result(duplicate) if self.dedup_policy == "return" else None
+                if existing:
+                    return existing
+
+        if job_id and self.checkpoints:
+            if checkpoints:
+                logger.info(f"Manager: Resuming job {job_id} after stage '{list(checkpoints)[-1]}'")
+            else:
+                self.checkpoints.save_request(job_id, {"topic": topic, "keyword": keyword, "tone": tone})
+
+        stage_seconds = {}
+        tokens = {}
+        llm_calls = 0
+
+        # Research phase with smart caching
+        research_context = f"{topic}, {keyword}"
 
+        if "research" in checkpoints:
+            competitive_data = checkpoints["research"]["competitive_analysis"]
+            trending_data = checkpoints["research"]["trending_topics"]
         else:
-            # Use traditional research
-            competitive_data = self.researcher.competitive_analysis(keyword=research_context)
-            trending_data = self.researcher.trending_topics(research_context)
+            self._enter_stage("research")
+            logger.info("Manager: Starting competitive research...")
+            stage_start = time.perf_counter()
+            with span("stage.research"), self.stage_limiter.stage("research"):
+                competitive_data, trending_data = self._research(research_context, keyword)
+            stage_seconds["research"] = time.perf_counter() - stage_start
+            self._checkpoint(job_id, "research", {
+                "competitive_analysis": competitive_data,
+                "trending_topics": trending_data
+            })
 
         logger.info(f"Analyzed {len(competitive_data['top_competitors'])} competitors")
         logger.info(f"Found {len(competitive_data['people_also_ask'])} frequently asked questions")
 
         # Planning phase
-        logger.info("Manager: Generating competitive outline...")
-        outline = self.planner.generate_outline({
-            "topic": topic,
-            "keyword": research_context,
-            "tone": tone,
-            "competitors": competitive_data["top_competitors"],
-            "people_ask": competitive_data["people_also_ask"],
-            "related_searches": competitive_data["related_searches"],
-            "trending": trending_data
-        })
+        outline_repairs = {}
+        planner_context = None
+        if "outline" in checkpoints:
+            parsed_outline = Outline.model_validate(checkpoints["outline"]["outline"])
+        else:
+            self._enter_stage("planning")
+            logger.info("Manager: Generating competitive outline...")
+            stage_start = time.perf_counter()
+            # Research is rendered compactly and fitted to the planner's token budget
+            context_inputs, planner_context = build_planner_context(
+                competitive_data, trending_data, Config.PLANNER_CONTEXT_TOKENS
+            )
+            planner_inputs = {
+                "topic": topic,
+                "keyword": research_context,
+                "tone": tone,
+                **context_inputs
+            }
+            # The outline is validated here so a broken one never reaches the writer
+            outline_stats_before = self.planner.outline_stats.snapshot()
+            with span("stage.planning"), self.stage_limiter.stage("llm"):
+                raw_outline, parsed_outline = self.planner.generate_structured_outline(planner_inputs)
+            stage_seconds["planning"] = time.perf_counter() - stage_start
+            outline_repairs = {
+                field: count - outline_stats_before[field]
+                for field, count in self.planner.outline_stats.snapshot().items()
+                if field != "parsed" and count != outline_stats_before[field]
+            }
+            tokens["planner"] = (
+                estimate_prompt_tokens(self.planner.chain, planner_inputs) + estimate_tokens(raw_outline)
+            )
+            llm_calls += 1
+            self._checkpoint(job_id, "outline", {
+                "raw_outline": raw_outline,
+                "outline": parsed_outline.model_dump()
+            })
+        outline = parsed_outline.model_dump_json()
+
+        edit_tokens = 0
+        combined_prompt_tokens = 0
+        edit_skipped = False
+        draft_score = None
+        extra_metrics = {}
+
+        if "final" in checkpoints:
+            draft = checkpoints["draft"]["draft"]
+            final_post = checkpoints["final"]["final_post"]
+            quality_issues = checkpoints["final"].get("quality_issues", [])
+            edit_skipped = checkpoints["final"].get("edit_skipped", False)
 
-        # Writing phase
-        logger.info("Manager: Writing content...")
-        draft = self.writer.write_content(outline, keyword, tone)
+        elif self.pipeline_mode == "sectioned" and "draft" not in checkpoints:
+            # Section-parallel writing and editing
+            self._enter_stage("writing")
+            logger.info(f"Manager: Writing {len(parsed_outline.sections)} sections in parallel...")
+            with span("stage.sections", sections=len(parsed_outline.sections)), self.stage_limiter.stage("llm"):
+                draft, final_post, quality_issues, extra_metrics = self._write_sections(
+                    parsed_outline, keyword, tone, stage_seconds, tokens
+                )
+            llm_calls += 2 * len(parsed_outline.sections)
+            self._checkpoint(job_id, "draft", {"draft": draft})
+            self._checkpoint(job_id, "final", {"final_post": final_post, "quality_issues": quality_issues})
 
-        # Editing phase
-        logger.info("Manager: Editing and polishing...")
-        final_post = self.editor.edit_content(draft)
+        else:
+            # Writing phase
+            if "draft" in checkpoints:
+                draft = checkpoints["draft"]["draft"]
+            else:
+                self._enter_stage("writing")
+                logger.info("Manager: Writing content...")
+                stage_start = time.perf_counter()
+                with span("stage.writing"), self.stage_limiter.stage("llm"):
+                    draft = self.writer.write_content(outline, keyword, tone)
+                stage_seconds["writing"] = time.perf_counter() - stage_start
+                combined_prompt_tokens = self.writer.editing_rules_tokens
+                tokens["writer"] = (
+                    estimate_prompt_tokens(self.writer.chain, {"outline": outline, "keyword": keyword, "tone": tone})
+                    + estimate_tokens(draft)
+                )
+                llm_calls += 1
+                self._checkpoint(job_id, "draft", {"draft": draft})
+
+            # Editing phase (conditional in combined mode)
+            edit_tokens = estimate_prompt_tokens(self.editor.chain, {"draft": draft}) + estimate_tokens(draft)
+            quality_issues = find_quality_issues(draft)
+            draft_score = score_post(draft, keyword, parsed_outline, competitive_data["people_also_ask"])
+            if self.pipeline_mode == "combined":
+                edit_skipped = not quality_issues and draft_score["score"] >= Config.SEO_EDIT_BELOW
+            else:
+                edit_skipped = (
+                    self.pipeline_mode == "standard" and bool(Config.SEO_SKIP_EDIT_AT)
+                    and not quality_issues and draft_score["score"] >= Config.SEO_SKIP_EDIT_AT
+                )
+
+            if edit_skipped:
+                logger.info(
+                    f"Manager: Draft passed local quality check (SEO score {draft_score['score']}), "
+                    "skipping edit pass"
+                )
+                final_post = draft
+            else:
+                if quality_issues:
+                    logger.info(f"Manager: Quality check found {len(quality_issues)} issue(s)")
+                elif self.pipeline_mode == "combined":
+                    logger.info(f"Manager: Draft SEO score {draft_score['score']} is below {Config.SEO_EDIT_BELOW}")
+                self._enter_stage("editing")
+                logger.info("Manager: Editing and polishing...")
+                stage_start = time.perf_counter()
+                with span("stage.editing"), self.stage_limiter.stage("llm"):
+                    final_post = self.editor.edit_content(draft)
+                stage_seconds["editing"] = time.perf_counter() - stage_start
+                tokens["editor"] = edit_tokens
+                llm_calls += 1
+                self._record_edit_latency(stage_seconds["editing"])
+            self._checkpoint(job_id, "final", {
+                "final_post": final_post,
+                "quality_issues": quality_issues,
+                "edit_skipped": edit_skipped
+            })
+
+        # Near-identical text to a published post: skip publishing and the rebuild
+        if self.post_index is not None and not allow_duplicate and duplicate is None:
+            duplicate = self.post_index.find_content_duplicate(final_post)
+            if duplicate:
+                logger.info(
+                    f"Manager: Generated post duplicates {duplicate['slug']} "
+                    f"({duplicate['match']} similarity {duplicate['similarity']})"
+                )
+                existing = self._duplicate_result(duplicate) if self.dedup_policy == "return" else None
+                if existing:
+                    if job_id and self.checkpoints:
+                        self.checkpoints.delete(job_id)
+                    existing["metrics"]["llm_calls"] = llm_calls
+                    return existing
+
+        seo_score = score_post(final_post, keyword, parsed_outline, competitive_data["people_also_ask"])
+
+        tokens_delta = (edit_tokens if edit_skipped else 0) - combined_prompt_tokens
+        metrics = {
+            "pipeline_mode": self.pipeline_mode,
+            "stage_seconds": {stage: round(seconds, 3) for stage, seconds in stage_seconds.items()},
+            "llm_calls": llm_calls,
+            "estimated_tokens": tokens,
+            "quality_issues": quality_issues,
+            "edit_skipped": edit_skipped,
+            # The combined prompt's editing rules cost tokens whether or not the edit is skipped,
+            # so the delta goes negative when the edit runs anyway (or is cheaper than the rules)
+            "estimated_tokens_delta": tokens_delta,
+            "estimated_tokens_saved": max(0, tokens_delta),
+            "combined_prompt_tokens": combined_prompt_tokens,
+            "estimated_seconds_saved": round(self._avg_edit_seconds, 3)
+            if edit_skipped and self._avg_edit_seconds is not None else 0,
+            "outline_repairs": outline_repairs,
+            "planner_context": planner_context,
+            "draft_seo_score": draft_score["score"] if draft_score else None,
+            "resumed_stages": list(checkpoints),
+            "duplicate": self._duplicate_metrics(duplicate, "recorded") if duplicate else None,
+            **extra_metrics
+        }
+        logger.info(
+            f"Pipeline metrics: mode={self.pipeline_mode}, llm_calls={metrics['llm_calls']}, "
+            f"tokens_delta~{metrics['estimated_tokens_delta']}, seo_score={seo_score['score']}"
+        )
 
         # Prepare results
         result = {
@@ -108,28 +403,390 @@ class ManagerAgent:
             "keyword": keyword,
             "tone": tone,
             "outline": outline,
+            "parsed_outline": parsed_outline.model_dump(),
             "draft": draft,
             "final_post": final_post,
             "competitive_analysis": competitive_data,
-            "trending_topics": trending_data
+            "trending_topics": trending_data,
+            "metrics": metrics,
+            "seo_score": seo_score,
+            "content_hash": hashlib.sha256(final_post.encode("utf-8")).hexdigest()
         }
 
         # Save results
-        self._save_results(result)
+        self._enter_stage("publishing")
+        # Visible right away, without queueing behind other jobs' Astro builds for the publish slot
+        slug = self._blog_slug(result)
+        preview_url = self._publish_preview(slug, result, job_id)
+        with span("stage.publishing"), self.stage_limiter.stage("publish"):
+            post_dir = self._save_results(result, slug)
 
-        # Save to Astro blog directory and build
-        blog_slug = self._save_to_astro_blog(result)
-        self._build_astro_project()
+            # Save to Astro blog directory and build
+            blog_slug = self._save_to_astro_blog(result)
+            if self._build_astro_project() and blog_slug:
+                self.previews.mark_built(blog_slug)
 
         # Add blog slug to result for frontend redirect
+        result["output_dir"] = str(post_dir)
         result["blog_slug"] = blog_slug
-        result["blog_url"] = f"/blog/{blog_slug}"
+        result["blog_url"] = f"/blog/{blog_slug}" if blog_slug else None
+        result["preview_url"] = preview_url
+
+        created_at = datetime.now().isoformat()
+        self._append_to_index({
+            "job_id": job_id,
+            "content_hash": result["content_hash"],
+            "output_dir": str(post_dir),
+            "blog_slug": blog_slug,
+            "topic": topic,
+            "keyword": keyword,
+            "tone": tone,
+            "created_at": created_at
+        })
+        if self.post_index is not None:
+            self.post_index.add(
+                final_post,
+                content_hash=result["content_hash"],
+                topic=topic,
+                keyword=keyword,
+                tone=tone,
+                slug=blog_slug,
+                output_dir=str(post_dir),
+                created_at=created_at
+            )
+
+        # The job is complete; its checkpoints are no longer needed
+        if job_id and self.checkpoints:
+            self.checkpoints.delete(job_id)
 
         logger.info("Blog post generated successfully")
         return result
 
-    def _save_results(self, result: Dict[str, Any]) -> None:
-        """Save generation results to files"""
+    def resume_blog_post(self, job_id: str, cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
+        """
+        Resume an interrupted generation from its last completed stage
+
+        Raises:
+            ValueError: If no checkpoints exist for the job
+        """
+        if not self.checkpoints:
+            raise ValueError("Checkpointing is disabled")
+
+        request = self.checkpoints.load_request(job_id)
+        if request is None:
+            raise ValueError(f"No checkpoints found for job {job_id}")
+
+        return self.generate_blog_post(
+            topic=request["topic"],
+            keyword=request["keyword"],
+            tone=request["tone"],
+            job_id=job_id,
+            cancel_token=cancel_token
+        )
+
+    def refresh_blog_post(self, slug: str, job_id: Optional[str] = None,
+                          cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
+        """
+        Bring a published post up to date with fresh research
+
+        Research is fetched again (bypassing the research cache) and diffed
+        against the research the post was written from. Only the sections the
+        new competitors, questions and searches are about are rewritten and
+        edited; the rest of the post is kept. The post keeps its slug and
+        gains an updatedDate; nothing is written if the research is unchanged.
+        Refreshes of the same post (from any process) run one at a time.
+
+        Args:
+            slug: Slug of the published post
+            job_id: Optional job identifier (for logs and traces)
+            cancel_token: Optional cancellation flag and deadline
+
+        Returns:
+            Dict with the same fields as generate_blog_post, with metrics.refresh
+            describing the research diff and the rewritten sections
+
+        Raises:
+            ValueError: If the post or its saved output cannot be found
+        """
+        with cancel_scope(cancel_token or current_token()), \
+                span("refresh_blog_post", trace_key=job_id, job_id=job_id or "", slug=slug) as job_span, \
+                log_context(job_id=job_id, trace_id=job_span.trace_id):
+            if not valid_slug(slug):
+                raise ValueError(f"No published post found for slug {slug}")
+            # flock conflicts between threads too (each open() is its own lock owner)
+            with file_lock(self.output_dir / ".refresh" / f"{slug}.lock"):
+                result = self._refresh_blog_post(slug, job_id)
+            job_span.set_attributes(
+                llm_calls=result["metrics"]["llm_calls"],
+                sections_rewritten=len(result["metrics"]["refresh"]["rewritten"])
+            )
+            return result
+
+    def _refresh_blog_post(self, slug: str, job_id: Optional[str]) -> Dict[str, Any]:
+        entry = self.find_output(slug=slug)
+        astro_path = self.astro_blog_dir / f"{slug}.md"
+        if entry is None or not astro_path.exists():
+            raise ValueError(f"No published post found for slug {slug}")
+        post_dir = Path(entry["output_dir"])
+        try:
+            metadata = json.loads((post_dir / "post_metadata.json").read_text(encoding="utf-8"))
+            old_research = json.loads((post_dir / "competitive_research.json").read_text(encoding="utf-8"))
+            old_post = (post_dir / "post.md").read_text(encoding="utf-8")
+        except (OSError, json.JSONDecodeError) as e:
+            raise ValueError(f"Saved output of post {slug} is unavailable: {e}")
+
+        topic, keyword, tone = entry["topic"], entry["keyword"], entry["tone"]
+        try:
+            outline = Outline.model_validate_json(metadata["outline"])
+        except (KeyError, ValueError):
+            outline = None
+
+        self._enter_stage("research")
+        logger.info(f"Manager: Refreshing research for {slug}...")
+        stage_seconds = {}
+        stage_start = time.perf_counter()
+        with span("stage.research"), self.stage_limiter.stage("research"):
+            competitive_data, trending_data = self._research(f"{topic}, {keyword}", keyword, fresh=True)
+        stage_seconds["research"] = time.perf_counter() - stage_start
+
+        diff = diff_research(old_research, competitive_data)
+        preamble, blocks = split_sections(old_post)
+        sections = match_outline([heading for heading, _ in blocks], outline)
+        assigned, unplaced = assign_changes(sections, diff) if diff["changed"] else ({}, [])
+        if diff["changed"] and not blocks:
+            logger.warning(f"Manager: {slug} has no ## sections; nothing to refresh in place")
+
+        refresh_metrics = {
+            "of": slug,
+            "previous_hash": entry.get("content_hash"),
+            "research_changed": diff["changed"],
+            "diff": summarize_diff(diff),
+            "sections": len(blocks),
+            "rewritten": [sections[index].heading for index in sorted(assigned)],
+            "unplaced": unplaced
+        }
+        logger.info(
+            f"Manager: Research diff for {slug}: {refresh_metrics['diff']['competitors']} competitors, "
+            f"{refresh_metrics['diff']['people_also_ask']} questions; "
+            f"rewriting {len(assigned)} of {len(blocks)} sections"
+        )
+
+        # The sections get the new points on top of their outline points
+        refreshed_outline = Outline(
+            title=outline.title if outline else topic,
+            meta_description=outline.meta_description if outline else "",
+            sections=[
+                OutlineSection(heading=section.heading, bullets=section.bullets + assigned.get(index, []))
+                for index, section in enumerate(sections)
+            ]
+        ) if sections else outline
+
+        bodies = [body for _, body in blocks]
+        tokens = {"writer": 0, "editor": 0}
+        tokens_saved = 0
+        if assigned:
+            self._enter_stage("writing")
+            stage_start = time.perf_counter()
+            with span("stage.sections", sections=len(assigned)), self.stage_limiter.stage("llm"):
+                rewritten = self._rewrite_sections(refreshed_outline, sorted(assigned), keyword, tone, tokens)
+            stage_seconds["writing"] = time.perf_counter() - stage_start
+            for index, body in rewritten.items():
+                bodies[index] = body
+            # What the kept sections would have cost to write and edit again
+            for index, body in enumerate(bodies):
+                if index not in assigned:
+                    inputs = self.writer.section_inputs(refreshed_outline, refreshed_outline.sections[index],
+                                                        keyword, tone)
+                    tokens_saved += (
+                        estimate_prompt_tokens(self.writer.section_chain, inputs)
+                        + estimate_prompt_tokens(self.editor.chain, {"draft": body}) + 2 * estimate_tokens(body)
+                    )
+
+        final_post = old_post
+        if assigned:
+            parts = [preamble] if preamble else []
+            for index, (heading, body) in enumerate(blocks):
+                parts.append(format_section(heading, bodies[index]) if index in assigned
+                             else f"## {heading}\n\n{body}")
+            final_post = "\n\n".join(parts) + "\n"
+
+        llm_calls = 2 * len(assigned)
+        metrics = {
+            "pipeline_mode": "refresh",
+            "stage_seconds": {stage: round(seconds, 3) for stage, seconds in stage_seconds.items()},
+            "llm_calls": llm_calls,
+            "estimated_tokens": tokens,
+            "estimated_tokens_delta": tokens_saved,
+            "estimated_tokens_saved": tokens_saved,
+            "quality_issues": find_quality_issues(final_post),
+            "refresh": refresh_metrics
+        }
+        seo_score = score_post(final_post, keyword, refreshed_outline, competitive_data["people_also_ask"])
+        result = {
+            "topic": topic,
+            "keyword": keyword,
+            "tone": tone,
+            "outline": refreshed_outline.model_dump_json() if refreshed_outline else metadata.get("outline", ""),
+            "parsed_outline": refreshed_outline.model_dump() if refreshed_outline else None,
+            "draft": final_post,
+            "final_post": final_post,
+            "competitive_analysis": competitive_data,
+            "trending_topics": trending_data,
+            "metrics": metrics,
+            "seo_score": seo_score,
+            "content_hash": hashlib.sha256(final_post.encode("utf-8")).hexdigest(),
+            "blog_slug": slug,
+            "blog_url": f"/blog/{slug}",
+            "preview_url": f"/preview/{slug}" if self.previews.get(slug) else None
+        }
+
+        if not assigned:
+            # Nothing to rewrite: the published post and its saved research stay as they are
+            result["output_dir"] = str(post_dir)
+            logger.info(f"Manager: {slug} is up to date")
+            return result
+
+        self._enter_stage("publishing")
+        result["preview_url"] = self._publish_preview(slug, result, job_id)
+        with span("stage.publishing"), self.stage_limiter.stage("publish"):
+            new_dir = self._save_results(result, slug)
+            self._update_astro_post(astro_path, result)
+            if self._build_astro_project():
+                self.previews.mark_built(slug)
+        result["output_dir"] = str(new_dir)
+
+        created_at = datetime.now().isoformat()
+        self._append_to_index({
+            "job_id": job_id,
+            "content_hash": result["content_hash"],
+            "output_dir": str(new_dir),
+            "blog_slug": slug,
+            "topic": topic,
+            "keyword": keyword,
+            "tone": tone,
+            "created_at": created_at,
+            "refreshed_from": entry.get("content_hash")
+        })
+        if self.post_index is not None:
+            self.post_index.add(
+                final_post,
+                content_hash=result["content_hash"],
+                topic=topic,
+                keyword=keyword,
+                tone=tone,
+                slug=slug,
+                output_dir=str(new_dir),
+                created_at=created_at
+            )
+
+        logger.info(f"Blog post {slug} refreshed ({len(assigned)} of {len(blocks)} sections rewritten)")
+        return result
+
+    def _rewrite_sections(self, outline: Outline, indices: List[int], keyword: str, tone: str,
+                          tokens: Dict[str, int]) -> Dict[int, str]:
+        """Write and edit the given outline sections concurrently; returns the edited body per index"""
+        def rewrite(index: int) -> Tuple[str, int, int]:
+            section = outline.sections[index]
+            inputs = self.writer.section_inputs(outline, section, keyword, tone)
+            with span("section", index=index, heading=section.heading):
+                body = self.writer.write_section(outline, section, keyword, tone)
+                edited = self.editor.edit_section(body)
+            return (
+                edited,
+                estimate_prompt_tokens(self.writer.section_chain, inputs) + estimate_tokens(body),
+                estimate_prompt_tokens(self.editor.chain, {"draft": body}) + estimate_tokens(edited)
+            )
+
+        workers = max(1, min(Config.SECTION_CONCURRENCY, len(indices)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="section") as executor:
+            futures = {
+                index: executor.submit(contextvars.copy_context().run, rewrite, index) for index in indices
+            }
+            rewritten = {}
+            for index, future in futures.items():
+                rewritten[index], writer_tokens, editor_tokens = future.result()
+                tokens["writer"] += writer_tokens
+                tokens["editor"] += editor_tokens
+        return rewritten
+
+    def _update_astro_post(self, astro_path: Path, result: Dict[str, Any]) -> None:
+        """Replace a published post's body in place, keeping its frontmatter and adding updatedDate"""
+        content = astro_path.read_text(encoding="utf-8")
+        match = _FRONTMATTER.match(content)
+        frontmatter = match.group(1) if match else ""
+        updated = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        lines = [line for line in frontmatter.splitlines() if not line.startswith("updatedDate:")]
+        lines.append(f'updatedDate: "{updated}"')
+        atomic_write_text(astro_path, "---\n" + "\n".join(lines) + "\n---\n" + result["final_post"])
+        logger.info(f"Blog post updated in Astro directory: {astro_path}")
+
+        fields = parse_frontmatter(content)
+        tags = fields.get("tags")
+        # Supersedes the post's manifest entry in place: the listing keeps its original position
+        self.manifest.append({
+            "slug": result["blog_slug"],
+            "title": fields.get("title", ""),
+            "description": fields.get("description", ""),
+            "pubDate": fields.get("pubDate", ""),
+            "author": fields.get("author"),
+            "tags": tags if isinstance(tags, list) else [],
+            "hash": result["content_hash"]
+        })
+
+    def _research(self, research_context: str, keyword: str,
+                  fresh: bool = False) -> Tuple[Dict[str, Any], List[Dict]]:
+        """Run competitive research, returning (competitive data, trending topics)"""
+        # Trending news is fetched per keyword family, so posts of a campaign
+        # (different topics, same keyword) share one news search
+        if self.use_smart_cache:
+            # Use smart research with caching (bypassed when refreshing a post)
+            research = self.researcher.force_fresh_analysis if fresh else \
+                self.researcher.smart_competitive_analysis
+            smart_result = research(keyword=research_context, trend_keyword=keyword)
+            competitive_data = {
+                'top_competitors': smart_result['top_competitors'],
+                'people_also_ask': smart_result['people_also_ask'],
+                'related_searches': smart_result['related_searches']
+            }
+            trending_data = smart_result['trending_topics']
+
+            # Add cache info to results
+            if smart_result.get('adaptation_info'):
+                logger.info(f"Adapted from: {smart_result['adaptation_info']['based_on']}")
+
+        else:
+            # Use traditional research
+            competitive_data = self.researcher.competitive_analysis(keyword=research_context)
+            trending_data = self.researcher.trending_topics(keyword)
+
+        return competitive_data, trending_data
+
+    def _checkpoint(self, job_id: Optional[str], stage: str, data: Dict[str, Any]) -> None:
+        """Persist a stage checkpoint; failures are logged, never fatal"""
+        if not job_id or not self.checkpoints:
+            return
+        try:
+            self.checkpoints.save(job_id, stage, data)
+        except Exception as e:
+            logger.error(f"Error saving {stage} checkpoint for job {job_id}: {e}")
+
+    def _save_results(self, result: Dict[str, Any], slug: str) -> Path:
+        """
+        Save generation results to a directory of their own
+
+        The directory is named after the post's slug and the hash of its
+        content, so concurrent jobs never overwrite each other, and neither
+        do two posts with the same body (different topics or tones) or the
+        versions of one refreshed post. All files are written atomically.
+
+        Args:
+            result: Generation result
+            slug: Blog slug of the post
+
+        Returns:
+            Directory the results were written to
+        """
+        post_dir = self.output_dir / f"{slug}-{result['content_hash'][:16]}"
 
         # Save complete metadata
         metadata = {
@@ -138,42 +795,192 @@ class ManagerAgent:
             "tone": result["tone"],
             "outline": result["outline"],
             "competitive_analysis": result["competitive_analysis"],
-            "trending_topics": result["trending_topics"]
+            "trending_topics": result["trending_topics"],
+            "metrics": result.get("metrics"),
+            "seo_score": result.get("seo_score")
         }
-
-        with open(self.output_dir / "post_metadata.json", "w", encoding="utf-8") as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        atomic_write_json(post_dir / "post_metadata.json", metadata)
 
         # Save competitive research separately
-        with open(self.output_dir / "competitive_research.json", "w", encoding="utf-8") as f:
-            json.dump(result["competitive_analysis"], f, ensure_ascii=False, indent=2)
+        atomic_write_json(post_dir / "competitive_research.json", result["competitive_analysis"])
 
         # Save final blog post
-        with open(self.output_dir / "post.md", "w", encoding="utf-8") as f:
-            f.write(result["final_post"])
+        atomic_write_text(post_dir / "post.md", result["final_post"])
+
+        logger.info(f"Files saved to {post_dir}/")
+        return post_dir
+
+    def _append_to_index(self, entry: Dict[str, Any]) -> None:
+        """Append a lookup entry to the output index (one JSON object per line)"""
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._index_lock, file_lock(self.output_dir / ".index.jsonl.lock"):
+            # A single appended line is never observed half-written by readers
+            with open(self.output_dir / "index.jsonl", "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def find_output(self, job_id: Optional[str] = None, slug: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Look up the most recent saved output for a job id or blog slug
+
+        Returns:
+            Index entry with the output directory, or None if not found
+        """
+        match = None
+        for entry in self._iter_index():
+            if (job_id and entry.get("job_id") == job_id) or (slug and entry.get("blog_slug") == slug):
+                match = entry
+        return match
+
+    def _iter_index(self):
+        """Iterate over the entries of the output index, oldest first"""
+        index_path = self.output_dir / "index.jsonl"
+        if not index_path.exists():
+            return
+
+        with open(index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def _recent_index_entries(self, count: int) -> List[Dict[str, Any]]:
+        """The last count entries of the output index, read back from its end"""
+        index_path = self.output_dir / "index.jsonl"
+        data = b""
+        try:
+            with open(index_path, "rb") as f:
+                position = f.seek(0, os.SEEK_END)
+                # One line more than needed, as the first block may start mid-line
+                while position > 0 and data.count(b"\n") <= count:
+                    step = min(65536, position)
+                    position -= step
+                    f.seek(position)
+                    data = f.read(step) + data
+        except OSError:
+            return []
 
-        logger.info("Files saved to ./output_hierarchical/")
+        lines = data.splitlines()
+        if position > 0:
+            lines = lines[1:]
+        entries = []
+        for line in lines[-count:]:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return entries
+
+    def _duplicate_result(self, duplicate: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Build a generation result from an already published post
+
+        Returns:
+            The existing post's result, or None if its output files are gone
+        """
+        post_dir = Path(duplicate["output_dir"])
+        try:
+            metadata = json.loads((post_dir / "post_metadata.json").read_text(encoding="utf-8"))
+            final_post = (post_dir / "post.md").read_text(encoding="utf-8")
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Manager: Output of duplicate {duplicate['slug']} is unavailable: {e}")
+            return None
 
-    def _save_to_astro_blog(self, result: Dict[str, Any]) -> None:
-        """Save blog post to Astro blog directory with proper frontmatter"""
+        outline = metadata["outline"]
+        try:
+            parsed_outline = Outline.model_validate_json(outline).model_dump()
+        except ValueError:
+            parsed_outline = None
+        slug = duplicate.get("slug")
+
+        return {
+            "topic": metadata["topic"],
+            "keyword": duplicate["keyword"],
+            "tone": metadata["tone"],
+            "outline": outline,
+            "parsed_outline": parsed_outline,
+            "draft": final_post,
+            "final_post": final_post,
+            "competitive_analysis": metadata["competitive_analysis"],
+            "trending_topics": metadata["trending_topics"],
+            "metrics": {
+                "pipeline_mode": self.pipeline_mode,
+                "llm_calls": 0,
+                "duplicate": self._duplicate_metrics(duplicate, "returned")
+            },
+            "seo_score": metadata.get("seo_score"),
+            "content_hash": duplicate["content_hash"],
+            "output_dir": str(post_dir),
+            "blog_slug": slug,
+            "blog_url": f"/blog/{slug}" if slug else None,
+            "preview_url": f"/preview/{slug}" if slug and self.previews.get(slug) else None
+        }
+
+    @staticmethod
+    def _duplicate_metrics(duplicate: Dict[str, Any], action: str) -> Dict[str, Any]:
+        return {
+            "of": duplicate.get("slug"),
+            "topic": duplicate["topic"],
+            "match": duplicate["match"],
+            "similarity": duplicate["similarity"],
+            "action": action
+        }
+
+    @staticmethod
+    def _blog_slug(result: Dict[str, Any]) -> str:
+        """Slug of a post from its topic; the content hash keeps same topic/tone posts apart"""
+        topic_slug = result["topic"].lower().replace(" ", "-").replace("'", "").replace(":", "")
+        topic_slug = "".join(char for char in topic_slug if char.isalnum() or char == "-")
+        return f"{topic_slug}-{result['tone']}-{result['content_hash'][:8]}"
+
+    def _publish_preview(self, slug: str, result: Dict[str, Any], job_id: Optional[str] = None) -> Optional[str]:
+        """
+        Render the final post into the preview cache (the job's status links it from then on)
+
+        Returns:
+            Preview URL, or None if rendering failed (publishing goes on without it)
+        """
+        try:
+            with span("preview.render", slug=slug):
+                self.previews.put(
+                    slug,
+                    result["final_post"],
+                    title=result["topic"].capitalize(),
+                    description=f"A comprehensive guide about {result['topic']}",
+                    content_hash=result["content_hash"],
+                    job_id=job_id
+                )
+        except Exception as e:
+            logger.warning(f"Manager: Could not render preview of {slug}: {e}")
+            return None
+        return f"/preview/{slug}"
+
+    def _save_to_astro_blog(self, result: Dict[str, Any]) -> Optional[str]:
+        """
+        Save blog post to Astro blog directory with proper frontmatter
+
+        Returns:
+            Blog slug of the saved post, or None if saving failed
+        """
         try:
             # Create filename from topic
-            topic_slug = result["topic"].lower().replace(" ", "-").replace("'", "").replace(":", "")
-            topic_slug = "".join(char for char in topic_slug if char.isalnum() or char == "-")
-            filename = f"{topic_slug}-{result['tone']}.md"
+            blog_slug = self._blog_slug(result)
+            filename = f"{blog_slug}.md"
 
             # Get current date and time for frontmatter
             current_date = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
 
             # Generate relevant tags from topic and keyword
             tags = self._generate_tags(result['topic'], result['keyword'])
+            title = result['topic'].capitalize()
+            description = f"A comprehensive guide about {result['topic']}"
 
-            # Create Astro frontmatter
+            # Create Astro frontmatter (JSON-encoded values are valid YAML, whatever quotes the topic has)
             frontmatter = f"""---
-title: "{result['topic'].capitalize()}"
-description: "A comprehensive guide about {result['topic']}"
+title: {json.dumps(title, ensure_ascii=False)}
+description: {json.dumps(description, ensure_ascii=False)}
 pubDate: "{current_date}"
-author: "SEO Manager"
+author: {json.dumps(Config.POST_AUTHOR, ensure_ascii=False)}
 tags: {tags}
 ---
 """
@@ -181,15 +988,26 @@ tags: {tags}
             # Combine frontmatter with content
             astro_content = frontmatter + result["final_post"]
 
-            # Save to Astro blog directory
-            astro_file_path = self.astro_blog_dir / filename
-            with open(astro_file_path, "w", encoding="utf-8") as f:
-                f.write(astro_content)
+            # Atomic write so the dev server's file watcher never sees a partial post
+            astro_file_path = atomic_write_text(self.astro_blog_dir / filename, astro_content)
 
             logger.info(f"Blog post saved to Astro directory: {astro_file_path}")
 
+            # One appended manifest line; the blog lists posts from it without a full scan
+            self.manifest.append({
+                "slug": blog_slug,
+                "title": title,
+                "description": description,
+                "pubDate": current_date,
+                "author": Config.POST_AUTHOR,
+                "tags": json.loads(tags),
+                "hash": result["content_hash"]
+            })
+            return blog_slug
+
         except Exception as e:
             logger.error(f"Error saving to Astro blog directory: {e}")
+            return None
 
     def _generate_tags(self, topic: str, keyword: str) -> str:
         """Generate relevant tags from topic and keyword"""
@@ -202,8 +1020,8 @@ tags: {tags}
         # Extract words from topic (filter out common words)
         common_words = {'a', 'an', 'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'about', 'how', 'what', 'when', 'where', 'why', 'who', 'which'}
 
-        topic_words = [word.lower().strip('.,!?:;') for word in topic.split()
-                      if word.lower().strip('.,!?:;') not in common_words and len(word) > 2]
+        topic_words = [word.lower().strip('.,!?:;"\'') for word in topic.split()
+                      if word.lower().strip('.,!?:;"\'') not in common_words and len(word) > 2]
 
         # Add up to 3 meaningful words from topic
         for word in topic_words[:3]:
@@ -213,41 +1031,150 @@ tags: {tags}
         # Add generic tags
         tags.extend(["guide", "tutorial"])
 
-        # Format as JSON array for YAML
-        formatted_tags = [f'"{tag}"' for tag in tags[:5]]  # Limit to 5 tags
-        return f"[{', '.join(formatted_tags)}]"
+        # Format as JSON array for YAML (escapes quotes in keywords)
+        return json.dumps(tags[:5], ensure_ascii=False)  # Limit to 5 tags
+
+    def _build_astro_project(self) -> bool:
+        """
+        Build the Astro project after adding new content
 
-    def _build_astro_project(self) -> None:
-        """Build the Astro project after adding new content"""
+        Returns:
+            True if the site now serves the new content (built, or reloaded by the dev server)
+        """
         # Check if we're in development mode
         environment = os.getenv('ENVIRONMENT', 'development')
 
         if environment == 'development':
             logger.info("Development mode: Skipping build - Astro dev server will auto-reload")
-            return
+            return True
 
         try:
             logger.info("Production mode: Building Astro project...")
+            timeout = call_timeout(Config.BUILD_TIMEOUT_SECONDS)
 
-            # Change to Astro project directory and run build
-            result = subprocess.run(
-                ["npm", "run", "build"],
-                cwd=self.astro_project_dir,
-                capture_output=True,
-                text=True,
-                timeout=300  # 5 minute timeout
-            )
+            # Change to Astro project directory and run build. The stage limiter only
+            # covers this process; the file lock keeps worker processes from building at once
+            with span("astro.build", timeout_seconds=round(timeout, 1)) as build_span, \
+                    file_lock(self.astro_project_dir / ".build.lock"):
+                process = subprocess.Popen(
+                    ["npm", "run", "build"],
+                    cwd=self.astro_project_dir,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True
+                )
+                stdout, stderr = self._wait_for_build(process, timeout)
+                build_span.set_attribute("returncode", process.returncode)
 
-            if result.returncode == 0:
+            if process.returncode == 0:
                 logger.info("Astro project built successfully")
-                logger.info(f"Build output: {result.stdout}")
-            else:
-                logger.error(f"Astro build failed: {result.stderr}")
+                # Build output is large; keep only its tail, and only at debug level
+                logger.debug("Build output (tail): %s", stdout[-Config.BUILD_LOG_TAIL_CHARS:])
+                return True
+            logger.error("Astro build failed (stderr tail): %s", stderr[-Config.BUILD_LOG_TAIL_CHARS:])
 
         except subprocess.TimeoutExpired:
-            logger.error("Astro build timed out after 5 minutes")
+            logger.error(f"Astro build timed out after {timeout:.0f}s")
+        except JobAborted:
+            raise
         except Exception as e:
             logger.error(f"Error building Astro project: {e}")
+        return False
+
+    def _wait_for_build(self, process: subprocess.Popen, timeout: float) -> Tuple[str, str]:
+        """
+        Wait for the build process, killing it on timeout or job cancellation
+
+        Raises:
+            subprocess.TimeoutExpired: If the build outlived the timeout
+            JobAborted: If the job was cancelled or its deadline passed
+        """
+        deadline = time.monotonic() + timeout
+        token = current_token()
+        while True:
+            try:
+                return process.communicate(timeout=POLL_SECONDS)
+            except subprocess.TimeoutExpired:
+                pass
+
+            if time.monotonic() >= deadline or (token is not None and token.aborted):
+                process.kill()
+                process.communicate()
+                if token is not None:
+                    token.check("build completion")
+                raise subprocess.TimeoutExpired(process.args, timeout)
+
+    def _write_sections(self, outline: Outline, keyword: str, tone: str,
+                        stage_seconds: Dict[str, float],
+                        tokens: Dict[str, int]) -> Tuple[str, str, List[str], Dict[str, Any]]:
+        """
+        Write and edit each outline section concurrently, then stitch the post
+
+        Wall-clock time is bounded by the slowest section rather than the
+        length of the whole post.
+
+        Returns:
+            (draft, final_post, quality_issues, section metrics)
+        """
+        sections = outline.sections
+        section_seconds = [0.0] * len(sections)
+        section_tokens = [(0, 0)] * len(sections)
+
+        def draft_section(index: int) -> Tuple[str, str]:
+            start = time.perf_counter()
+            inputs = self.writer.section_inputs(outline, sections[index], keyword, tone)
+            with span("section", index=index, heading=sections[index].heading):
+                body = self.writer.write_section(outline, sections[index], keyword, tone)
+                edited = self.editor.edit_section(body)
+            section_seconds[index] = time.perf_counter() - start
+            section_tokens[index] = (
+                estimate_prompt_tokens(self.writer.section_chain, inputs) + estimate_tokens(body),
+                estimate_prompt_tokens(self.editor.chain, {"draft": body}) + estimate_tokens(edited)
+            )
+            return body, edited
+
+        stage_start = time.perf_counter()
+        workers = max(1, min(Config.SECTION_CONCURRENCY, len(sections)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="section") as executor:
+            # Each section runs in a copy of the job's context (e.g. its LLM priority)
+            futures = [
+                executor.submit(contextvars.copy_context().run, draft_section, index)
+                for index in range(len(sections))
+            ]
+            results = [future.result() for future in futures]
+        stage_seconds["writing"] = time.perf_counter() - stage_start
+
+        tokens["writer"] = sum(writer for writer, _ in section_tokens)
+        tokens["editor"] = sum(editor for _, editor in section_tokens)
+
+        draft = stitch_sections(outline, [body for body, _ in results])
+        final_post = stitch_sections(outline, [edited for _, edited in results])
+
+        return draft, final_post, find_quality_issues(final_post), {
+            "sections": len(sections),
+            "section_concurrency": workers,
+            "section_seconds": [round(seconds, 3) for seconds in section_seconds]
+        }
+
+    def _seed_edit_latency(self) -> Optional[float]:
+        """Average edit pass latency of recent posts, else EDIT_SECONDS_ESTIMATE (None if neither)"""
+        samples = []
+        for entry in self._recent_index_entries(Config.EDIT_LATENCY_HISTORY):
+            try:
+                metadata = json.loads((Path(entry["output_dir"]) / "post_metadata.json").read_text(encoding="utf-8"))
+                samples.append(float(metadata["metrics"]["stage_seconds"]["editing"]))
+            except (OSError, KeyError, TypeError, ValueError):
+                continue
+        if samples:
+            return sum(samples) / len(samples)
+        return Config.EDIT_SECONDS_ESTIMATE or None
+
+    def _record_edit_latency(self, seconds: float) -> None:
+        """Update the running average of edit pass latency"""
+        if self._avg_edit_seconds is None:
+            self._avg_edit_seconds = seconds
+        else:
+            self._avg_edit_seconds = 0.8 * self._avg_edit_seconds + 0.2 * seconds
 
     def get_cache_stats(self) -> Dict[str, Any]:
         """Get cache performance statistics if using smart cache"""
@@ -255,6 +1182,14 @@ tags: {tags}
             return self.researcher.get_cache_statistics()
         return {"cache_enabled": False}
 
+    def list_resumable_jobs(self) -> List[Dict[str, Any]]:
+        """List interrupted jobs that have checkpoints on disk"""
+        return self.checkpoints.list_jobs() if self.checkpoints else []
+
+    def get_outline_stats(self) -> Dict[str, int]:
+        """Get counters for outline parsing, repairs and planner retries"""
+        return self.planner.outline_stats.snapshot()
+
     def clear_cache(self) -> bool:
         """Clear cache if using smart cache"""
         if self.use_smart_cache and hasattr(self.researcher, 'clear_cache'):
@@ -0,0 +1,449 @@
+"""
+Per-stage model routing for LLM calls
+
+Each stage (planner, writer, editor) has an ordered list of candidate
+models. A call goes to the best candidate according to the routing policy
+and falls back to the next one on a timeout or a 429. A model that just
+failed that way is moved to the back of the list for a cool-down period.
+
+Policies:
+    static: candidates in their configured order
+    adaptive: lowest observed p95 latency plus a weighted cost estimate;
+        models with too few samples, or not used for a while, are scored on
+        cost alone so they get (re)sampled
+
+Hedging: once a stage/model pair has enough samples, a call that is still
+running after its latency percentile (e.g. p95) gets a duplicate request,
+and the first response wins. Hedges are capped at a fraction of calls and
+take their own slot in the client pool, so they are skipped when the pool
+is full or out of budget. The losing request is not cancelled; its result
+is discarded, but its tokens are charged to the pool's budget.
+
+Retries: the model clients are built with few or no retries of their own
+(GEMINI_MAX_RETRIES), so a throttled or failing request comes back to the
+router, which falls back to the next candidate at once. Only when every
+candidate has failed does it back off and try the list again, up to
+LLM_MAX_RETRIES rounds and never past the job's deadline; each request's
+timeout is capped by the time the job has left.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.runnables import Runnable
+
+from .cancellation import JobAborted, POLL_SECONDS, current_token
+from .tokens import estimate_tokens
+from utils.tracing import get_tracer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gemini-1.5-flash"
+STAGES = ("planner", "writer", "editor")
+
+# Upper bound on a single LLM request
+LLM_TIMEOUT_SECONDS = 120.0
+
+# USD per million tokens (input, output); override with LLM_MODEL_COSTS
+DEFAULT_COSTS = {
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-flash-8b": (0.0375, 0.15),
+    "gemini-1.5-pro": (1.25, 5.00),
+}
+
+_LATENCY_SAMPLES = 200
+
+
+def fallback_reason(error: BaseException) -> Optional[str]:
+    """Why an error should move the call to another model ("rate_limited", "timeout", "unavailable"), or None"""
+    if isinstance(error, JobAborted):
+        # The job itself was cancelled or ran out of time
+        return None
+    name = type(error).__name__
+    text = str(error).lower()
+    if name in ("ResourceExhausted", "TooManyRequests") or "429" in text or "resource has been exhausted" in text:
+        return "rate_limited"
+    if isinstance(error, TimeoutError) or "timeout" in name.lower() or name == "DeadlineExceeded" \
+            or "timed out" in text:
+        return "timeout"
+    if name in ("ServiceUnavailable", "InternalServerError", "InternalError") or "503" in text:
+        return "unavailable"
+    return None
+
+
+def _percentile(values, fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class _ModelStats:
+    """Observed behaviour of one model in one stage"""
+
+    __slots__ = ("latencies", "output_tokens", "calls", "errors", "rate_limited", "timeouts",
+                 "cooldown_until", "last_used")
+
+    def __init__(self):
+        self.latencies = deque(maxlen=_LATENCY_SAMPLES)
+        self.output_tokens = deque(maxlen=_LATENCY_SAMPLES)
+        self.calls = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.timeouts = 0
+        self.cooldown_until = 0.0
+        self.last_used = 0.0
+
+
+class RoutedChatModel(Runnable):
+    """Runnable standing in for a chat model: each call is routed by the ModelRouter"""
+
+    def __init__(self, router: "ModelRouter", stage: str, temperature: float):
+        self.router = router
+        self.stage = stage
+        self.temperature = temperature
+
+    def invoke(self, input: Any, config: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Any:
+        return self.router.call(self.stage, self.temperature, input, config, kwargs)
+
+
+class ModelRouter:
+    """Chooses a model per LLM call, hedges slow calls and falls back on failures"""
+
+    def __init__(self, pool, stage_models: Dict[str, List[str]], policy: str = "static",
+                 hedge_percentile: float = 0.95, hedge_min_seconds: float = 2.0,
+                 hedge_budget: float = 0.1, min_samples: int = 20, explore_seconds: float = 300.0,
+                 cost_weight: float = 100.0, cooldown_seconds: float = 30.0,
+                 costs: Optional[Dict[str, Tuple[float, float]]] = None,
+                 max_retries: int = 2, retry_backoff: float = 2.0):
+        """
+        Args:
+            pool: LLMClientPool providing the model clients
+            stage_models: Candidate models per stage, preferred first
+            policy: "static" or "adaptive"
+            hedge_percentile: Latency percentile after which a call is hedged (0 disables)
+            hedge_min_seconds: Never hedge before this many seconds
+            hedge_budget: Maximum fraction of calls that may be hedged
+            min_samples: Latency samples needed before hedging or adaptive scoring uses them
+            explore_seconds: Idle time after which the adaptive policy samples a model again
+            cost_weight: Seconds of latency worth one USD in the adaptive score
+            cooldown_seconds: How long a model that timed out or was throttled is demoted
+            costs: USD per million (input, output) tokens per model
+            max_retries: Further rounds over the candidates once all of them failed
+            retry_backoff: Seconds before the first retry round, doubled on each further one
+        """
+        if policy not in ("static", "adaptive"):
+            raise ValueError(f"Unknown LLM_ROUTING policy: {policy}")
+
+        self.pool = pool
+        self.stage_models = {stage: list(models) or [DEFAULT_MODEL] for stage, models in stage_models.items()}
+        self.policy = policy
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_seconds = hedge_min_seconds
+        self.hedge_budget = hedge_budget
+        self.min_samples = min_samples
+        self.explore_seconds = explore_seconds
+        self.cost_weight = cost_weight
+        self.cooldown_seconds = cooldown_seconds
+        self.costs = {**DEFAULT_COSTS, **(costs or {})}
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+
+        self._lock = threading.Lock()
+        self._models: Dict[Tuple[str, str], _ModelStats] = {}
+        self._stats = {"calls": 0, "hedges": 0, "hedges_skipped": 0, "hedge_wins": 0, "fallbacks": 0, "retries": 0}
+
+    @classmethod
+    def from_env(cls, pool) -> "ModelRouter":
+        """
+        Build a router from LLM_MODELS_PLANNER, LLM_MODELS_WRITER,
+        LLM_MODELS_EDITOR (comma-separated, preferred first), LLM_ROUTING,
+        LLM_HEDGE_PERCENTILE, LLM_HEDGE_MIN_SECONDS, LLM_HEDGE_BUDGET,
+        LLM_COST_WEIGHT, LLM_MODEL_COSTS (JSON: model -> [input, output]),
+        LLM_MAX_RETRIES and LLM_RETRY_BACKOFF_SECONDS
+        """
+        stage_models = {
+            stage: [model.strip() for model in os.getenv(f"LLM_MODELS_{stage.upper()}", DEFAULT_MODEL).split(",")
+                    if model.strip()]
+            for stage in STAGES
+        }
+        costs = {model: tuple(prices) for model, prices in
+                 json.loads(os.getenv("LLM_MODEL_COSTS", "{}") or "{}").items()}
+        return cls(
+            pool,
+            stage_models,
+            policy=os.getenv("LLM_ROUTING", "static").lower(),
+            hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95")),
+            hedge_min_seconds=float(os.getenv("LLM_HEDGE_MIN_SECONDS", "2.0")),
+            hedge_budget=float(os.getenv("LLM_HEDGE_BUDGET", "0.1")),
+            cost_weight=float(os.getenv("LLM_COST_WEIGHT", "100")),
+            costs=costs,
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+            retry_backoff=float(os.getenv("LLM_RETRY_BACKOFF_SECONDS", "2.0"))
+        )
+
+    def runnable(self, stage: str, temperature: float) -> RoutedChatModel:
+        """Get the chat model runnable for a stage's chain"""
+        if stage not in self.stage_models:
+            raise ValueError(f"Unknown LLM stage: {stage}")
+        return RoutedChatModel(self, stage, temperature)
+
+    def candidates(self, stage: str, input_tokens: int = 0) -> List[str]:
+        """Models to try for a call, in order"""
+        models = self.stage_models[stage]
+        now = time.monotonic()
+        with self._lock:
+            if self.policy == "adaptive":
+                models = sorted(models, key=lambda model: self._score(stage, model, input_tokens))
+            # Recently throttled or timed-out models go last (stable for the rest)
+            return sorted(models, key=lambda model: self._model(stage, model).cooldown_until > now)
+
+    def call(self, stage: str, temperature: float, input: Any, config: Optional[Dict[str, Any]],
+             kwargs: Dict[str, Any]) -> Any:
+        """Run one LLM call with routing, hedging, fallback and retries"""
+        prompt = input.to_string() if hasattr(input, "to_string") else str(input)
+        input_tokens = estimate_tokens(prompt)
+        kwargs = {key: value for key, value in kwargs.items() if value is not None}
+        timeout = kwargs.pop("timeout", LLM_TIMEOUT_SECONDS)
+        token = current_token()
+
+        with self._lock:
+            self._stats["calls"] += 1
+
+        call_span = get_tracer().current_span()
+        last_error: Optional[BaseException] = None
+        for retry in range(self.max_retries + 1):
+            if retry:
+                self._backoff(stage, retry, last_error)
+            models = self.candidates(stage, input_tokens)
+            for position, model in enumerate(models):
+                # Each request gets the default timeout, capped by the job's remaining time
+                request_kwargs = {**kwargs, "timeout": token.timeout(timeout) if token is not None else timeout}
+                try:
+                    output, hedged = self._call_hedged(stage, model, temperature, input, config, request_kwargs,
+                                                       input_tokens)
+                except JobAborted:
+                    raise
+                except Exception as e:
+                    reason = fallback_reason(e)
+                    self._record_failure(stage, model, reason)
+                    if reason is None:
+                        raise
+                    last_error = e
+                    if position < len(models) - 1:
+                        logger.warning(f"LLM {stage}: {model} failed ({reason}), falling back to {models[position + 1]}")
+                        with self._lock:
+                            self._stats["fallbacks"] += 1
+                    continue
+
+                if call_span is not None:
+                    call_span.set_attributes(model=model, fallback=position > 0, hedged=hedged, retries=retry)
+                return output
+        raise last_error
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Routing counters and per-stage model latency"""
+        with self._lock:
+            stages = {}
+            for stage, models in self.stage_models.items():
+                stages[stage] = {}
+                for model in models:
+                    stats = self._model(stage, model)
+                    p50 = _percentile(stats.latencies, 0.5)
+                    p95 = _percentile(stats.latencies, 0.95)
+                    stages[stage][model] = {
+                        "calls": stats.calls,
+                        "errors": stats.errors,
+                        "rate_limited": stats.rate_limited,
+                        "timeouts": stats.timeouts,
+                        "latency_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                        "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None
+                    }
+            return {"policy": self.policy, "hedge_percentile": self.hedge_percentile, **self._stats,
+                    "stages": stages}
+
+    def _model(self, stage: str, model: str) -> _ModelStats:
+        # Caller holds the lock
+        key = (stage, model)
+        stats = self._models.get(key)
+        if stats is None:
+            stats = self._models[key] = _ModelStats()
+        return stats
+
+    def _score(self, stage: str, model: str, input_tokens: int) -> float:
+        """Adaptive policy score (lower is better): p95 seconds plus weighted USD cost (caller holds the lock)"""
+        stats = self._model(stage, model)
+        if len(stats.latencies) < self.min_samples or time.monotonic() - stats.last_used > self.explore_seconds:
+            # Unknown or stale: optimistic, so the model gets sampled
+            latency = 0.0
+        else:
+            latency = _percentile(stats.latencies, 0.95)
+        output_tokens = sum(stats.output_tokens) / len(stats.output_tokens) if stats.output_tokens else input_tokens
+        input_price, output_price = self.costs.get(model, (0.0, 0.0))
+        cost = (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+        return latency + self.cost_weight * cost
+
+    def _hedge_delay(self, stage: str, model: str) -> Optional[float]:
+        """Seconds after which to hedge a call, or None if it should not be hedged"""
+        if not self.hedge_percentile:
+            return None
+        with self._lock:
+            stats = self._model(stage, model)
+            if len(stats.latencies) < self.min_samples:
+                return None
+            return max(self.hedge_min_seconds, _percentile(stats.latencies, self.hedge_percentile))
+
+    def _take_hedge(self, input_tokens: int) -> bool:
+        """Whether to hedge now: within the hedge budget and with a free pool slot (released by the hedge)"""
+        with self._lock:
+            if self._stats["hedges"] + 1 > self.hedge_budget * self._stats["calls"]:
+                return False
+            if not self.pool.try_acquire(input_tokens):
+                self._stats["hedges_skipped"] += 1
+                return False
+            self._stats["hedges"] += 1
+            return True
+
+    def _call_once(self, stage: str, model: str, temperature: float, input: Any,
+                   config: Optional[Dict[str, Any]], kwargs: Dict[str, Any]) -> Any:
+        llm = self.pool.bind(model, temperature).bind(**kwargs)
+        with self._lock:
+            self._model(stage, model).last_used = time.monotonic()
+        start = time.perf_counter()
+        output = llm.invoke(input, config)
+        elapsed = time.perf_counter() - start
+        text = getattr(output, "content", output)
+        with self._lock:
+            stats = self._model(stage, model)
+            stats.calls += 1
+            stats.latencies.append(elapsed)
+            stats.output_tokens.append(estimate_tokens(text if isinstance(text, str) else str(text)))
+        return output
+
+    def _call_hedged(self, stage: str, model: str, temperature: float, input: Any,
+                     config: Optional[Dict[str, Any]], kwargs: Dict[str, Any],
+                     input_tokens: int = 0) -> Tuple[Any, bool]:
+        """Call a model, sending a duplicate request if the first one is slow; returns (output, hedged)"""
+        delay = self._hedge_delay(stage, model)
+        if delay is None:
+            return self._call_once(stage, model, temperature, input, config, kwargs), False
+
+        results: "queue.SimpleQueue[Tuple[str, bool, Any]]" = queue.SimpleQueue()
+        winner_lock = threading.Lock()
+        winner: List[str] = []
+
+        def attempt(label: str) -> None:
+            try:
+                output = self._call_once(stage, model, temperature, input, config, kwargs)
+            except Exception as e:
+                results.put((label, False, e))
+                return
+            finally:
+                if label == "hedge":
+                    self.pool.release()
+            with winner_lock:
+                won = not winner
+                if won:
+                    winner.append(label)
+                    results.put((label, True, output))
+            if not won:
+                # The caller charges the winning output; the discarded one was generated too
+                text = getattr(output, "content", output)
+                self.pool.record_tokens(estimate_tokens(text if isinstance(text, str) else str(text)))
+
+        def start(label: str) -> None:
+            # Copy the context so the request joins the job's trace and cancellation scope
+            context = contextvars.copy_context()
+            threading.Thread(target=context.run, args=(attempt, label), name=f"llm-{label}", daemon=True).start()
+
+        start("primary")
+        running = 1
+        hedge_decided = False
+        hedge_started = False
+        deadline = time.monotonic() + delay
+        token = current_token()
+        first_error = None
+
+        while running:
+            wait = POLL_SECONDS if token is not None else None
+            if not hedge_decided:
+                remaining = deadline - time.monotonic()
+                wait = remaining if wait is None else min(wait, remaining)
+            try:
+                label, ok, value = results.get(timeout=max(0.0, wait) if wait is not None else None)
+            except queue.Empty:
+                if token is not None:
+                    token.check("LLM call")
+                if not hedge_decided and time.monotonic() >= deadline:
+                    hedge_decided = True
+                    if self._take_hedge(input_tokens):
+                        logger.debug(f"LLM {stage}: hedging {model} after {delay:.1f}s")
+                        start("hedge")
+                        hedge_started = True
+                        running += 1
+                continue
+
+            running -= 1
+            if ok:
+                if label == "hedge":
+                    with self._lock:
+                        self._stats["hedge_wins"] += 1
+                return value, hedge_started
+            first_error = first_error or value
+            # The primary failed before the hedge point: no hedge, let fallback handle it
+            hedge_decided = True
+
+        raise first_error
+
+    def _backoff(self, stage: str, retry: int, error: BaseException) -> None:
+        """Wait before another round over the candidates, or re-raise if the job's deadline comes first"""
+        delay = self.retry_backoff * 2 ** (retry - 1)
+        token = current_token()
+        remaining = token.remaining() if token is not None else None
+        if remaining is not None and remaining <= delay:
+            raise error
+        logger.warning(f"LLM {stage}: all models failed ({fallback_reason(error)}), retry {retry}/{self.max_retries} "
+                       f"in {delay:.1f}s")
+        with self._lock:
+            self._stats["retries"] += 1
+        wake = time.monotonic() + delay
+        while True:
+            left = wake - time.monotonic()
+            if left <= 0:
+                return
+            if token is not None:
+                token.check("LLM retry")
+            time.sleep(min(left, POLL_SECONDS) if token is not None else left)
+
+    def _record_failure(self, stage: str, model: str, reason: Optional[str]) -> None:
+        with self._lock:
+            stats = self._model(stage, model)
+            stats.errors += 1
+            if reason == "rate_limited":
+                stats.rate_limited += 1
+            elif reason == "timeout":
+                stats.timeouts += 1
+            if reason is not None:
+                stats.cooldown_until = time.monotonic() + self.cooldown_seconds
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """Get the process-wide model router, configured from the environment"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                from .llm_pool import get_llm_pool
+                _router = ModelRouter.from_env(get_llm_pool())
+    return _router
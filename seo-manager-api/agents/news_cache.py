@@ -0,0 +1,285 @@
+"""
+Short-lived cache of trending news, shared by related keywords
+
+News goes stale in hours, SERP competitors in weeks, so news no longer rides
+along in the research cache entry. It is cached here per keyword family (the
+keyword's significant words, stemmed and sorted, without modifiers such as
+"tips" or "best"): "email marketing tips" and "best email marketing tools
+for small business" share one `tbm=nws` fetch. A keyword whose family
+contains an already cached, fresh family reuses that broader family's news.
+
+Entries live in a SQLite file (WAL mode) shared by the API and worker
+processes on a host. Fetches are single-flight: concurrent jobs in one
+process wait for the same fetch, and a short lease row keeps other
+processes from fetching the same family at the same time. A failed fetch
+falls back to the last news fetched for the family, however old.
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Words that do not change what the news is about
+_IGNORED_WORDS = frozenset(
+    "a an and are as at be best by can do for from guide guides how i ideas in is it latest new of on or "
+    "the this tip tips to top trend trends ultimate vs what why with your".split()
+)
+
+# Significant words kept in a family (the first ones, in keyword order)
+FAMILY_WORDS = 3
+
+
+def _stem(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def keyword_family(keyword: str) -> Tuple[str, str]:
+    """
+    Normalize a keyword to its family
+
+    Args:
+        keyword: Research keyword (may be "topic, keyword")
+
+    Returns:
+        (family key: sorted stems joined by spaces, search phrase: the words in keyword order)
+    """
+    words = []
+    for word in _WORD.findall(keyword.lower()):
+        # Years and other numbers date the query instead of narrowing it
+        if word in _IGNORED_WORDS or word.isdigit():
+            continue
+        if _stem(word) not in (_stem(seen) for seen in words):
+            words.append(word)
+    words = words[:FAMILY_WORDS] or [keyword.strip().lower()]
+    return " ".join(sorted(_stem(word) for word in words)), " ".join(words)
+
+
+def trending_query(phrase: str) -> str:
+    """News query for a keyword phrase, dated with the current year"""
+    return f"{phrase} {date.today().year} trends"
+
+
+class TrendingNewsCache:
+    """Per-family trending news with a short TTL"""
+
+    def __init__(self, path: Optional[str] = None, ttl_seconds: Optional[float] = None,
+                 fetch_lease_seconds: float = 45.0):
+        """
+        Args:
+            path: SQLite file (defaults to NEWS_CACHE_PATH)
+            ttl_seconds: How long fetched news is served (defaults to NEWS_TTL_SECONDS, 6 hours)
+            fetch_lease_seconds: How long other processes wait for a family being fetched
+        """
+        self.path = path or os.getenv("NEWS_CACHE_PATH", "./news_cache.db")
+        self.ttl_seconds = float(os.getenv("NEWS_TTL_SECONDS", "21600")) if ttl_seconds is None else ttl_seconds
+        self.fetch_lease_seconds = fetch_lease_seconds
+
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        self._stats = {"hits": 0, "shared_hits": 0, "fetches": 0, "waits": 0, "fetch_errors": 0, "stale_served": 0}
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS news (
+                    family TEXT PRIMARY KEY,
+                    phrase TEXT NOT NULL,
+                    items TEXT,
+                    fetched_at REAL,
+                    fetching_until REAL
+                )
+            """)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def get_or_fetch(self, keyword: str, fetch: Callable[[str], List[Dict]]) -> List[Dict]:
+        """
+        Trending news for a keyword, fetching it for the keyword's family if needed
+
+        Args:
+            keyword: Research keyword
+            fetch: Runs the news search for a query string and returns the news items
+
+        Returns:
+            News items (possibly shared with related keywords)
+
+        Raises:
+            Whatever fetch raises, when there is no earlier news to fall back on
+        """
+        family, phrase = keyword_family(keyword)
+        cached = self._lookup(family)
+        if cached is not None:
+            return cached
+
+        # Single-flight within the process: one fetch per family, the rest wait for it
+        with self._family_lock(family):
+            cached = self._lookup(family)
+            if cached is not None:
+                return cached
+
+            # ...and across processes, through a lease on the family's row
+            deadline = time.time() + self.fetch_lease_seconds
+            while not self._claim_fetch(family, phrase):
+                self._stats["waits"] += 1
+                time.sleep(0.5)
+                cached = self._lookup(family)
+                if cached is not None:
+                    return cached
+                if time.time() > deadline:
+                    break
+
+            query = trending_query(phrase)
+            try:
+                items = fetch(query)
+            except Exception:
+                self._stats["fetch_errors"] += 1
+                self._release_fetch(family)
+                stale = self._stale(family)
+                if stale is None:
+                    raise
+                self._stats["stale_served"] += 1
+                logger.warning(f"News fetch for '{phrase}' failed; serving the last news fetched")
+                return stale
+
+            self._stats["fetches"] += 1
+            self._store(family, phrase, items)
+            logger.info(f"Fetched {len(items)} news items for family '{family}' ({query})")
+            return items
+
+    def _family_lock(self, family: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(family, threading.Lock())
+
+    def _lookup(self, family: str) -> Optional[List[Dict]]:
+        """Fresh news for the family, or for a cached broader family it contains"""
+        cutoff = time.time() - self.ttl_seconds
+        words = set(family.split())
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT items FROM news WHERE family = ? AND items IS NOT NULL AND fetched_at >= ?",
+                (family, cutoff)
+            ).fetchone()
+            if row is not None:
+                self._stats["hits"] += 1
+                return json.loads(row["items"])
+
+            # Families of related keywords ("email marketing" for "email marketing tools")
+            for row in conn.execute(
+                    "SELECT family, items FROM news WHERE items IS NOT NULL AND fetched_at >= ? "
+                    "ORDER BY fetched_at DESC", (cutoff,)):
+                broader = set(row["family"].split())
+                if len(broader) > 1 and broader < words:
+                    self._stats["shared_hits"] += 1
+                    return json.loads(row["items"])
+        return None
+
+    def _stale(self, family: str) -> Optional[List[Dict]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT items FROM news WHERE family = ? AND items IS NOT NULL", (family,)
+            ).fetchone()
+        return json.loads(row["items"]) if row else None
+
+    def _claim_fetch(self, family: str, phrase: str) -> bool:
+        """Take the family's fetch lease; False while another process holds it"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT fetching_until FROM news WHERE family = ?", (family,)).fetchone()
+            if row is not None and row["fetching_until"] and row["fetching_until"] > now:
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute(
+                "INSERT INTO news (family, phrase, fetching_until) VALUES (?, ?, ?) "
+                "ON CONFLICT(family) DO UPDATE SET fetching_until = excluded.fetching_until",
+                (family, phrase, now + self.fetch_lease_seconds)
+            )
+            conn.execute("COMMIT")
+        return True
+
+    def _release_fetch(self, family: str) -> None:
+        with self._connect() as conn:
+            conn.execute("UPDATE news SET fetching_until = NULL WHERE family = ?", (family,))
+
+    def backfill(self, keyword: str, items: List[Dict], fetched_at: float) -> bool:
+        """
+        Store news fetched earlier (e.g. replayed from the SERP archive) for a keyword's family
+
+        Returns:
+            True if stored, False if the family already has news at least as recent
+        """
+        family, phrase = keyword_family(keyword)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO news (family, phrase, items, fetched_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(family) DO UPDATE SET phrase = excluded.phrase, items = excluded.items, "
+                "fetched_at = excluded.fetched_at WHERE news.items IS NULL OR news.fetched_at < excluded.fetched_at",
+                (family, phrase, json.dumps(items), fetched_at)
+            )
+            return cursor.rowcount == 1
+
+    def _store(self, family: str, phrase: str, items: List[Dict]) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO news (family, phrase, items, fetched_at, fetching_until) VALUES (?, ?, ?, ?, NULL) "
+                "ON CONFLICT(family) DO UPDATE SET phrase = excluded.phrase, items = excluded.items, "
+                "fetched_at = excluded.fetched_at, fetching_until = NULL",
+                (family, phrase, json.dumps(items), time.time())
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Entry counts and hit/fetch counters"""
+        cutoff = time.time() - self.ttl_seconds
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS total, SUM(fetched_at >= ?) AS fresh FROM news WHERE items IS NOT NULL",
+                (cutoff,)
+            ).fetchone()
+        return {
+            "families": row["total"],
+            "fresh_families": row["fresh"] or 0,
+            "ttl_seconds": self.ttl_seconds,
+            **self._stats
+        }
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM news")
+
+
+_news_cache: Optional[TrendingNewsCache] = None
+_news_cache_lock = threading.Lock()
+
+
+def get_news_cache() -> TrendingNewsCache:
+    """Process-wide news cache (configured from the environment)"""
+    global _news_cache
+    if _news_cache is None:
+        with _news_cache_lock:
+            if _news_cache is None:
+                _news_cache = TrendingNewsCache()
+    return _news_cache
@@ -0,0 +1,189 @@
+"""
+Parsing of the PlannerAgent's JSON outline.
+"""
+
+import json
+import re
+import threading
+from typing import Dict, List, Any
+
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+_CODE_FENCE = re.compile(r"^```(?:json|markdown|md)?\s*|\s*```$", re.IGNORECASE)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_SMART_QUOTES = str.maketrans({"\u201c": '"', "\u201d": '"', "\u2018": "'", "\u2019": "'"})
+
+
+class OutlineSection(BaseModel):
+    """One section of a planned blog post"""
+    heading: str = Field(..., min_length=1)
+    bullets: List[str] = Field(default_factory=list)
+
+    @field_validator("heading")
+    @classmethod
+    def _strip_heading(cls, value: str) -> str:
+        return value.strip()
+
+    @field_validator("bullets", mode="before")
+    @classmethod
+    def _coerce_bullets(cls, value: Any) -> List[str]:
+        if value is None:
+            return []
+        if not isinstance(value, list):
+            value = [value]
+        return [str(bullet) for bullet in value]
+
+
+class Outline(BaseModel):
+    """Structured outline produced by the PlannerAgent"""
+    title: str = ""
+    meta_description: str = ""
+    sections: List[OutlineSection] = Field(..., min_length=1)
+
+
+class OutlineParseError(ValueError):
+    """Raised when planner output cannot be turned into a valid Outline"""
+
+
+class OutlineRepairStats:
+    """Thread-safe counters for outline parsing outcomes"""
+
+    FIELDS = ("parsed", "local_repairs", "llm_repairs", "planner_retries", "failures")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {field: 0 for field in self.FIELDS}
+
+    def record(self, field: str) -> None:
+        with self._lock:
+            self._counts[field] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+def parse_outline(text: str) -> Outline:
+    """
+    Parse planner output into an Outline
+
+    Only a surrounding markdown code fence is tolerated; anything else that is
+    not valid outline JSON fails fast.
+
+    Args:
+        text: Raw planner output
+
+    Returns:
+        Validated Outline
+
+    Raises:
+        OutlineParseError: If the text is not a valid outline
+    """
+    if not text or not text.strip():
+        raise OutlineParseError("Planner returned an empty outline")
+
+    try:
+        data = json.loads(_CODE_FENCE.sub("", text.strip()))
+    except json.JSONDecodeError as e:
+        raise OutlineParseError(f"Outline is not valid JSON: {e}") from e
+
+    return _validate(data)
+
+
+def repair_outline(text: str) -> Outline:
+    """
+    Locally repair common defects in planner output and parse it
+
+    Handles prose around the JSON object, smart quotes, trailing commas and
+    sections without a heading. No LLM call is made.
+
+    Raises:
+        OutlineParseError: If the text cannot be repaired
+    """
+    if not text:
+        raise OutlineParseError("Planner returned an empty outline")
+
+    cleaned = _CODE_FENCE.sub("", text.strip()).translate(_SMART_QUOTES)
+
+    # Keep only the outermost JSON object if the model added prose around it
+    start, end = cleaned.find("{"), cleaned.rfind("}")
+    if start == -1 or end <= start:
+        raise OutlineParseError("No JSON object found in outline")
+    cleaned = _TRAILING_COMMA.sub(r"\1", cleaned[start:end + 1])
+
+    try:
+        data = json.loads(cleaned)
+    except json.JSONDecodeError as e:
+        raise OutlineParseError(f"Outline is not valid JSON after repair: {e}") from e
+
+    if isinstance(data, dict) and isinstance(data.get("sections"), list):
+        data["sections"] = [
+            section for section in data["sections"]
+            if isinstance(section, dict) and str(section.get("heading", "")).strip()
+        ]
+
+    return _validate(data)
+
+
+def _validate(data: Any) -> Outline:
+    if not isinstance(data, dict):
+        raise OutlineParseError("Outline JSON must be an object")
+    try:
+        return Outline.model_validate(data)
+    except ValidationError as e:
+        raise OutlineParseError(f"Outline does not match schema: {e.errors()[0]['msg']}") from e
+
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+
+
+def _heading_key(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def _normalize_section_body(body: str, heading: str) -> str:
+    """Drop a repeated section heading and demote stray top-level headings"""
+    lines = _CODE_FENCE.sub("", body.strip()).splitlines()
+
+    # Models often restate the heading despite being told not to; any other
+    # leading heading is content and is demoted below instead
+    while lines:
+        match = _HEADING.match(lines[0].strip())
+        if lines[0].strip() and not (match and _heading_key(match.group(2)) == _heading_key(heading)):
+            break
+        lines.pop(0)
+
+    normalized = []
+    for line in lines:
+        match = _HEADING.match(line)
+        if match and len(match.group(1)) < 3:
+            line = f"### {match.group(2)}"
+        normalized.append(line)
+
+    return "\n".join(normalized).strip()
+
+
+def stitch_sections(outline: Outline, bodies: List[str]) -> str:
+    """
+    Join independently written section bodies into one markdown post
+
+    Args:
+        outline: Parsed outline the sections were written from
+        bodies: Markdown body per outline section, in outline order
+
+    Returns:
+        Markdown post with an H1 title and one H2 per section
+    """
+    parts = []
+    if outline.title:
+        parts.append(f"# {outline.title}")
+
+    for section, body in zip(outline.sections, bodies):
+        parts.append(format_section(section.heading, body))
+
+    return "\n\n".join(parts) + "\n"
+
+
+def format_section(heading: str, body: str) -> str:
+    """Render one written section as an H2 block (see stitch_sections)"""
+    return f"## {heading}\n\n{_normalize_section_body(body, heading)}"
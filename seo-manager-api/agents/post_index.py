@@ -0,0 +1,287 @@
+"""
+Post-level deduplication index.
+
+Every published post is recorded with its content hash, the normalized
+tokens of its topic and keyword, and a MinHash signature of its text. Before
+a job runs, its topic is compared with the topics already published (token
+Jaccard similarity, so "email marketing for ecommerce" matches "ecommerce
+email marketing"). After writing, the final post is compared with existing
+posts by exact hash and by MinHash with LSH banding.
+
+The index is an append-only JSONL file loaded into memory at startup. Worker
+processes append to the same file, so each lookup first reads the lines other
+processes appended since the last one.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Set, Union
+
+from .file_utils import file_lock
+
+logger = logging.getLogger(__name__)
+
+# Mersenne prime for the MinHash permutations
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_STOP_WORDS = {
+    'a', 'an', 'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by',
+    'is', 'are', 'vs', 'versus', 'how', 'what', 'why', 'your', 'you'
+}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def topic_tokens(*texts: str) -> Set[str]:
+    """Normalized content words of a topic (lowercase, no stop words, naive singular)"""
+    tokens = set()
+    for text in texts:
+        for word in _WORD.findall(text.lower()):
+            if word in _STOP_WORDS:
+                continue
+            if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+                word = word[:-1]
+            tokens.add(word)
+    return tokens
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def shingles(text: str, size: int = 3) -> Set[str]:
+    """Word n-grams of a text, ignoring case and punctuation"""
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """MinHash signatures with a fixed set of seeded permutations"""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        self.num_perm = num_perm
+        params = []
+        for i in range(num_perm):
+            digest = hashlib.blake2b(f"{seed}:{i}".encode(), digest_size=16).digest()
+            a = int.from_bytes(digest[:8], "big") % (_PRIME - 1) + 1
+            b = int.from_bytes(digest[8:], "big") % _PRIME
+            params.append((a, b))
+        self._params = params
+
+    def signature(self, items: Iterable[str]) -> List[int]:
+        hashes = [
+            int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "big")
+            for item in items
+        ]
+        if not hashes:
+            return [_MAX_HASH] * self.num_perm
+        return [min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes) for a, b in self._params]
+
+    @staticmethod
+    def similarity(sig_a: List[int], sig_b: List[int]) -> float:
+        """Estimated Jaccard similarity of the underlying shingle sets"""
+        return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+class PostIndex:
+    """Index of published posts for exact and near-duplicate detection"""
+
+    def __init__(self, path: Union[str, Path], topic_threshold: float = 0.8,
+                 content_threshold: float = 0.8, num_perm: int = 64, bands: int = 16):
+        """
+        Args:
+            path: JSONL file the index is persisted to
+            topic_threshold: Minimum token Jaccard similarity of topics to count as duplicates
+            content_threshold: Minimum estimated Jaccard similarity of post texts
+            num_perm: MinHash signature length
+            bands: LSH bands (num_perm must be divisible by bands)
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.path = Path(path)
+        self.topic_threshold = topic_threshold
+        self.content_threshold = content_threshold
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self._rows = num_perm // bands
+
+        self._lock = threading.Lock()
+        self._lock_path = self.path.with_name(f".{self.path.name}.lock")
+        # Bytes of the file already read into memory
+        self._offset = 0
+        self._entries: List[Dict[str, Any]] = []
+        self._by_hash: Dict[str, int] = {}
+        self._by_token: Dict[str, Set[int]] = {}
+        self._buckets: Dict[tuple, Set[int]] = {}
+        self._stats = {"topic_duplicates": 0, "content_duplicates": 0, "exact_duplicates": 0}
+
+        self._tail()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def find_topic_duplicate(self, topic: str, keyword: str, tone: str) -> Optional[Dict[str, Any]]:
+        """
+        Find a published post on (nearly) the same topic and keyword in the same tone
+
+        Returns:
+            The matching index entry plus "similarity" and "match", or None
+        """
+        tokens = topic_tokens(topic, keyword)
+        with self._lock:
+            self._tail()
+            candidates = set()
+            for token in tokens:
+                candidates |= self._by_token.get(token, set())
+
+            best, best_score = None, 0.0
+            for position in sorted(candidates):
+                entry = self._entries[position]
+                if entry["tone"] != tone:
+                    continue
+                score = jaccard(tokens, set(entry["topic_tokens"]))
+                # Prefer the most recent post among equally similar ones
+                if score >= best_score:
+                    best, best_score = entry, score
+
+            if best is None or best_score < self.topic_threshold:
+                return None
+            self._stats["topic_duplicates"] += 1
+        return {**self._public(best), "similarity": round(best_score, 3), "match": "topic"}
+
+    def find_content_duplicate(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Find a published post with the same or nearly the same text
+
+        Returns:
+            The matching index entry plus "similarity" and "match", or None
+        """
+        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        signature = self.hasher.signature(shingles(text))
+
+        with self._lock:
+            self._tail()
+            position = self._by_hash.get(content_hash)
+            if position is not None:
+                self._stats["exact_duplicates"] += 1
+                return {**self._public(self._entries[position]), "similarity": 1.0, "match": "exact"}
+
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates |= self._buckets.get(key, set())
+
+            best, best_score = None, 0.0
+            for position in candidates:
+                score = MinHasher.similarity(signature, self._entries[position]["signature"])
+                if score > best_score:
+                    best, best_score = self._entries[position], score
+
+            if best is None or best_score < self.content_threshold:
+                return None
+            self._stats["content_duplicates"] += 1
+        return {**self._public(best), "similarity": round(best_score, 3), "match": "content"}
+
+    def add(self, text: str, content_hash: str, topic: str, keyword: str, tone: str,
+            slug: Optional[str], output_dir: str, created_at: str) -> None:
+        """Record a published post and persist it (one appended line)"""
+        entry = {
+            "content_hash": content_hash,
+            "slug": slug,
+            "output_dir": output_dir,
+            "topic": topic,
+            "keyword": keyword,
+            "tone": tone,
+            "created_at": created_at,
+            "topic_tokens": sorted(topic_tokens(topic, keyword)),
+            "signature": self.hasher.signature(shingles(text))
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock, file_lock(self._lock_path):
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            # Picks up this entry and any appended by other processes before it
+            self._tail()
+
+    def rebuild(self, outputs: Iterable[Dict[str, Any]]) -> int:
+        """
+        Index existing outputs (output index entries with output_dir, topic,
+        keyword, tone); used once for posts generated before the index existed
+
+        Returns:
+            Number of posts indexed
+        """
+        count = 0
+        for output in outputs:
+            post_path = Path(output["output_dir"]) / "post.md"
+            if not post_path.exists():
+                continue
+            text = post_path.read_text(encoding="utf-8")
+            self.add(
+                text,
+                content_hash=output.get("content_hash") or hashlib.sha256(text.encode("utf-8")).hexdigest(),
+                topic=output["topic"],
+                keyword=output["keyword"],
+                tone=output["tone"],
+                slug=output.get("blog_slug"),
+                output_dir=output["output_dir"],
+                created_at=output.get("created_at", "")
+            )
+            count += 1
+        logger.info(f"Post index: indexed {count} existing posts")
+        return count
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._tail()
+            return {"posts": len(self._entries), **self._stats}
+
+    def _tail(self) -> None:
+        """Index lines appended since the last read (caller holds the lock)"""
+        try:
+            if self.path.stat().st_size <= self._offset:
+                return
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # A line still being appended is read next time
+        complete = data[:data.rfind(b"\n") + 1]
+        self._offset += len(complete)
+        for line in complete.splitlines():
+            try:
+                self._insert(json.loads(line))
+            except (json.JSONDecodeError, KeyError, UnicodeDecodeError):
+                # A torn line from a crash mid-append
+                continue
+
+    def _insert(self, entry: Dict[str, Any]) -> None:
+        position = len(self._entries)
+        self._entries.append(entry)
+        self._by_hash[entry["content_hash"]] = position
+        for token in entry["topic_tokens"]:
+            self._by_token.setdefault(token, set()).add(position)
+        for key in self._band_keys(entry["signature"]):
+            self._buckets.setdefault(key, set()).add(position)
+
+    def _band_keys(self, signature: List[int]) -> List[tuple]:
+        rows = self._rows
+        return [(band, tuple(signature[band * rows:(band + 1) * rows])) for band in range(self.bands)]
+
+    @staticmethod
+    def _public(entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in entry.items() if key not in ("signature", "topic_tokens")}
@@ -0,0 +1,272 @@
+"""
+Rendered HTML previews of finished posts.
+
+A post's markdown is rendered to a standalone HTML page once, as soon as
+the final post exists, and kept by slug in a bounded in-memory LRU backed
+by a bounded directory of JSON files. The API serves it from
+/preview/{slug}, so a post is visible right after its last LLM stage
+instead of after the Astro build (or dev server reload) picks it up.
+Worker processes write the files and the API reads them, so the directory
+must be shared between them (like the output directory). A preview rendered
+for a job also records the job's slug under jobs/, so the job's status can
+link the preview while the job is still publishing.
+
+Post bodies come from LLM output, so raw HTML in the markdown is escaped
+rather than passed through, and link and image URLs are limited to http,
+https, mailto and relative ones; the API also sends a Content-Security-Policy
+without scripts.
+"""
+
+import hashlib
+import html
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from .file_utils import atomic_write_json
+from utils.transport import compress
+
+logger = logging.getLogger(__name__)
+
+# Slugs as produced by ManagerAgent (also keeps lookups inside the cache directory)
+_SLUG = re.compile(r"^[a-z0-9][a-z0-9-]{0,200}$")
+_JOB_ID = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,100}$")
+_URL_ATTRIBUTE = re.compile(r'\b(href|src)="([^"]*)"', re.IGNORECASE)
+_URL_SCHEME = re.compile(r"^([a-z][a-z0-9+.-]*):", re.IGNORECASE)
+# Browsers drop these inside a URL, so "java\tscript:" is still a script URL
+_URL_IGNORED = re.compile(r"[\x00-\x20\x7f]+")
+_SAFE_SCHEMES = ("http", "https", "mailto")
+
+_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<meta name="description" content="{description}">
+<link rel="canonical" href="{canonical}">
+<meta name="robots" content="noindex">
+<style>
+body {{ max-width: 46rem; margin: 2rem auto; padding: 0 1rem; font: 1.05rem/1.65 system-ui, sans-serif; color: #1f2933; }}
+h1, h2, h3 {{ line-height: 1.25; }}
+pre {{ overflow-x: auto; background: #f4f5f7; padding: 1rem; }}
+table {{ border-collapse: collapse; }} td, th {{ border: 1px solid #d9dde3; padding: .4rem .6rem; }}
+.preview-note {{ font-size: .85rem; color: #616e7c; border-bottom: 1px solid #e4e7eb; padding-bottom: .5rem; }}
+</style>
+</head>
+<body>
+<p class="preview-note">Preview &middot; the published page will be at <a href="{canonical}">{canonical}</a></p>
+<article>
+{body}
+</article>
+</body>
+</html>
+"""
+
+
+def valid_slug(slug: str) -> bool:
+    return bool(_SLUG.match(slug))
+
+
+def _safe_url(match: "re.Match") -> str:
+    # Check the URL as the browser will read it: entities decoded, whitespace and controls dropped
+    url = _URL_IGNORED.sub("", html.unescape(match.group(2)))
+    scheme = _URL_SCHEME.match(url)
+    if scheme and scheme.group(1).lower() not in _SAFE_SCHEMES:
+        return f'{match.group(1)}="#"'
+    return match.group(0)
+
+
+def render_post(markdown_text: str, title: str, description: str, canonical: str) -> str:
+    """Render post markdown as a standalone HTML page (raw HTML in the markdown is shown escaped)"""
+    import markdown  # Loaded on first render, like the other heavy dependencies
+    md = markdown.Markdown(extensions=["extra", "sane_lists"], output_format="html")
+    # Without the raw HTML block and inline handlers, tags are escaped like any other text
+    md.preprocessors.deregister("html_block")
+    md.inlinePatterns.deregister("html")
+    body = _URL_ATTRIBUTE.sub(_safe_url, md.convert(markdown_text))
+    return _PAGE.format(
+        title=html.escape(title),
+        description=html.escape(description, quote=True),
+        canonical=html.escape(canonical, quote=True),
+        body=body
+    )
+
+
+class PreviewCache:
+    """Bounded memory + disk cache of rendered posts, keyed by slug"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: Optional[int] = None,
+                 max_files: Optional[int] = None):
+        """
+        Args:
+            cache_dir: Directory of rendered previews (defaults to PREVIEW_CACHE_DIR)
+            max_entries: Previews kept in memory (defaults to PREVIEW_CACHE_SIZE)
+            max_files: Previews kept on disk, oldest removed first (defaults to PREVIEW_MAX_FILES)
+        """
+        self.cache_dir = Path(cache_dir or os.getenv("PREVIEW_CACHE_DIR", "./preview_cache"))
+        self.max_entries = int(os.getenv("PREVIEW_CACHE_SIZE", "128")) if max_entries is None else max_entries
+        self.max_files = int(os.getenv("PREVIEW_MAX_FILES", "1000")) if max_files is None else max_files
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        (self.cache_dir / "jobs").mkdir(exist_ok=True)
+
+        # slug -> (entry, mtime of its file), so a file rewritten by another process is re-read
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], Optional[int]]]" = OrderedDict()
+        # Compressed bodies by (etag, encoding), bounded like the entries
+        self._encoded: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"renders": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def put(self, slug: str, markdown_text: str, title: str, description: str,
+            content_hash: str, job_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Render a post and cache it
+
+        Args:
+            slug: Post slug
+            markdown_text: Post body
+            title: Page title
+            description: Meta description
+            content_hash: Hash of the post body
+            job_id: Job that produced the post, recorded for slug_for_job
+
+        Returns:
+            The cached entry (html, etag, built, created_at)
+        """
+        page = render_post(markdown_text, title, description, f"/blog/{slug}")
+        entry = {
+            "slug": slug,
+            "html": page,
+            "etag": f'"{hashlib.sha256(page.encode("utf-8")).hexdigest()[:32]}"',
+            "content_hash": content_hash,
+            "built": False,
+            "created_at": datetime.now().isoformat()
+        }
+        atomic_write_json(self._path(slug), entry)
+        if job_id and _JOB_ID.match(job_id):
+            atomic_write_json(self.cache_dir / "jobs" / f"{job_id}.json", {"slug": slug})
+        with self._lock:
+            self._remember(slug, entry, self._mtime(slug))
+            self._stats["renders"] += 1
+        self._prune_files()
+        return entry
+
+    def slug_for_job(self, job_id: str) -> Optional[str]:
+        """Slug of the preview a job rendered, or None (also once the preview was pruned)"""
+        if not _JOB_ID.match(job_id):
+            return None
+        try:
+            slug = json.loads((self.cache_dir / "jobs" / f"{job_id}.json").read_text(encoding="utf-8"))["slug"]
+        except (OSError, json.JSONDecodeError, KeyError):
+            return None
+        return slug if self._path(slug).exists() else None
+
+    def get(self, slug: str) -> Optional[Dict[str, Any]]:
+        """Cached preview of a post, or None"""
+        if not valid_slug(slug):
+            return None
+        # One stat per hit: a worker may have re-rendered the post (refresh) or marked it built
+        mtime = self._mtime(slug)
+        if mtime is None:
+            with self._lock:
+                self._entries.pop(slug, None)
+                self._stats["misses"] += 1
+            return None
+        with self._lock:
+            cached = self._entries.get(slug)
+            if cached is not None and cached[1] == mtime:
+                self._entries.move_to_end(slug)
+                self._stats["memory_hits"] += 1
+                return cached[0]
+
+        try:
+            entry = json.loads(self._path(slug).read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+        with self._lock:
+            self._remember(slug, entry, mtime)
+            self._stats["disk_hits"] += 1
+        return entry
+
+    def mark_built(self, slug: str) -> None:
+        """Record that the static site now serves the post (previews can then be cached longer)"""
+        entry = self.get(slug)
+        if entry is None or entry["built"]:
+            return
+        entry = {**entry, "built": True}
+        try:
+            atomic_write_json(self._path(slug), entry)
+        except OSError as e:
+            logger.warning(f"Could not update preview of {slug}: {e}")
+        with self._lock:
+            self._remember(slug, entry, self._mtime(slug))
+
+    def body(self, entry: Dict[str, Any], encoding: Optional[str]) -> bytes:
+        """The entry's HTML, compressed once per encoding (see utils.transport.choose_encoding)"""
+        page = entry["html"].encode("utf-8")
+        if encoding is None:
+            return page
+        key = (entry["etag"], encoding)
+        with self._lock:
+            encoded = self._encoded.get(key)
+        if encoded is None:
+            encoded = compress(page, encoding)
+            with self._lock:
+                self._encoded[key] = encoded
+                while len(self._encoded) > self.max_entries:
+                    self._encoded.popitem(last=False)
+        return encoded
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"memory_entries": len(self._entries), "max_entries": self.max_entries, **self._stats}
+
+    def _path(self, slug: str) -> Path:
+        return self.cache_dir / f"{slug}.json"
+
+    def _mtime(self, slug: str) -> Optional[int]:
+        try:
+            return self._path(slug).stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _remember(self, slug: str, entry: Dict[str, Any], mtime: Optional[int]) -> None:
+        # Caller holds the lock
+        self._entries[slug] = (entry, mtime)
+        self._entries.move_to_end(slug)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _prune_files(self) -> None:
+        for pattern in ("*.json", "jobs/*.json"):
+            files = list(self.cache_dir.glob(pattern))
+            if len(files) <= self.max_files:
+                continue
+            files.sort(key=lambda path: path.stat().st_mtime)
+            for path in files[:len(files) - self.max_files]:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+
+_preview_cache: Optional[PreviewCache] = None
+_preview_cache_lock = threading.Lock()
+
+
+def get_preview_cache() -> PreviewCache:
+    """Process-wide preview cache (configured from the environment)"""
+    global _preview_cache
+    if _preview_cache is None:
+        with _preview_cache_lock:
+            if _preview_cache is None:
+                _preview_cache = PreviewCache()
+    return _preview_cache
@@ -0,0 +1,157 @@
+"""
+Compact research context for the planner prompt
+
+Research data used to be rendered into the prompt with str(): Python dict
+syntax, links, positions and the adaptation notes added to cached results.
+The builder renders it as short lines instead (competitor titles with their
+domain, questions, searches, news), drops duplicates and cache annotations,
+and fits the result to a token budget. Items are added by priority, so when
+the budget is tight the top competitors and questions survive and snippets
+and older news go first.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from .tokens import estimate_tokens
+
+# Prefix adapt_cached_data puts on questions it could not adapt
+_ADAPTED_PREFIX = re.compile(r"^\[Similar to [^\]]*\]\s*")
+_SPACES = re.compile(r"\s+")
+
+SNIPPET_CHARS = 160
+
+# Sections in prompt order
+SECTIONS = ("competitors", "people_ask", "related_searches", "trending")
+
+
+def _normalize(text: str) -> str:
+    return _SPACES.sub(" ", text).strip()
+
+
+def _dedupe(values: List[str]) -> List[str]:
+    seen = set()
+    unique = []
+    for value in values:
+        key = value.lower().rstrip("?.! ")
+        if value and key not in seen:
+            seen.add(key)
+            unique.append(value)
+    return unique
+
+
+def _domain(link: str) -> str:
+    host = urlparse(link).netloc if link else ""
+    return host[4:] if host.startswith("www.") else host
+
+
+class _Item:
+    __slots__ = ("priority", "section", "rank", "text", "tokens", "parent")
+
+    def __init__(self, priority: int, section: str, rank: int, text: str, parent: Optional["_Item"] = None):
+        self.priority = priority
+        self.section = section
+        self.rank = rank
+        self.text = text
+        self.tokens = estimate_tokens(text) + 1  # + newline/separator
+        self.parent = parent
+
+
+def build_planner_context(competitive_data: Dict[str, Any], trending_data: List[Dict[str, Any]],
+                          budget_tokens: int = 800) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    """
+    Render research data for the planner prompt within a token budget
+
+    Args:
+        competitive_data: Dict with top_competitors, people_also_ask, related_searches
+        trending_data: Trending news items (title, source, date)
+        budget_tokens: Token budget for the four research fields together (0 = unlimited)
+
+    Returns:
+        (prompt inputs competitors/people_ask/related_searches/trending,
+         report with raw and compact token counts, tokens saved and items dropped)
+    """
+    competitors = competitive_data.get("top_competitors", [])
+    questions = _dedupe([_normalize(_ADAPTED_PREFIX.sub("", q)) for q in competitive_data.get("people_also_ask", [])])
+    question_keys = {q.lower().rstrip("?.! ") for q in questions}
+    searches = [s for s in _dedupe([_normalize(s) for s in competitive_data.get("related_searches", [])])
+                if s.lower() not in question_keys]
+
+    items: List[_Item] = []
+
+    seen_titles = set()
+    for rank, competitor in enumerate(competitors):
+        title = _normalize(competitor.get("title", ""))
+        if not title or title.lower() in seen_titles:
+            continue
+        seen_titles.add(title.lower())
+        domain = _domain(competitor.get("link", ""))
+        line = _Item(0 if rank < 3 else 1, "competitors", rank, f"- {title}" + (f" ({domain})" if domain else ""))
+        items.append(line)
+        snippet = _normalize(competitor.get("snippet", ""))
+        if snippet:
+            if len(snippet) > SNIPPET_CHARS:
+                snippet = snippet[:SNIPPET_CHARS].rsplit(" ", 1)[0] + "..."
+            items.append(_Item(2, "competitors", rank, f": {snippet}", parent=line))
+
+    for rank, question in enumerate(questions):
+        items.append(_Item(0 if rank < 5 else 1, "people_ask", rank, f"- {question}"))
+
+    for rank, search in enumerate(searches):
+        items.append(_Item(1 if rank < 5 else 3, "related_searches", rank, search))
+
+    seen_news = set()
+    for rank, news in enumerate(trending_data):
+        title = _normalize(news.get("title", ""))
+        if not title or title.lower() in seen_news:
+            continue
+        seen_news.add(title.lower())
+        details = ", ".join(_normalize(str(news[key])) for key in ("source", "date") if news.get(key))
+        items.append(_Item(2 if rank < 3 else 3, "trending", rank, f"- {title}" + (f" ({details})" if details else "")))
+
+    # Highest priority first; within a priority, keep each section's ranking
+    included = set()
+    used = 0
+    for item in sorted(items, key=lambda item: (item.priority, SECTIONS.index(item.section), item.rank)):
+        if item.parent is not None and id(item.parent) not in included:
+            continue
+        if budget_tokens and used + item.tokens > budget_tokens:
+            continue
+        included.add(id(item))
+        used += item.tokens
+
+    rendered = {section: [] for section in SECTIONS}
+    dropped = {section: 0 for section in SECTIONS + ("snippets",)}
+    for item in items:
+        if id(item) not in included:
+            dropped["snippets" if item.parent is not None else item.section] += 1
+            continue
+        if item.parent is not None:
+            # Snippet: appended to its competitor's line
+            rendered["competitors"][-1] += item.text
+        else:
+            rendered[item.section].append(item.text)
+
+    inputs = {
+        "competitors": "\n".join(rendered["competitors"]) or "none",
+        "people_ask": "\n".join(rendered["people_ask"]) or "none",
+        "related_searches": ", ".join(rendered["related_searches"]) or "none",
+        "trending": "\n".join(rendered["trending"]) or "none"
+    }
+
+    raw_tokens = sum(estimate_tokens(str(value)) for value in (
+        competitors,
+        competitive_data.get("people_also_ask", []),
+        competitive_data.get("related_searches", []),
+        trending_data
+    ))
+    compact_tokens = sum(estimate_tokens(value) for value in inputs.values())
+    report = {
+        "raw_tokens": raw_tokens,
+        "compact_tokens": compact_tokens,
+        "tokens_saved": raw_tokens - compact_tokens,
+        "budget_tokens": budget_tokens,
+        "dropped": {section: count for section, count in dropped.items() if count}
+    }
+    return inputs, report
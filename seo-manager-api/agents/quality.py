@@ -0,0 +1,51 @@
+"""
+Cheap local quality checks for generated markdown.
+
+Used to decide whether an LLM edit pass is needed at all.
+"""
+
+import re
+from typing import List
+
+# Placeholder text the writer is told never to produce
+PLACEHOLDER_PATTERNS = [
+    re.compile(r"\((?:insert|add|include|experience|example|placeholder|your)\b[^)]*\)", re.IGNORECASE),
+    re.compile(r"\[(?:insert|add|placeholder|todo|tbd|your)\b[^\]]*\]", re.IGNORECASE),
+    re.compile(r"\b(?:TODO|TBD|lorem ipsum)\b"),
+    re.compile(r"\bnote to (?:the )?editors?\b", re.IGNORECASE),
+]
+
+# Image references and visual media mentions
+IMAGE_PATTERNS = [
+    re.compile(r"!\[[^\]]*\]\([^)]*\)"),
+    re.compile(r"\[image[^\]]*\]", re.IGNORECASE),
+    re.compile(r"\S+\.(?:jpe?g|png|gif|webp|svg)\b", re.IGNORECASE),
+]
+
+
+def find_quality_issues(markdown: str) -> List[str]:
+    """
+    Detect leftover placeholders and image references in markdown
+
+    Args:
+        markdown: Generated blog post content
+
+    Returns:
+        List of human-readable issues, empty if the content passes
+    """
+    issues = []
+
+    for pattern in PLACEHOLDER_PATTERNS:
+        match = pattern.search(markdown)
+        if match:
+            issues.append(f"placeholder: {match.group(0)[:60]}")
+
+    for pattern in IMAGE_PATTERNS:
+        match = pattern.search(markdown)
+        if match:
+            issues.append(f"image reference: {match.group(0)[:60]}")
+
+    if not markdown.strip():
+        issues.append("empty content")
+
+    return issues
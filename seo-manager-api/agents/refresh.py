@@ -0,0 +1,182 @@
+"""
+Incremental refresh of published posts.
+
+A post's research (competitors, people also ask, related searches) is
+fetched again and diffed against the competitive_research.json it was
+written from. Each new item is attached to the section of the post it is
+about, by word overlap with the section's heading (and, weighted half, its
+outline points), and only those sections are rewritten; the rest of the
+post is kept verbatim.
+Removed items are reported but rewrite nothing: what the post says about
+them is still true.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from .outline import Outline, OutlineSection
+
+_WORD = re.compile(r"[a-z0-9]+")
+_H2 = re.compile(r"^##\s+(.+?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*```")
+# Annotations the research cache adds to adapted questions ("[Similar to x] ...")
+_ANNOTATION = re.compile(r"^\[[^\]]*\]\s*")
+
+_IGNORED_WORDS = frozenset(
+    "a an and are as at be best by can do does for from how i in is it of on or should the to what "
+    "when where which who why will with you your".split()
+)
+
+# Share of an item's words a section must contain for the item to be about it
+MIN_OVERLAP = 0.3
+# Share of an outline heading's words a post heading must contain to match it
+HEADING_MATCH = 0.5
+
+RESEARCH_FIELDS = ("competitors", "people_also_ask", "related_searches")
+
+
+def _words(text: str) -> set:
+    return {word.rstrip("s") if len(word) > 3 else word
+            for word in _WORD.findall(text.lower()) if word not in _IGNORED_WORDS}
+
+
+def _text_key(text: str) -> str:
+    return " ".join(_WORD.findall(_ANNOTATION.sub("", text).lower()))
+
+
+def _competitor_key(competitor: Dict[str, Any]) -> str:
+    link = competitor.get("link", "")
+    if link:
+        parsed = urlparse(link)
+        host = parsed.netloc[4:] if parsed.netloc.startswith("www.") else parsed.netloc
+        return f"{host}{parsed.path.rstrip('/')}"
+    return _text_key(competitor.get("title", ""))
+
+
+def _diff(old: List[Any], new: List[Any], key) -> Dict[str, List[Any]]:
+    old_keys = {key(item) for item in old}
+    new_keys = {key(item) for item in new}
+    return {
+        "added": [item for item in new if key(item) not in old_keys],
+        "removed": [item for item in old if key(item) not in new_keys]
+    }
+
+
+def diff_research(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compare two competitive analyses
+
+    Competitors are matched by URL, questions and searches by their
+    normalized text.
+
+    Returns:
+        Added and removed items per field, and whether anything changed
+    """
+    diff = {
+        "competitors": _diff(old.get("top_competitors", []), new.get("top_competitors", []), _competitor_key),
+        "people_also_ask": _diff(old.get("people_also_ask", []), new.get("people_also_ask", []), _text_key),
+        "related_searches": _diff(old.get("related_searches", []), new.get("related_searches", []), _text_key)
+    }
+    diff["changed"] = any(diff[field]["added"] or diff[field]["removed"] for field in RESEARCH_FIELDS)
+    return diff
+
+
+def split_sections(markdown: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """
+    Split a post into the text before its first H2 and its H2 sections
+
+    Returns:
+        (preamble, [(heading, body), ...]); bodies exclude the heading line
+    """
+    preamble: List[str] = []
+    sections: List[Tuple[str, List[str]]] = []
+    in_code = False
+    for line in markdown.splitlines():
+        if _FENCE.match(line):
+            in_code = not in_code
+        match = None if in_code else _H2.match(line)
+        if match:
+            sections.append((match.group(1), []))
+        elif sections:
+            sections[-1][1].append(line)
+        else:
+            preamble.append(line)
+    return "\n".join(preamble).strip(), [(heading, "\n".join(body).strip()) for heading, body in sections]
+
+
+def match_outline(headings: List[str], outline: Optional[Outline]) -> List[OutlineSection]:
+    """The outline section (with its points) behind each post heading; points are empty if none matches"""
+    matched = []
+    for heading in headings:
+        words = _words(heading)
+        section = None
+        for candidate in (outline.sections if outline else []):
+            needed = _words(candidate.heading)
+            if candidate.heading.strip().lower() == heading.strip().lower() or (
+                    needed and len(needed & words) / len(needed) >= HEADING_MATCH):
+                section = candidate
+                break
+        matched.append(OutlineSection(heading=heading, bullets=section.bullets if section else []))
+    return matched
+
+
+def assign_changes(sections: List[OutlineSection], diff: Dict[str, Any]) -> Tuple[Dict[int, List[str]], List[str]]:
+    """
+    Attach each added research item to the section it is about
+
+    Args:
+        sections: The post's sections with their outline points
+        diff: Result of diff_research
+
+    Returns:
+        (new points to cover per section index, points no section is about)
+    """
+    items = [
+        (f"{competitor.get('title', '')} {competitor.get('snippet', '')}",
+         f"Cover what a newly ranking competitor covers: {competitor.get('title', '')}", False)
+        for competitor in diff["competitors"]["added"]
+    ]
+    items += [(question, f"Answer the question: {_ANNOTATION.sub('', question)}", True)
+              for question in diff["people_also_ask"]["added"]]
+    items += [(search, f"Address the related search: {search}", False)
+              for search in diff["related_searches"]["added"]]
+
+    # Heading words count fully, outline points half
+    heading_words = [_words(section.heading) for section in sections]
+    point_words = [_words(" ".join(section.bullets)) for section in sections]
+    faq = next((index for index, section in enumerate(sections)
+                if re.search(r"\bfaqs?\b|question", section.heading, re.IGNORECASE)), None)
+
+    assigned: Dict[int, List[str]] = {}
+    unplaced = []
+    for text, point, is_question in items:
+        words = _words(text)
+        best, best_overlap = None, 0.0
+        for index in range(len(sections)):
+            if not words:
+                break
+            shared = len(words & heading_words[index])
+            shared_points = len(words & point_words[index] - heading_words[index])
+            overlap = (shared + 0.5 * shared_points) / len(words)
+            if overlap > best_overlap:
+                best, best_overlap = index, overlap
+        if best_overlap < MIN_OVERLAP:
+            # Questions nothing else is about belong in the FAQ, if the post has one
+            best = faq if is_question else None
+        if best is None:
+            unplaced.append(point)
+        else:
+            assigned.setdefault(best, []).append(point)
+    return assigned, unplaced
+
+
+def summarize_diff(diff: Dict[str, Any]) -> Dict[str, Any]:
+    """Counts and the added questions and searches, for metrics"""
+    return {
+        **{field: {"added": len(diff[field]["added"]), "removed": len(diff[field]["removed"])}
+           for field in RESEARCH_FIELDS},
+        "added_competitors": [competitor.get("title", "") for competitor in diff["competitors"]["added"]],
+        "added_questions": diff["people_also_ask"]["added"],
+        "added_searches": diff["related_searches"]["added"]
+    }
@@ -1,80 +1,74 @@
 import os
 from serpapi import GoogleSearch
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from .cancellation import call_timeout, check_cancelled
+from .news_cache import get_news_cache
+from utils.tracing import span
+from .serp_archive import SerpArchive
+from .serp_extraction import extract_competitive_analysis, extract_trending_topics
+
+# Upper bound on a single SerpAPI request (the client library default is far longer)
+SERP_TIMEOUT_SECONDS = 30.0
+
+
+def run_search(params: Dict) -> Dict:
+    """Run a SerpAPI query, bounded by the current job's deadline"""
+    check_cancelled("SerpAPI request")
+    search = GoogleSearch(params)
+    search.timeout = call_timeout(SERP_TIMEOUT_SECONDS)
+    with span("serpapi.search", query=params.get("q", ""), tbm=params.get("tbm", "")) as search_span:
+        results = search.get_dict()
+        search_span.set_attribute("error", results.get("error", ""))
+    return results
 
 
 class ResearchAgent:
     """Research agent for competitive analysis using SerpAPI"""
 
-    def __init__(self):
+    def __init__(self, archive_dir: Optional[str] = "./serp_archive"):
         self.api_key = os.getenv('SERP_API_KEY')
         if not self.api_key:
             raise ValueError("SERP_API_KEY not found in environment variables")
 
+        # Raw SERP responses are archived for offline re-extraction (None disables)
+        self.archive = SerpArchive(archive_dir) if archive_dir else None
+
     def competitive_analysis(self, keyword: str, num_results: int = 10) -> Dict:
         """Analyze top competing articles for a keyword"""
-        search = GoogleSearch({
+        params = {
             "q": keyword,
             "api_key": self.api_key,
             "num": num_results,
             "hl": "en",  # English results
             "gl": "us"   # US location
-        })
-
-        results = search.get_dict()
-
-        # Extract competitive insights
-        analysis = {
-            "top_competitors": [],
-            "trending_topics": [],
-            "people_also_ask": [],
-            "related_searches": []
         }
+        results = run_search(params)
+        if self.archive:
+            self.archive.append("search", params, results, topic=keyword)
 
-        # Top organic results analysis
-        if "organic_results" in results:
-            for result in results["organic_results"][:5]:
-                competitor = {
-                    "title": result.get("title", ""),
-                    "snippet": result.get("snippet", ""),
-                    "link": result.get("link", ""),
-                    "position": result.get("position", 0)
-                }
-                analysis["top_competitors"].append(competitor)
-
-        # People also ask questions
-        if "people_also_ask" in results:
-            analysis["people_also_ask"] = [
-                paa.get("question", "") for paa in results["people_also_ask"]
-            ]
-
-        # Related searches
-        if "related_searches" in results:
-            analysis["related_searches"] = [
-                rs.get("query", "") for rs in results["related_searches"]
-            ]
+        # Extract competitive insights
+        analysis = {"trending_topics": [], **extract_competitive_analysis(results)}
 
         return analysis
 
     def trending_topics(self, base_keyword: str) -> List[Dict]:
-        """Get trending topics related to base keyword"""
-        search = GoogleSearch({
-            "q": f"{base_keyword} 2024 trends",
+        """Get trending topics related to base keyword (shared by its keyword family)"""
+        return get_news_cache().get_or_fetch(
+            base_keyword, lambda query: self._fetch_trending_topics(query, base_keyword)
+        )
+
+    def _fetch_trending_topics(self, query: str, base_keyword: str) -> List[Dict]:
+        """Run the news search for a trending query"""
+        params = {
+            "q": query,
             "api_key": self.api_key,
             "tbm": "nws",  # News results
             "hl": "en",
             "gl": "us"
-        })
-
-        results = search.get_dict()
-        trending = []
-
-        if "news_results" in results:
-            for news in results["news_results"][:5]:
-                trending.append({
-                    "title": news.get("title", ""),
-                    "source": news.get("source", ""),
-                    "date": news.get("date", "")
-                })
+        }
+        results = run_search(params)
+        if self.archive:
+            self.archive.append("news", params, results, topic=base_keyword)
 
-        return trending
\ No newline at end of file
+        return extract_trending_topics(results)
@@ -0,0 +1,239 @@
+"""
+Local SEO scoring of generated markdown.
+
+Scores a post without an LLM call: keyword density and placement, heading
+structure against the planner outline, coverage of "people also ask"
+questions, readability (Flesch reading ease) and leftover placeholders or
+image references (see quality.py). Text features are extracted per post with
+regexes, then every check is scored for the whole batch at once with numpy,
+so thousands of posts score in seconds.
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .outline import Outline
+from .quality import find_quality_issues
+
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$", re.MULTILINE)
+_SENTENCE_END = re.compile(r"[.!?]+(?:\s|$)")
+_VOWEL_GROUP = re.compile(r"[aeiouy]+")
+# Silent final e ("make"), but not "-le" ("table") or vowel + e ("free")
+_SILENT_E = re.compile(r"[^aeiouyl\s]e\b")
+_CODE_BLOCK = re.compile(r"```.*?```", re.DOTALL)
+_MARKUP = re.compile(r"[*_`>|]|^\s*[-+]\s+|^\s*\d+\.\s+|\[([^\]]*)\]\([^)]*\)", re.MULTILINE)
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it of on or should the to what when "
+    "where which who why will with you your".split()
+)
+
+# Points per check (sum to 100)
+WEIGHTS = {"keyword": 25, "headings": 20, "questions": 20, "readability": 20, "hygiene": 15}
+
+# Keyword density (keyword words / total words) scoring full points
+DENSITY_RANGE = (0.005, 0.025)
+# Density at and above which the keyword check scores zero (keyword stuffing)
+DENSITY_STUFFED = 0.05
+# Flesch reading ease scoring full points; zero at 20 points beyond either end
+READABILITY_RANGE = (50.0, 80.0)
+# Share of a question's content words the post must contain to cover it
+QUESTION_COVERAGE = 0.6
+# Share of an outline heading's words a markdown heading must contain to match it
+HEADING_MATCH = 0.5
+# Words counted as the introduction
+INTRO_WORDS = 100
+
+PostInput = Dict[str, Any]
+
+
+def _content_words(text: str) -> List[str]:
+    return [word for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+def _coverage(needle: Sequence[str], haystack: set) -> float:
+    return sum(word in haystack for word in needle) / len(needle) if needle else 0.0
+
+
+def _outline_headings(outline: Union[Outline, Dict[str, Any], None]) -> List[str]:
+    if outline is None:
+        return []
+    if isinstance(outline, dict):
+        outline = Outline.model_validate(outline)
+    return [section.heading for section in outline.sections]
+
+
+def _features(markdown: str, keyword: str, outline: Union[Outline, Dict[str, Any], None],
+              questions: Iterable[str]) -> Dict[str, Any]:
+    """Per-post counts the vectorized scoring works from"""
+    text = _CODE_BLOCK.sub(" ", markdown)
+    headings = [(len(marks), title) for marks, title in _HEADING.findall(text)]
+    body = _MARKUP.sub(r" \1 ", _HEADING.sub(" ", text)).lower()
+
+    words = _WORD.findall(body)
+    word_set = set(words)
+    keyword_words = _WORD.findall(keyword.lower())
+
+    # Keyword phrase occurrences as whole words
+    keyword_hits = 0
+    if keyword_words:
+        keyword_hits = len(re.findall(r"\b" + r"\W+".join(map(re.escape, keyword_words)) + r"\b", body))
+    intro = " ".join(words[:INTRO_WORDS])
+    keyword_phrase = " ".join(keyword_words)
+
+    # Outline sections matched by a heading of the post
+    heading_words = [set(_content_words(title)) for _, title in headings]
+    missing_sections = []
+    expected = _outline_headings(outline)
+    for section in expected:
+        needed = _content_words(section)
+        if not any(_coverage(needed, found) >= HEADING_MATCH for found in heading_words):
+            missing_sections.append(section)
+    levels = [level for level, _ in headings]
+    skipped_levels = sum(1 for previous, level in zip(levels, levels[1:]) if level > previous + 1)
+
+    missing_questions = []
+    question_list = [question for question in questions if question]
+    for question in question_list:
+        if _coverage(_content_words(question), word_set) < QUESTION_COVERAGE:
+            missing_questions.append(question)
+
+    return {
+        "words": len(words),
+        "sentences": len(_SENTENCE_END.findall(body)) or (1 if words else 0),
+        "syllables": max(len(_VOWEL_GROUP.findall(body)) - len(_SILENT_E.findall(body)), len(words)),
+        "keyword_words": len(keyword_words),
+        "keyword_hits": keyword_hits,
+        "keyword_in_heading": bool(keyword_phrase) and any(keyword_phrase in title.lower() for _, title in headings),
+        "keyword_in_intro": bool(keyword_phrase) and keyword_phrase in intro,
+        "headings": len(headings),
+        "h1": levels.count(1),
+        "h2": levels.count(2),
+        "skipped_levels": skipped_levels,
+        "outline_sections": len(expected),
+        "missing_sections": missing_sections,
+        "questions": len(question_list),
+        "missing_questions": missing_questions,
+        "issues": find_quality_issues(markdown)
+    }
+
+
+def _band(values: np.ndarray, low: float, high: float, low_zero: float, high_zero: float) -> np.ndarray:
+    """1 inside [low, high], falling linearly to 0 at low_zero and high_zero"""
+    return np.interp(values, [low_zero, low, high, high_zero], [0.0, 1.0, 1.0, 0.0])
+
+
+def score_posts(posts: Sequence[PostInput]) -> List[Dict[str, Any]]:
+    """
+    Score a batch of posts
+
+    Args:
+        posts: Dicts with markdown and keyword, and optionally outline
+            (Outline or its dict) and questions (people also ask)
+
+    Returns:
+        One report per post: score (0-100), per-check scores and details,
+        and human-readable issues
+    """
+    if not posts:
+        return []
+    features = [
+        _features(post["markdown"], post.get("keyword", ""), post.get("outline"), post.get("questions") or [])
+        for post in posts
+    ]
+
+    def column(name: str) -> np.ndarray:
+        return np.array([feature[name] for feature in features], dtype=float)
+
+    words = column("words")
+    safe_words = np.maximum(words, 1)
+    sentences = np.maximum(column("sentences"), 1)
+
+    density = column("keyword_hits") * column("keyword_words") / safe_words
+    keyword_score = (
+        0.6 * _band(density, *DENSITY_RANGE, 0.0, DENSITY_STUFFED)
+        + 0.2 * column("keyword_in_heading")
+        + 0.2 * column("keyword_in_intro")
+    )
+
+    outline_sections = column("outline_sections")
+    section_coverage = np.where(
+        outline_sections > 0,
+        1 - np.array([len(feature["missing_sections"]) for feature in features]) / np.maximum(outline_sections, 1),
+        np.minimum(column("h2") / 3, 1.0)
+    )
+    headings = column("headings")
+    hierarchy = np.where(headings > 0, 1 - column("skipped_levels") / np.maximum(headings - 1, 1), 0.0)
+    heading_score = 0.7 * section_coverage + 0.2 * hierarchy + 0.1 * (column("h1") <= 1)
+
+    questions = column("questions")
+    question_coverage = np.where(
+        questions > 0,
+        1 - np.array([len(feature["missing_questions"]) for feature in features]) / np.maximum(questions, 1),
+        1.0
+    )
+
+    flesch = 206.835 - 1.015 * (words / sentences) - 84.6 * (column("syllables") / safe_words)
+    low, high = READABILITY_RANGE
+    readability_score = np.where(words > 0, _band(flesch, low, high, low - 20, high + 20), 0.0)
+
+    hygiene_score = np.array([0.0 if feature["issues"] else 1.0 for feature in features])
+
+    checks = {
+        "keyword": keyword_score,
+        "headings": heading_score,
+        "questions": question_coverage,
+        "readability": readability_score,
+        "hygiene": hygiene_score
+    }
+    total = sum(WEIGHTS[name] * np.clip(scores, 0.0, 1.0) for name, scores in checks.items())
+
+    reports = []
+    for i, feature in enumerate(features):
+        issues = list(feature["issues"])
+        if density[i] < DENSITY_RANGE[0]:
+            issues.append(f"keyword density low ({density[i]:.2%})")
+        elif density[i] > DENSITY_RANGE[1]:
+            issues.append(f"keyword density high ({density[i]:.2%})")
+        issues += [f"outline section missing: {section}" for section in feature["missing_sections"]]
+        if feature["skipped_levels"]:
+            issues.append(f"{feature['skipped_levels']} skipped heading level(s)")
+        issues += [f"question not covered: {question}" for question in feature["missing_questions"]]
+        if words[i] and not low <= flesch[i] <= high:
+            issues.append(f"readability {flesch[i]:.0f} outside {low:.0f}-{high:.0f}")
+
+        reports.append({
+            "score": round(float(total[i]), 1),
+            "checks": {name: round(float(scores[i]), 3) for name, scores in checks.items()},
+            "keyword_density": round(float(density[i]), 4),
+            "keyword_in_heading": feature["keyword_in_heading"],
+            "keyword_in_intro": feature["keyword_in_intro"],
+            "flesch_reading_ease": round(float(flesch[i]), 1),
+            "words": feature["words"],
+            "headings": feature["headings"],
+            "questions_covered": feature["questions"] - len(feature["missing_questions"]),
+            "questions_total": feature["questions"],
+            "issues": issues
+        })
+    return reports
+
+
+def score_post(markdown: str, keyword: str, outline: Union[Outline, Dict[str, Any], None] = None,
+               questions: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Score one post (see score_posts)
+
+    Args:
+        markdown: Post content
+        keyword: SEO keyword the post targets
+        outline: Planner outline the headings are checked against
+        questions: "People also ask" questions the post should answer
+
+    Returns:
+        Score report
+    """
+    return score_posts([{"markdown": markdown, "keyword": keyword, "outline": outline,
+                         "questions": list(questions or [])}])[0]
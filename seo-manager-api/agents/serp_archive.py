@@ -0,0 +1,216 @@
+import gzip
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime, date
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Iterator, Tuple
+
+from .file_utils import file_lock
+from .news_cache import get_news_cache, keyword_family
+from .serp_extraction import extract_competitive_analysis, extract_trending_topics
+
+logger = logging.getLogger(__name__)
+
+# Request parameters that must never be persisted or take part in the key
+_EXCLUDED_PARAMS = {"api_key"}
+
+
+class SerpArchive:
+    """Append-only, compressed archive of raw SerpAPI responses"""
+
+    def __init__(self, archive_dir: str = "./serp_archive"):
+        self.archive_dir = Path(archive_dir)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(params: Dict[str, Any], day: Optional[str] = None) -> str:
+        """
+        Build the archive key for a query
+
+        Args:
+            params: SerpAPI request parameters (the api_key is ignored)
+            day: ISO date (YYYY-MM-DD) of the request, defaults to today
+
+        Returns:
+            Hex digest identifying query + params + date
+        """
+        clean_params = {k: v for k, v in params.items() if k not in _EXCLUDED_PARAMS}
+        payload = json.dumps(
+            {"params": clean_params, "date": day or date.today().isoformat()},
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def append(self, kind: str, params: Dict[str, Any], results: Dict[str, Any],
+               topic: Optional[str] = None) -> Optional[str]:
+        """
+        Append a raw SERP response to today's archive segment
+
+        Args:
+            kind: Type of query ('search' or 'news')
+            params: SerpAPI request parameters
+            results: Raw response dict returned by GoogleSearch.get_dict()
+            topic: Research topic the query was issued for
+
+        Returns:
+            Archive key, or None if the record could not be written
+        """
+        fetched_at = datetime.now()
+        day = fetched_at.date().isoformat()
+        key = self.make_key(params, day)
+
+        record = {
+            "key": key,
+            "kind": kind,
+            "topic": topic,
+            "params": {k: v for k, v in params.items() if k not in _EXCLUDED_PARAMS},
+            "fetched_at": fetched_at.isoformat(),
+            "results": results
+        }
+        line = (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+        try:
+            # Each append adds a new gzip member; readers see one continuous stream.
+            # The file lock keeps members from API and worker processes from interleaving
+            with self._lock, file_lock(self.archive_dir / ".append.lock"):
+                with gzip.open(self._segment_path(day), "ab") as f:
+                    f.write(line)
+            return key
+        except Exception as e:
+            logger.error(f"Error archiving SERP response: {e}")
+            return None
+
+    def iter_records(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                     kind: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream archived records in chronological order without loading whole segments
+
+        Args:
+            start_date: First ISO date to include (inclusive)
+            end_date: Last ISO date to include (inclusive)
+            kind: Only yield records of this kind
+
+        Yields:
+            Archived record dicts
+        """
+        for day, path in self._segments():
+            if start_date and day < start_date:
+                continue
+            if end_date and day > end_date:
+                continue
+
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:
+                            # A crash mid-write can leave a truncated last line
+                            logger.warning(f"Skipping corrupt record in {path.name}")
+                            continue
+                        if kind and record.get("kind") != kind:
+                            continue
+                        yield record
+            except EOFError:
+                logger.warning(f"Archive segment {path.name} ends with a truncated member")
+
+    def replay(self, start_date: Optional[str] = None,
+               end_date: Optional[str] = None) -> Iterator[Tuple[Dict[str, Any], Any]]:
+        """
+        Re-run extraction over archived responses
+
+        Yields:
+            (record, extracted) pairs, where extracted is the competitive analysis
+            for 'search' records and the trending list for 'news' records
+        """
+        for record in self.iter_records(start_date, end_date):
+            if record.get("kind") == "news":
+                yield record, extract_trending_topics(record["results"])
+            else:
+                yield record, extract_competitive_analysis(record["results"])
+
+    def backfill_cache(self, cache, start_date: Optional[str] = None,
+                       end_date: Optional[str] = None, news_cache=None) -> int:
+        """
+        Re-extract archived responses and write them into the research caches
+
+        Search responses become SEOContentCache entries (the latest search per
+        topic, unless the cache already holds a newer one), without news, as
+        live analyses are now cached. Running it again over the same archive
+        writes nothing.
+        News responses go to the trending news tier, keyed by keyword family;
+        only a family's latest news is kept, and never over fresher news.
+
+        Args:
+            cache: SEOContentCache instance to populate
+            start_date: First ISO date to include (inclusive)
+            end_date: Last ISO date to include (inclusive)
+            news_cache: TrendingNewsCache to populate (defaults to the process-wide one)
+
+        Returns:
+            Number of research cache entries written
+        """
+        if news_cache is None:
+            news_cache = get_news_cache()
+        searches: Dict[str, Tuple[Dict[str, Any], str]] = {}
+        news: Dict[str, Tuple[List[Dict], str, str]] = {}
+
+        for record, extracted in self.replay(start_date, end_date):
+            topic = record.get("topic")
+            if not topic:
+                continue
+            fetched_at = record["fetched_at"]
+            if record.get("kind") == "news":
+                family, _ = keyword_family(topic)
+                if family not in news or news[family][1] <= fetched_at:
+                    news[family] = (extracted, fetched_at, topic)
+            else:
+                # Records come oldest first, so the latest search of a topic wins
+                searches[topic] = (extracted, fetched_at)
+
+        written = 0
+        for topic, (competitive, fetched_at) in searches.items():
+            if cache.cache_serp_analysis(
+                topic=topic,
+                competitive_data=competitive,
+                trending_data=[],
+                cached_at=datetime.fromisoformat(fetched_at)
+            ):
+                written += 1
+        cache.flush()
+
+        families = sum(
+            1 for items, fetched_at, topic in news.values()
+            if news_cache.backfill(topic, items, datetime.fromisoformat(fetched_at).timestamp())
+        )
+
+        logger.info(f"Backfilled {written} cache entries and {families} news families from SERP archive")
+        return written
+
+    def get_archive_stats(self) -> Dict[str, Any]:
+        """Get statistics about the archive"""
+        segments = list(self._segments())
+        return {
+            'segments': len(segments),
+            'size_bytes': sum(path.stat().st_size for _, path in segments),
+            'first_date': segments[0][0] if segments else None,
+            'last_date': segments[-1][0] if segments else None,
+            'archive_directory': str(self.archive_dir)
+        }
+
+    def _segment_path(self, day: str) -> Path:
+        return self.archive_dir / f"serp_{day}.jsonl.gz"
+
+    def _segments(self) -> List[Tuple[str, Path]]:
+        """Archive segments as (date, path) pairs, oldest first"""
+        segments = []
+        for path in self.archive_dir.glob("serp_*.jsonl.gz"):
+            day = path.name[len("serp_"):-len(".jsonl.gz")]
+            segments.append((day, path))
+        return sorted(segments)
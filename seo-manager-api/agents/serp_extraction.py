@@ -0,0 +1,75 @@
+"""
+Extraction of competitive insights from raw SerpAPI responses.
+
+Shared by the research agents and by offline replay of the SERP archive so
+that live and re-run extraction always produce the same structure.
+"""
+
+from typing import Dict, List, Any
+
+
+def extract_competitive_analysis(results: Dict[str, Any], max_competitors: int = 5) -> Dict[str, List]:
+    """
+    Extract competitors, People Also Ask and related searches from a SERP response
+
+    Args:
+        results: Raw response dict returned by GoogleSearch.get_dict()
+        max_competitors: Number of organic results to keep
+
+    Returns:
+        Dict with top_competitors, people_also_ask and related_searches
+    """
+    analysis = {
+        "top_competitors": [],
+        "people_also_ask": [],
+        "related_searches": []
+    }
+
+    # Top organic results analysis
+    if "organic_results" in results:
+        for result in results["organic_results"][:max_competitors]:
+            competitor = {
+                "title": result.get("title", ""),
+                "snippet": result.get("snippet", ""),
+                "link": result.get("link", ""),
+                "position": result.get("position", 0)
+            }
+            analysis["top_competitors"].append(competitor)
+
+    # People also ask questions
+    if "people_also_ask" in results:
+        analysis["people_also_ask"] = [
+            paa.get("question", "") for paa in results["people_also_ask"]
+        ]
+
+    # Related searches
+    if "related_searches" in results:
+        analysis["related_searches"] = [
+            rs.get("query", "") for rs in results["related_searches"]
+        ]
+
+    return analysis
+
+
+def extract_trending_topics(results: Dict[str, Any], max_items: int = 5) -> List[Dict]:
+    """
+    Extract trending news items from a `tbm=nws` SERP response
+
+    Args:
+        results: Raw response dict returned by GoogleSearch.get_dict()
+        max_items: Number of news results to keep
+
+    Returns:
+        List of dicts with title, source and date
+    """
+    trending = []
+
+    if "news_results" in results:
+        for news in results["news_results"][:max_items]:
+            trending.append({
+                "title": news.get("title", ""),
+                "source": news.get("source", ""),
+                "date": news.get("date", "")
+            })
+
+    return trending
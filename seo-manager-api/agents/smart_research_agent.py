@@ -1,8 +1,12 @@
 import os
 import logging
-from serpapi import GoogleSearch
 from typing import Dict, List, Optional, Any
 from .content_cache import SEOContentCache
+from .news_cache import get_news_cache
+from .research_agent import run_search
+from utils.tracing import span
+from .serp_archive import SerpArchive
+from .serp_extraction import extract_competitive_analysis, extract_trending_topics
 
 logger = logging.getLogger(__name__)
 
@@ -10,21 +14,27 @@ logger = logging.getLogger(__name__)
 class SmartResearchAgent:
     """Enhanced research agent that uses semantic caching to avoid costly API calls"""
 
-    def __init__(self, similarity_threshold: float = 0.82):
+    def __init__(self, similarity_threshold: float = 0.82,
+                 archive_dir: Optional[str] = "./serp_archive"):
         self.api_key = os.getenv('SERP_API_KEY')
         if not self.api_key:
             raise ValueError("SERP_API_KEY not found in environment variables")
 
         self.cache = SEOContentCache()
         self.similarity_threshold = similarity_threshold
+        # Raw SERP responses are archived for offline re-extraction (None disables)
+        self.archive = SerpArchive(archive_dir) if archive_dir else None
 
-    def smart_competitive_analysis(self, keyword: str, num_results: int = 10) -> Dict[str, Any]:
+    def smart_competitive_analysis(self, keyword: str, num_results: int = 10,
+                                   trend_keyword: Optional[str] = None) -> Dict[str, Any]:
         """
         Perform competitive analysis with intelligent caching
 
         Args:
             keyword: The keyword to analyze
             num_results: Number of results to fetch (if not cached)
+            trend_keyword: Keyword whose family the trending news is shared by
+                (defaults to keyword)
 
         Returns:
             Analysis data (either from cache or fresh API call)
@@ -32,7 +42,12 @@ class SmartResearchAgent:
         logger.info(f"Searching for similar analysis to: {keyword}")
 
         # Check cache first
-        cached_result = self.cache.find_similar_analysis(keyword, self.similarity_threshold)
+        with span("cache.lookup", query=keyword) as lookup_span:
+            cached_result = self.cache.find_similar_analysis(keyword, self.similarity_threshold)
+            lookup_span.set_attributes(
+                hit=cached_result['found'],
+                similarity=round(cached_result.get('similarity', 0.0), 4)
+            )
 
         if cached_result['found']:
             logger.info(f"Found similar topic: {cached_result['original_topic']}")
@@ -52,7 +67,8 @@ class SmartResearchAgent:
                 'top_competitors': adapted_data['competitive_analysis']['top_competitors'],
                 'people_also_ask': adapted_data['competitive_analysis']['people_also_ask'],
                 'related_searches': adapted_data['competitive_analysis']['related_searches'],
-                'trending_topics': adapted_data['trending_topics']
+                # News has its own short-lived tier instead of the cached entry's copy
+                'trending_topics': self.trending_topics(trend_keyword or keyword)
             }
 
         else:
@@ -60,59 +76,35 @@ class SmartResearchAgent:
             logger.info("Performing fresh API analysis...")
 
             # Perform fresh analysis
-            return self._fresh_competitive_analysis(keyword, num_results)
+            return self._fresh_competitive_analysis(keyword, num_results, trend_keyword)
 
-    def _fresh_competitive_analysis(self, keyword: str, num_results: int = 10) -> Dict[str, Any]:
+    def _fresh_competitive_analysis(self, keyword: str, num_results: int = 10,
+                                    trend_keyword: Optional[str] = None) -> Dict[str, Any]:
         """Perform fresh competitive analysis using SerpAPI"""
-        search = GoogleSearch({
+        params = {
             "q": keyword,
             "api_key": self.api_key,
             "num": num_results,
             "hl": "en",
             "gl": "us"
-        })
-
-        results = search.get_dict()
+        }
+        results = run_search(params)
+        if self.archive:
+            self.archive.append("search", params, results, topic=keyword)
 
         # Extract competitive insights
-        analysis = {
-            "top_competitors": [],
-            "people_also_ask": [],
-            "related_searches": []
-        }
+        analysis = extract_competitive_analysis(results)
 
-        # Top organic results analysis
-        if "organic_results" in results:
-            for result in results["organic_results"][:5]:
-                competitor = {
-                    "title": result.get("title", ""),
-                    "snippet": result.get("snippet", ""),
-                    "link": result.get("link", ""),
-                    "position": result.get("position", 0)
-                }
-                analysis["top_competitors"].append(competitor)
-
-        # People also ask questions
-        if "people_also_ask" in results:
-            analysis["people_also_ask"] = [
-                paa.get("question", "") for paa in results["people_also_ask"]
-            ]
-
-        # Related searches
-        if "related_searches" in results:
-            analysis["related_searches"] = [
-                rs.get("query", "") for rs in results["related_searches"]
-            ]
-
-        # Get trending topics
-        trending_data = self._fresh_trending_topics(keyword)
+        # Get trending topics (cached separately, with a much shorter lifetime)
+        trending_data = self.trending_topics(trend_keyword or keyword)
 
         # Cache the fresh results
-        self.cache.cache_serp_analysis(
-            topic=keyword,
-            competitive_data=analysis,
-            trending_data=trending_data
-        )
+        with span("cache.write", topic=keyword):
+            self.cache.cache_serp_analysis(
+                topic=keyword,
+                competitive_data=analysis,
+                trending_data=[]
+            )
 
         logger.info("Fresh analysis cached for future use")
 
@@ -124,37 +116,30 @@ class SmartResearchAgent:
             'trending_topics': trending_data
         }
 
-    def _fresh_trending_topics(self, base_keyword: str) -> List[Dict]:
-        """Get trending topics related to base keyword"""
-        search = GoogleSearch({
-            "q": f"{base_keyword} 2024 trends",
+    def _fresh_trending_topics(self, query: str, base_keyword: str) -> List[Dict]:
+        """Run the news search for a trending query"""
+        params = {
+            "q": query,
             "api_key": self.api_key,
             "tbm": "nws",
             "hl": "en",
             "gl": "us"
-        })
-
-        results = search.get_dict()
-        trending = []
-
-        if "news_results" in results:
-            for news in results["news_results"][:5]:
-                trending.append({
-                    "title": news.get("title", ""),
-                    "source": news.get("source", ""),
-                    "date": news.get("date", "")
-                })
+        }
+        results = run_search(params)
+        if self.archive:
+            self.archive.append("news", params, results, topic=base_keyword)
 
-        return trending
+        return extract_trending_topics(results)
 
     def get_cache_statistics(self) -> Dict[str, Any]:
         """Get cache performance statistics"""
-        return self.cache.get_cache_stats()
+        return {**self.cache.get_cache_stats(), "trending_news": get_news_cache().get_stats()}
 
-    def force_fresh_analysis(self, keyword: str, num_results: int = 10) -> Dict[str, Any]:
+    def force_fresh_analysis(self, keyword: str, num_results: int = 10,
+                             trend_keyword: Optional[str] = None) -> Dict[str, Any]:
         """Force a fresh analysis even if cache exists"""
         logger.info("Forcing fresh analysis (ignoring cache)")
-        return self._fresh_competitive_analysis(keyword, num_results)
+        return self._fresh_competitive_analysis(keyword, num_results, trend_keyword)
 
     def clear_cache(self) -> bool:
         """Clear all cached data"""
@@ -173,11 +158,7 @@ class SmartResearchAgent:
         }
 
     def trending_topics(self, base_keyword: str) -> List[Dict]:
-        """Backward compatible trending topics method"""
-        # Check if we have cached trending data
-        cached_result = self.cache.find_similar_analysis(base_keyword, self.similarity_threshold)
-
-        if cached_result['found']:
-            return cached_result.get('trending_topics', [])
-        else:
-            return self._fresh_trending_topics(base_keyword)
\ No newline at end of file
+        """Trending news for the keyword's family, from the short-lived news tier"""
+        return get_news_cache().get_or_fetch(
+            base_keyword, lambda query: self._fresh_trending_topics(query, base_keyword)
+        )
\ No newline at end of file
@@ -0,0 +1,66 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional
+
+from .cancellation import POLL_SECONDS, current_token
+
+# Pipeline stage groups with independent concurrency limits
+STAGE_GROUPS = ("research", "llm", "publish")
+
+
+class StageLimiter:
+    """Per-stage concurrency limits shared by all jobs running in a process"""
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        limits = limits or {}
+        self.limits = {stage: max(1, int(limits.get(stage, 4))) for stage in STAGE_GROUPS}
+        self._semaphores = {stage: threading.BoundedSemaphore(limit) for stage, limit in self.limits.items()}
+        self._active = {stage: 0 for stage in STAGE_GROUPS}
+        self._waiting = {stage: 0 for stage in STAGE_GROUPS}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "StageLimiter":
+        """Build limits from STAGE_LIMIT_RESEARCH, STAGE_LIMIT_LLM and STAGE_LIMIT_PUBLISH"""
+        return cls({
+            "research": int(os.getenv("STAGE_LIMIT_RESEARCH", "4")),
+            "llm": int(os.getenv("STAGE_LIMIT_LLM", "4")),
+            # Astro builds are not safe to run concurrently
+            "publish": int(os.getenv("STAGE_LIMIT_PUBLISH", "1"))
+        })
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Hold a slot of the given stage group for the duration of the block"""
+        semaphore = self._semaphores[name]
+        token = current_token()
+        with self._lock:
+            self._waiting[name] += 1
+        try:
+            # Waiting jobs that get cancelled leave the queue without taking the slot
+            while not semaphore.acquire(timeout=POLL_SECONDS if token is not None else None):
+                token.check(name)
+        finally:
+            with self._lock:
+                self._waiting[name] -= 1
+        with self._lock:
+            self._active[name] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active[name] -= 1
+            semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Active and waiting counts per stage group"""
+        with self._lock:
+            return {
+                stage: {
+                    "limit": self.limits[stage],
+                    "active": self._active[stage],
+                    "waiting": self._waiting[stage]
+                }
+                for stage in STAGE_GROUPS
+            }
@@ -0,0 +1,15 @@
+"""
+Token estimation helpers.
+
+Gemini does not expose a local tokenizer, so token counts are estimated from
+character length (~4 characters per token for English text).
+"""
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a text"""
+    if not text:
+        return 0
+    return max(1, len(text) // CHARS_PER_TOKEN)
@@ -1,7 +1,15 @@
 import uuid
 import asyncio
+import hmac
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from datetime import datetime
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from typing import Dict, Any, List, Optional
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 import uvicorn
@@ -11,20 +19,102 @@ from models import (
     BlogPostRequest,
     BlogPostResponse,
     BlogPostStatus,
-    HealthCheck,
-    CompetitiveAnalysis,
-    TrendingTopic
+    HealthCheck
 )
-from agents.manager_agent import ManagerAgent
+from agents.cancellation import CancelToken, JobCancelled, DeadlineExceeded
+from agents.llm_pool import get_llm_pool
+from agents.model_router import get_model_router
+from agents.preview_cache import get_preview_cache
+from job_queue import get_job_queue
+from scheduler import JobScheduler
+from utils.logger_config import LoggingConfig
+from utils.profiling import get_cpu_profiler, get_memory_profiler
+from utils.tracing import get_tracer
+from utils.transport import CachedPayload, choose_encoding, encoding_etag, etag_matches, payload_response
 
 # Load environment variables
 load_dotenv()
 
+# LOG_MODE=production switches to queued JSON logging with rotation
+LoggingConfig.from_env()
+
+logger = logging.getLogger(__name__)
+
+# The manager agent is built on first use (or by the background warm-up) so the
+# process can serve liveness checks before langchain, chromadb and the LLM
+# clients are loaded
+_manager = None
+_manager_lock = threading.Lock()
+_manager_state = {"status": "not_started", "error": None, "init_seconds": None}
+
+
+def get_manager():
+    """Get the shared ManagerAgent, building it on first use"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager_state["status"] = "initializing"
+                start = time.perf_counter()
+                try:
+                    from agents.manager_agent import ManagerAgent
+                    _manager = ManagerAgent()
+                except Exception as e:
+                    _manager_state.update(status="failed", error=str(e))
+                    raise
+                _manager_state.update(
+                    status="ready",
+                    error=None,
+                    init_seconds=round(time.perf_counter() - start, 3)
+                )
+                logger.info(f"ManagerAgent ready in {_manager_state['init_seconds']}s")
+    return _manager
+
+
+async def get_manager_async():
+    """get_manager for request handlers: a cold start builds (or waits for) the manager off the event loop"""
+    if _manager is not None:
+        return _manager
+    return await asyncio.to_thread(get_manager)
+
+
+def _warm_up_manager():
+    try:
+        get_manager()
+    except Exception as e:
+        logger.error(f"ManagerAgent initialization failed: {e}")
+
+
+def _run_embedded_worker(index: int):
+    from worker import Worker
+    try:
+        worker = Worker(job_queue, get_manager(), f"api-{os.getpid()}-{index}")
+    except Exception as e:
+        logger.error(f"Embedded worker {index} could not start: {e}")
+        return
+    worker.run()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the manager in the background; the server starts accepting requests immediately.
+    # With a job queue the API only builds it for the sync endpoint and embedded workers
+    if job_queue is None and os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true":
+        threading.Thread(target=_warm_up_manager, name="manager-warmup", daemon=True).start()
+    if job_queue is not None:
+        for index in range(JOB_EMBEDDED_WORKERS):
+            threading.Thread(
+                target=_run_embedded_worker, args=(index,), name=f"embedded-worker-{index}", daemon=True
+            ).start()
+    yield
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="SEO Blog Post Generator API",
     description="Multi-agent system for generating competitive, SEO-optimized blog posts",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -36,37 +126,172 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize the manager agent
-manager = ManagerAgent()
-
 # In-memory storage for job status (use Redis/DB for production)
 job_status = {}
+# Serializes status transitions that depend on the current status (cancel vs. finish)
+job_status_lock = threading.Lock()
+
+# Cancellation tokens of jobs that are queued or running
+job_tokens: Dict[str, CancelToken] = {}
+
+# Default per-job deadline in seconds, counted from submission (0 = none)
+JOB_DEADLINE_SECONDS = float(os.getenv("JOB_DEADLINE_SECONDS", "0"))
+
+# Runs generation jobs off the event loop, interactive before batch and fair across clients
+scheduler = JobScheduler.from_env()
+
+# JOB_BACKEND=sqlite or redis: the API only enqueues jobs to a durable queue and
+# worker.py processes run them; "inprocess" (default) runs them on the scheduler
+JOB_BACKEND = os.getenv("JOB_BACKEND", "inprocess").lower()
+job_queue = get_job_queue(JOB_BACKEND) if JOB_BACKEND != "inprocess" else None
+
+# Worker threads run inside the API process (development, or REDIS_URL=local://)
+JOB_EMBEDDED_WORKERS = int(os.getenv("JOB_EMBEDDED_WORKERS", "0"))
+
+# Token for the /admin endpoints (sent as X-Admin-Token); unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# /preview caching: short (and revalidated in the background) until the static build
+# serves the post, longer once the preview only backs up the built page
+PREVIEW_CACHE_CONTROL = os.getenv("PREVIEW_CACHE_CONTROL", "public, max-age=30, stale-while-revalidate=300")
+PREVIEW_CACHE_CONTROL_BUILT = os.getenv("PREVIEW_CACHE_CONTROL_BUILT", "public, max-age=3600")
+# Previews render LLM output on the API's origin: no scripts, only the page's own inline styles
+PREVIEW_CSP = "default-src 'none'; img-src https: data:; style-src 'unsafe-inline'; base-uri 'none'; form-action 'none'"
+
+
+def generate_blog_post_task(job_id: str, request: BlogPostRequest, queue_wait_ms: float):
+    """Scheduled task for blog post generation"""
+    run_generation_job(job_id, lambda token: get_manager().generate_blog_post(
+        topic=request.topic,
+        keyword=request.keyword,
+        tone=request.tone,
+        job_id=job_id,
+        cancel_token=token,
+        allow_duplicate=request.allow_duplicate
+    ), queue_wait_ms)
+
+
+def resume_blog_post_task(job_id: str, queue_wait_ms: float):
+    """Scheduled task resuming an interrupted generation from its checkpoints"""
+    run_generation_job(
+        job_id,
+        lambda token: get_manager().resume_blog_post(job_id, cancel_token=token),
+        queue_wait_ms
+    )
+
+
+def refresh_blog_post_task(job_id: str, slug: str, queue_wait_ms: float):
+    """Scheduled task refreshing a published post with new research"""
+    run_generation_job(
+        job_id,
+        lambda token: get_manager().refresh_blog_post(slug, job_id=job_id, cancel_token=token),
+        queue_wait_ms
+    )
+
+
+def new_cancel_token(job_id: str, timeout_seconds: Optional[float] = None) -> CancelToken:
+    """Register the cancellation token and deadline of a newly submitted job"""
+    token = CancelToken(timeout_seconds or JOB_DEADLINE_SECONDS or None)
+    job_tokens[job_id] = token
+    return token
+
+
+def get_client_id(request: Request) -> str:
+    """Identify the submitting client for fair queuing (X-Client-Id header, else remote address)"""
+    client_id = request.headers.get("x-client-id")
+    if client_id:
+        return client_id[:128]
+    return request.client.host if request.client else "anonymous"
+
+
+def build_result_payload(result: Dict[str, Any], job_id: str) -> CachedPayload:
+    """Validate a generation result once and keep only its serialized response"""
+    response = BlogPostResponse.from_result(result, job_id)
+    return CachedPayload(response.model_dump(mode="json"))
+
+
+@lru_cache(maxsize=128)
+def queued_result_payload(job_id: str) -> Optional[CachedPayload]:
+    """Serialized result of a job completed by a worker (results never change once completed)"""
+    result = job_queue.get_result(job_id)
+    return CachedPayload(result) if result is not None else None
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Status record of a job, from the durable queue or the in-process job table"""
+    if job_queue is not None:
+        return job_queue.get(job_id)
+    return job_status.get(job_id)
+
+
+def require_admin(request: Request) -> None:
+    """Allow only requests carrying ADMIN_TOKEN (the endpoints do not exist without it)"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = request.headers.get("x-admin-token", "")
+    if not hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse and validate a comma-separated ?fields= selection"""
+    if not fields:
+        return None
+
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in BlogPostResponse.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return selected or None
 
 
-async def generate_blog_post_task(job_id: str, request: BlogPostRequest):
-    """Background task for blog post generation"""
+def run_generation_job(job_id: str, generate, queue_wait_ms: Optional[float] = None):
+    """Run a generation and record its outcome in job_status"""
+    scheduling = {
+        "priority": job_status.get(job_id, {}).get("priority"),
+        "queue_wait_ms": queue_wait_ms
+    }
+    token = job_tokens.get(job_id)
     try:
-        job_status[job_id] = {"status": "processing", "progress": 10}
+        # The job may have been cancelled or run out of time while queued
+        if token is not None:
+            token.check("start")
+        with job_status_lock:
+            # A cancel that raced the start stays visible until the token stops the job
+            if job_status.get(job_id, {}).get("status") != "cancelling":
+                job_status[job_id] = {"status": "processing", "progress": 10, **scheduling}
 
         # Generate blog post using the manager agent
-        result = manager.generate_blog_post(
-            topic=request.topic,
-            keyword=request.keyword,
-            tone=request.tone
-        )
+        result = generate(token)
+        result.setdefault("metrics", {})["queue_wait_ms"] = queue_wait_ms
 
-        job_status[job_id] = {
-            "status": "completed",
-            "progress": 100,
-            "result": result
-        }
+        # Serialize once; the draft and raw result dict are not kept in memory
+        payload = build_result_payload(result, job_id)
+        with job_status_lock:
+            job_status[job_id] = {"status": "completed", "progress": 100, "payload": payload, **scheduling}
 
     except Exception as e:
-        job_status[job_id] = {
-            "status": "error",
-            "message": str(e),
-            "progress": 0
-        }
+        # Completed stages stay checkpointed so the job can be resumed
+        checkpoints = _manager.checkpoints if _manager else None
+        last_stage = checkpoints.last_stage(job_id) if checkpoints else None
+        if isinstance(e, JobCancelled):
+            status = "cancelled"
+        elif isinstance(e, DeadlineExceeded):
+            status = "timed_out"
+        else:
+            status = "error"
+        with job_status_lock:
+            job_status[job_id] = {
+                "status": status,
+                "message": str(e),
+                "progress": 0,
+                "resumable": last_stage is not None,
+                "last_stage": last_stage,
+                **scheduling
+            }
+
+    finally:
+        job_tokens.pop(job_id, None)
 
 
 @app.get("/", response_model=HealthCheck)
@@ -85,12 +310,12 @@ async def health_check():
     try:
         # Check environment variables
         google_key = os.getenv('GOOGLE_API_KEY')
-        serpapi_key = os.getenv('SERPAPI_KEY')
+        serpapi_key = os.getenv('SERP_API_KEY')
 
         if not google_key:
             raise Exception("GOOGLE_API_KEY not configured")
         if not serpapi_key:
-            raise Exception("SERPAPI_KEY not configured")
+            raise Exception("SERP_API_KEY not configured")
 
         return HealthCheck(
             status="healthy",
@@ -101,24 +326,96 @@ async def health_check():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/health/live", response_model=HealthCheck)
+async def liveness():
+    """Liveness probe: the process is up and serving requests"""
+    return HealthCheck(
+        status="alive",
+        message="Process is running",
+        timestamp=datetime.now().isoformat()
+    )
+
+
+@app.get("/health/ready", response_model=HealthCheck)
+async def readiness():
+    """Readiness probe: the manager agent and its clients are initialized (worker mode: the queue is reachable)"""
+    if job_queue is not None and JOB_EMBEDDED_WORKERS == 0:
+        try:
+            job_queue.get_stats()
+        except Exception as e:
+            raise HTTPException(status_code=503, detail=f"Job queue unavailable: {e}")
+        return HealthCheck(
+            status="ready",
+            message=f"Enqueuing to the {JOB_BACKEND} job queue",
+            timestamp=datetime.now().isoformat()
+        )
+
+    if _manager is None:
+        detail = _manager_state["error"] or f"ManagerAgent is {_manager_state['status']}"
+        raise HTTPException(status_code=503, detail=detail)
+
+    return HealthCheck(
+        status="ready",
+        message=f"ManagerAgent initialized in {_manager_state['init_seconds']}s",
+        timestamp=datetime.now().isoformat()
+    )
+
+
+@app.get("/stats", response_model=dict)
+async def get_stats():
+    """Pipeline counters (outline parsing and repairs, LLM pool and routing, scheduling, job queue, dedup)"""
+    # In worker mode the pipeline runs elsewhere; only report it if this process built a manager
+    manager = await get_manager_async() if job_queue is None else _manager
+    return {
+        "outline": manager.get_outline_stats() if manager else None,
+        "llm_pool": get_llm_pool().get_stats(),
+        "llm_routing": get_model_router().get_stats(),
+        "scheduler": scheduler.get_stats(),
+        "job_queue": job_queue.get_stats() if job_queue else None,
+        "stage_limits": manager.stage_limiter.get_stats() if manager else None,
+        "dedup": manager.post_index.get_stats() if manager and manager.post_index is not None else None,
+        "preview": get_preview_cache().get_stats(),
+        "tracing": get_tracer().get_stats()
+    }
+
+
 @app.post("/generate", response_model=dict)
-async def generate_blog_post(request: BlogPostRequest, background_tasks: BackgroundTasks):
+async def generate_blog_post(request: BlogPostRequest, http_request: Request):
     """
     Start blog post generation process
-    Returns a job ID to track progress
+    Returns a job ID to track progress; batch jobs are queued behind interactive ones
     """
     job_id = str(uuid.uuid4())
 
-    # Initialize job status
-    job_status[job_id] = {"status": "pending", "progress": 0}
-
-    # Start background task
-    background_tasks.add_task(generate_blog_post_task, job_id, request)
+    if job_queue is not None:
+        # Worker mode: persist the job; a worker process picks it up
+        queued_ahead = job_queue.enqueue(
+            job_id,
+            "generate",
+            request.model_dump(),
+            priority=request.priority,
+            client_id=get_client_id(http_request),
+            timeout_seconds=request.timeout_seconds or JOB_DEADLINE_SECONDS or None
+        )
+    else:
+        # Initialize job status
+        job_status[job_id] = {"status": "pending", "progress": 0, "priority": request.priority}
+        new_cancel_token(job_id, request.timeout_seconds)
+
+        # Queue the job with the scheduler
+        queued_ahead = scheduler.submit(
+            job_id,
+            lambda queue_wait_ms: generate_blog_post_task(job_id, request, queue_wait_ms),
+            priority=request.priority,
+            client_id=get_client_id(http_request)
+        )
 
     return {
         "job_id": job_id,
         "status": "started",
         "message": "Blog post generation started",
+        "priority": request.priority,
+        "queued_ahead": queued_ahead,
         "check_status_url": f"/status/{job_id}"
     }
 
@@ -126,98 +423,308 @@ async def generate_blog_post(request: BlogPostRequest, background_tasks: Backgro
 @app.get("/status/{job_id}", response_model=BlogPostStatus)
 async def get_job_status(job_id: str):
     """Get the status of a blog post generation job"""
-    if job_id not in job_status:
+    job = get_job(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    job = job_status[job_id]
+    # The preview is rendered before the post is published (by this process or a worker)
+    slug = await asyncio.to_thread(get_preview_cache().slug_for_job, job_id) \
+        if job["status"] != "pending" else None
     return BlogPostStatus(
         status=job["status"],
         message=job.get("message"),
-        progress=job.get("progress")
+        progress=job.get("progress"),
+        resumable=job.get("resumable"),
+        last_stage=job.get("last_stage"),
+        priority=job.get("priority"),
+        queue_wait_ms=job.get("queue_wait_ms"),
+        attempts=job.get("attempts"),
+        blog_slug=slug,
+        preview_url=f"/preview/{slug}" if slug else None
     )
 
 
+@app.get("/jobs/resumable", response_model=dict)
+async def list_resumable_jobs():
+    """List interrupted jobs whose completed stages are checkpointed on disk"""
+    if job_queue is not None:
+        # Checkpoints live with the workers; the queue records each failed job's last stage
+        return {"jobs": await asyncio.to_thread(job_queue.list_resumable)}
+    manager = await get_manager_async()
+    return {"jobs": await asyncio.to_thread(manager.list_resumable_jobs)}
+
+
+@app.post("/jobs/{job_id}/resume", response_model=dict)
+async def resume_job(job_id: str, http_request: Request, priority: str = "interactive"):
+    """
+    Resume a failed or interrupted job from its last completed stage
+    Works across restarts since checkpoints are persisted on disk
+    """
+    job = get_job(job_id)
+    if job and job["status"] in ("pending", "processing", "cancelling", "completed"):
+        raise HTTPException(status_code=409, detail=f"Job is already {job['status']}")
+
+    if priority not in ("interactive", "batch"):
+        raise HTTPException(status_code=400, detail="priority must be interactive or batch")
+
+    if job_queue is not None:
+        # Checkpoints live with the workers; the queue knows whether the job reached one
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if not job.get("resumable"):
+            raise HTTPException(status_code=404, detail="No checkpoints found for job")
+        job_queue.enqueue(job_id, "resume", {}, priority=priority, client_id=get_client_id(http_request),
+                          timeout_seconds=JOB_DEADLINE_SECONDS or None)
+    else:
+        manager = await get_manager_async()
+        resumable = await asyncio.to_thread(manager.list_resumable_jobs)
+        if not any(j["job_id"] == job_id for j in resumable):
+            raise HTTPException(status_code=404, detail="No checkpoints found for job")
+
+        job_status[job_id] = {"status": "pending", "progress": 0, "priority": priority}
+        new_cancel_token(job_id)
+        scheduler.submit(
+            job_id,
+            lambda queue_wait_ms: resume_blog_post_task(job_id, queue_wait_ms),
+            priority=priority,
+            client_id=get_client_id(http_request)
+        )
+
+    return {
+        "job_id": job_id,
+        "status": "resuming",
+        "message": "Blog post generation resumed from last checkpoint",
+        "check_status_url": f"/status/{job_id}"
+    }
+
+
+@app.post("/posts/{slug}/refresh", response_model=dict)
+async def refresh_post(slug: str, http_request: Request, priority: str = "batch"):
+    """
+    Refresh a published post with new research
+    Only the sections affected by new competitors, questions and related
+    searches are rewritten; the post keeps its URL. Returns a job ID whose
+    result is the updated post (metrics.refresh has the research diff)
+    """
+    if priority not in ("interactive", "batch"):
+        raise HTTPException(status_code=400, detail="priority must be interactive or batch")
+
+    job_id = str(uuid.uuid4())
+    if job_queue is not None:
+        # Outputs live with the workers; a worker reports an error if the post is unknown
+        job_queue.enqueue(job_id, "refresh", {"slug": slug}, priority=priority,
+                          client_id=get_client_id(http_request), timeout_seconds=JOB_DEADLINE_SECONDS or None)
+    else:
+        manager = await get_manager_async()
+        if await asyncio.to_thread(manager.find_output, slug=slug) is None:
+            raise HTTPException(status_code=404, detail="Post not found")
+
+        job_status[job_id] = {"status": "pending", "progress": 0, "priority": priority}
+        new_cancel_token(job_id)
+        scheduler.submit(
+            job_id,
+            lambda queue_wait_ms: refresh_blog_post_task(job_id, slug, queue_wait_ms),
+            priority=priority,
+            client_id=get_client_id(http_request)
+        )
+
+    return {
+        "job_id": job_id,
+        "status": "started",
+        "message": f"Refresh of {slug} started",
+        "priority": priority,
+        "check_status_url": f"/status/{job_id}"
+    }
+
+
+@app.delete("/jobs/{job_id}", response_model=dict)
+async def cancel_job(job_id: str):
+    """
+    Cancel a queued or running job
+    Queued jobs are dropped immediately; running jobs stop at the next stage
+    boundary or blocking call, releasing their worker and LLM slots
+    """
+    if job_queue is not None:
+        status = job_queue.cancel(job_id)
+        if status is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if status not in ("cancelled", "cancelling"):
+            raise HTTPException(status_code=409, detail=f"Job is already {status}")
+        return {
+            "job_id": job_id,
+            "status": status,
+            "check_status_url": f"/status/{job_id}"
+        }
+
+    # Checked and set under the lock: a job finishing meanwhile keeps its final status
+    with job_status_lock:
+        job = job_status.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+
+        token = job_tokens.get(job_id)
+        if token is None or job["status"] not in ("pending", "processing"):
+            raise HTTPException(status_code=409, detail=f"Job is already {job['status']}")
+
+        token.cancel()
+        if scheduler.cancel(job_id):
+            job_tokens.pop(job_id, None)
+            job_status[job_id] = {**job, "status": "cancelled", "message": "Job cancelled before it started"}
+            status = "cancelled"
+        else:
+            job_status[job_id] = {**job, "status": "cancelling"}
+            status = "cancelling"
+
+    return {
+        "job_id": job_id,
+        "status": status,
+        "check_status_url": f"/status/{job_id}"
+    }
+
+
 @app.get("/result/{job_id}", response_model=BlogPostResponse)
-async def get_blog_post_result(job_id: str):
-    """Get the completed blog post result"""
-    if job_id not in job_status:
+async def get_blog_post_result(job_id: str, request: Request, fields: Optional[str] = None):
+    """
+    Get the completed blog post result
+    Use ?fields=final_post,outline to fetch only some fields; responses are
+    compressed when the client accepts it and support If-None-Match
+    """
+    job = get_job(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    job = job_status[job_id]
-
     if job["status"] != "completed":
         raise HTTPException(
             status_code=400,
             detail=f"Job not completed. Current status: {job['status']}"
         )
 
-    result = job["result"]
+    payload = queued_result_payload(job_id) if job_queue is not None else job["payload"]
+    return payload_response(payload, request, parse_fields(fields))
 
-    # Transform competitive analysis
-    competitive_analysis = CompetitiveAnalysis(
-        top_competitors=result["competitive_analysis"]["top_competitors"],
-        people_also_ask=result["competitive_analysis"]["people_also_ask"],
-        related_searches=result["competitive_analysis"]["related_searches"]
-    )
 
-    # Transform trending topics
-    trending_topics = [
-        TrendingTopic(**topic) for topic in result["trending_topics"]
-    ]
-
-    return BlogPostResponse(
-        topic=result["topic"],
-        keyword=result["keyword"],
-        tone=result["tone"],
-        final_post=result["final_post"],
-        outline=result["outline"],
-        competitive_analysis=competitive_analysis,
-        trending_topics=trending_topics,
-        generation_id=job_id
-    )
+@app.get("/preview/{slug}", response_class=Response)
+async def get_post_preview(slug: str, request: Request):
+    """
+    Rendered HTML of a finished post, available as soon as generation completes
+    Cached briefly until the Astro build serves the post, then for longer;
+    supports If-None-Match and gzip/br
+    """
+    previews = get_preview_cache()
+    entry = await asyncio.to_thread(previews.get, slug)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Preview not found")
+
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""), len(entry["html"]))
+    headers = {
+        "ETag": encoding_etag(entry["etag"], encoding),
+        "Cache-Control": PREVIEW_CACHE_CONTROL_BUILT if entry["built"] else PREVIEW_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+        "X-Static-Build": "complete" if entry["built"] else "pending",
+        "X-Robots-Tag": "noindex",
+        "Content-Security-Policy": PREVIEW_CSP,
+        "X-Content-Type-Options": "nosniff"
+    }
+    if etag_matches(request.headers.get("if-none-match", ""), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=previews.body(entry, encoding), media_type="text/html; charset=utf-8", headers=headers)
 
 
 @app.post("/generate-sync", response_model=BlogPostResponse)
-async def generate_blog_post_sync(request: BlogPostRequest):
+async def generate_blog_post_sync(request: BlogPostRequest, http_request: Request,
+                                  fields: Optional[str] = None):
     """
     Synchronous blog post generation (for testing/development)
     Warning: This may take several minutes to complete
     """
+    selected = parse_fields(fields)
+
     try:
         job_id = str(uuid.uuid4())
 
-        # Generate blog post synchronously
-        result = manager.generate_blog_post(
+        # Generate blog post synchronously (in a thread, so other requests are still served)
+        manager = await get_manager_async()
+        result = await asyncio.to_thread(
+            manager.generate_blog_post,
             topic=request.topic,
             keyword=request.keyword,
-            tone=request.tone
+            tone=request.tone,
+            cancel_token=CancelToken(request.timeout_seconds or JOB_DEADLINE_SECONDS or None),
+            allow_duplicate=request.allow_duplicate
         )
 
-        # Transform and return result
-        competitive_analysis = CompetitiveAnalysis(
-            top_competitors=result["competitive_analysis"]["top_competitors"],
-            people_also_ask=result["competitive_analysis"]["people_also_ask"],
-            related_searches=result["competitive_analysis"]["related_searches"]
-        )
-
-        trending_topics = [
-            TrendingTopic(**topic) for topic in result["trending_topics"]
-        ]
-
-        return BlogPostResponse(
-            topic=result["topic"],
-            keyword=result["keyword"],
-            tone=result["tone"],
-            final_post=result["final_post"],
-            outline=result["outline"],
-            competitive_analysis=competitive_analysis,
-            trending_topics=trending_topics,
-            generation_id=job_id
-        )
+        payload = build_result_payload(result, job_id)
 
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    return payload_response(payload, http_request, selected, cache_control="no-store")
+
+
+@app.post("/admin/profile/cpu/start", response_model=dict, dependencies=[Depends(require_admin)])
+async def start_cpu_profile(seconds: float = 30.0, interval_ms: float = 5.0):
+    """Sample all threads' stacks for `seconds` (stops on its own)"""
+    try:
+        return get_cpu_profiler().start(seconds, interval_ms / 1000)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.post("/admin/profile/cpu/stop", response_model=dict, dependencies=[Depends(require_admin)])
+async def stop_cpu_profile(limit: int = 25):
+    """Stop the CPU profile early and return its hottest functions"""
+    profiler = get_cpu_profiler()
+    await asyncio.to_thread(profiler.stop)
+    return {**profiler.status(), **profiler.top(limit)}
+
+
+@app.get("/admin/profile/cpu", response_model=dict, dependencies=[Depends(require_admin)])
+async def get_cpu_profile(limit: int = 25):
+    """Status of the CPU profile and, once finished, its hottest functions"""
+    profiler = get_cpu_profiler()
+    status = profiler.status()
+    return {**status, **profiler.top(limit)} if status["status"] == "finished" else status
+
+
+@app.get("/admin/profile/cpu/folded", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def get_cpu_profile_folded():
+    """Last finished CPU profile as folded stacks (flamegraph.pl, speedscope, inferno)"""
+    profiler = get_cpu_profiler()
+    if profiler.result() is None:
+        raise HTTPException(status_code=404, detail="No finished CPU profile")
+    return PlainTextResponse(
+        profiler.folded(),
+        headers={"Content-Disposition": 'attachment; filename="cpu-profile.folded"'}
+    )
+
+
+@app.post("/admin/profile/memory/start", response_model=dict, dependencies=[Depends(require_admin)])
+async def start_memory_profile(frames: int = 10):
+    """Start tracemalloc and take the baseline snapshot"""
+    return await asyncio.to_thread(get_memory_profiler().start, frames)
+
+
+@app.get("/admin/profile/memory/snapshot", response_model=dict, dependencies=[Depends(require_admin)])
+async def get_memory_snapshot(limit: int = 25, group_by: str = "lineno", compare_to: str = "baseline"):
+    """Top allocation sites and their growth since the baseline (or the previous snapshot)"""
+    try:
+        return await asyncio.to_thread(get_memory_profiler().snapshot, limit, group_by, compare_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.post("/admin/profile/memory/stop", response_model=dict, dependencies=[Depends(require_admin)])
+async def stop_memory_profile():
+    """Stop tracemalloc (its per-allocation overhead ends with it)"""
+    return get_memory_profiler().stop()
+
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
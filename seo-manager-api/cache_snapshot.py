@@ -0,0 +1,55 @@
+"""
+Export and import research cache snapshots
+
+A snapshot holds every cached topic with its SERP payload and embedding in
+one gzipped, versioned file, so a new node or container can start with a
+warm cache instead of sending its first hours of traffic to SerpAPI.
+Setting CACHE_SNAPSHOT_PATH imports it automatically when the cache is empty.
+
+Usage:
+    python cache_snapshot.py export snapshots/seo_cache.jsonl.gz
+    python cache_snapshot.py import snapshots/seo_cache.jsonl.gz [--policy newer] [--max-age-days 30]
+    python cache_snapshot.py info snapshots/seo_cache.jsonl.gz
+"""
+
+import argparse
+import json
+import os
+import time
+
+from dotenv import load_dotenv
+
+from agents.content_cache import SNAPSHOT_POLICIES, SEOContentCache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and import research cache snapshots")
+    parser.add_argument("command", choices=("export", "import", "info"))
+    parser.add_argument("path", help="Snapshot file (*.jsonl.gz)")
+    parser.add_argument("--cache-dir", default="./seo_cache", help="Chroma directory (embedded mode)")
+    parser.add_argument("--policy", choices=SNAPSHOT_POLICIES, default="newer",
+                        help="Conflict rule for topics already cached")
+    parser.add_argument("--max-age-days", type=float, default=None,
+                        help="Skip entries whose SERP data is older than this")
+    args = parser.parse_args()
+
+    load_dotenv()
+
+    if args.command == "info":
+        print(json.dumps(SEOContentCache.read_snapshot_header(args.path), indent=2))
+        return
+
+    # The CLI decides what to import, not CACHE_SNAPSHOT_PATH
+    os.environ.pop("CACHE_SNAPSHOT_PATH", None)
+    cache = SEOContentCache(args.cache_dir, flush_interval=0)
+    start = time.perf_counter()
+    if args.command == "export":
+        result = cache.export_snapshot(args.path)
+    else:
+        result = cache.import_snapshot(args.path, policy=args.policy, max_age_days=args.max_age_days)
+    result["seconds"] = round(time.perf_counter() - start, 2)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
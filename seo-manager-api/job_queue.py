@@ -0,0 +1,998 @@
+"""
+Durable generation job queue shared by the API and worker processes
+
+With JOB_BACKEND=sqlite (or redis) the API only enqueues jobs and reads
+their status and results; `worker.py` processes claim jobs, hold them under a
+lease they keep extending with heartbeats, and ack or fail them. A job whose
+worker dies (crash, deploy) is claimed again once its lease runs out and, as
+its stages are checkpointed under the job id, resumes where it stopped.
+Failed jobs are retried with exponential backoff up to a maximum number of
+attempts; cancellations and deadlines are not retried.
+
+SQLite (WAL mode) is the default store and works for any number of worker
+processes on one host. The Redis store needs the `redis` package and a
+server; REDIS_URL=local:// swaps in an in-process stand-in for development
+and tests, where workers run inside the API process.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_CLASSES = ("interactive", "batch")
+
+# Statuses a job can end in; anything else is still queued or running
+FINAL_STATUSES = ("completed", "error", "cancelled", "timed_out")
+
+_PRIORITY_RANK = {"interactive": 0, "batch": 1}
+
+
+class QueuedJob:
+    """A job claimed by a worker"""
+
+    __slots__ = ("job_id", "kind", "payload", "priority", "attempts", "deadline_at", "queue_wait_ms")
+
+    def __init__(self, job_id: str, kind: str, payload: Dict[str, Any], priority: str,
+                 attempts: int, deadline_at: Optional[float], queue_wait_ms: Optional[float]):
+        self.job_id = job_id
+        self.kind = kind
+        self.payload = payload
+        self.priority = priority
+        self.attempts = attempts
+        self.deadline_at = deadline_at
+        self.queue_wait_ms = queue_wait_ms
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the job's deadline (None if it has none)"""
+        if self.deadline_at is None:
+            return None
+        return max(0.0, self.deadline_at - time.time())
+
+
+def _progress(status: str) -> int:
+    return {"processing": 10, "cancelling": 10, "completed": 100}.get(status, 0)
+
+
+class SQLiteJobQueue:
+    """Job queue stored in a SQLite database in WAL mode"""
+
+    def __init__(self, path: str = "jobs.db", lease_seconds: float = 60.0,
+                 max_attempts: int = 3, retry_backoff: float = 10.0):
+        """
+        Args:
+            path: Database file, shared by the API and the workers
+            lease_seconds: How long a claim lasts without a heartbeat
+            max_attempts: Attempts per job before it is marked as failed
+            retry_backoff: Delay before the first retry, doubled on each further one
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = retry_backoff
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    priority TEXT NOT NULL,
+                    priority_rank INTEGER NOT NULL,
+                    client_id TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    message TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    enqueued_at REAL NOT NULL,
+                    available_at REAL NOT NULL,
+                    deadline_at REAL,
+                    worker_id TEXT,
+                    lease_until REAL,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    queue_wait_ms REAL,
+                    last_stage TEXT,
+                    result TEXT,
+                    finished_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority_rank, available_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_client ON jobs (client_id, status)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One short-lived connection per operation: connections cannot be shared
+        # across threads, and opening one is cheap next to a generation job
+        conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._connect() as conn:
+            # Take the write lock up front so two workers never claim the same job
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def enqueue(self, job_id: str, kind: str, payload: Dict[str, Any], priority: str = "interactive",
+                client_id: str = "anonymous", timeout_seconds: Optional[float] = None) -> int:
+        """
+        Queue a job, replacing a finished job with the same id (e.g. a resume)
+
+        Args:
+            job_id: Job identifier
+            kind: "generate", "resume" or "refresh"
+            payload: JSON-serializable job arguments
+            priority: "interactive" or "batch"
+            client_id: Submitting client, used for fair claiming
+            timeout_seconds: Deadline for the job, counted from now
+
+        Returns:
+            Number of jobs ahead of this one in its priority class
+        """
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class: {priority}")
+
+        now = time.time()
+        deadline_at = now + timeout_seconds if timeout_seconds else None
+        with self._transaction() as conn:
+            ahead = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'pending' AND priority = ?", (priority,)
+            ).fetchone()[0]
+            conn.execute("""
+                INSERT INTO jobs (job_id, kind, payload, priority, priority_rank, client_id, status,
+                                  enqueued_at, available_at, deadline_at)
+                VALUES (?, ?, ?, ?, ?, ?, 'pending', ?, ?, ?)
+                ON CONFLICT (job_id) DO UPDATE SET
+                    kind = excluded.kind, payload = excluded.payload, priority = excluded.priority,
+                    priority_rank = excluded.priority_rank, client_id = excluded.client_id,
+                    status = 'pending', message = NULL, attempts = 0, enqueued_at = excluded.enqueued_at,
+                    available_at = excluded.available_at, deadline_at = excluded.deadline_at,
+                    worker_id = NULL, lease_until = NULL, cancel_requested = 0, queue_wait_ms = NULL,
+                    result = NULL, finished_at = NULL
+            """, (job_id, kind, json.dumps(payload), priority, _PRIORITY_RANK[priority], client_id,
+                  now, now, deadline_at))
+        return ahead
+
+    def claim(self, worker_id: str, priorities: Sequence[str] = PRIORITY_CLASSES) -> Optional[QueuedJob]:
+        """
+        Claim the next runnable job: interactive before batch, then the client
+        with the fewest running jobs, then the oldest
+
+        Args:
+            worker_id: Claiming worker
+            priorities: Priority classes this worker takes
+
+        Returns:
+            The claimed job, or None if nothing is runnable
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            self._reclaim_expired(conn, now)
+
+            placeholders = ",".join("?" for _ in priorities)
+            row = conn.execute(f"""
+                SELECT * FROM jobs AS queued
+                WHERE status = 'pending' AND available_at <= ? AND priority IN ({placeholders})
+                ORDER BY priority_rank,
+                         (SELECT COUNT(*) FROM jobs AS running
+                          WHERE running.client_id = queued.client_id AND running.status = 'processing'),
+                         enqueued_at
+                LIMIT 1
+            """, (now, *priorities)).fetchone()
+            if row is None:
+                return None
+
+            # Queue wait of the first attempt; retries keep it
+            queue_wait_ms = row["queue_wait_ms"]
+            if queue_wait_ms is None:
+                queue_wait_ms = round((now - row["enqueued_at"]) * 1000, 1)
+            conn.execute("""
+                UPDATE jobs SET status = 'processing', worker_id = ?, lease_until = ?,
+                                attempts = attempts + 1, queue_wait_ms = ?
+                WHERE job_id = ?
+            """, (worker_id, now + self.lease_seconds, queue_wait_ms, row["job_id"]))
+
+        return QueuedJob(row["job_id"], row["kind"], json.loads(row["payload"]), row["priority"],
+                         row["attempts"] + 1, row["deadline_at"], queue_wait_ms)
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """
+        Extend a claimed job's lease
+
+        Returns:
+            False if the worker should stop: the job was cancelled or its
+            lease expired and it was handed to another worker
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT worker_id, status, cancel_requested FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            if row is None or row["worker_id"] != worker_id or row["status"] != "processing":
+                return False
+            conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE job_id = ? AND worker_id = ?",
+                (time.time() + self.lease_seconds, job_id, worker_id)
+            )
+            return not row["cancel_requested"]
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        """Ack a job with its serialized result; False if the worker no longer owned it"""
+        with self._transaction() as conn:
+            cursor = conn.execute("""
+                UPDATE jobs SET status = 'completed', message = NULL, result = ?, finished_at = ?,
+                                lease_until = NULL
+                WHERE job_id = ? AND worker_id = ? AND status = 'processing'
+            """, (json.dumps(result, ensure_ascii=False), time.time(), job_id, worker_id))
+            return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, message: str, status: str = "error",
+             retry: bool = True, last_stage: Optional[str] = None) -> Optional[str]:
+        """
+        Record a failed attempt, scheduling a retry if attempts remain
+
+        Args:
+            job_id: Job identifier
+            worker_id: Worker that ran the attempt
+            message: Error description
+            status: Final status if the job is not retried (error, cancelled, timed_out)
+            retry: Whether the failure may be retried
+            last_stage: Last checkpointed stage, reported to clients
+
+        Returns:
+            The job's new status ("pending" when retried), or None if the
+            worker no longer owned the job
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts, deadline_at FROM jobs WHERE job_id = ? AND worker_id = ? AND status = 'processing'",
+                (job_id, worker_id)
+            ).fetchone()
+            if row is None:
+                return None
+
+            delay = self.retry_backoff * 2 ** (row["attempts"] - 1)
+            deadline_at = row["deadline_at"]
+            if retry and row["attempts"] < self.max_attempts and (deadline_at is None or now + delay < deadline_at):
+                conn.execute("""
+                    UPDATE jobs SET status = 'pending', message = ?, available_at = ?, worker_id = NULL,
+                                    lease_until = NULL, last_stage = ?
+                    WHERE job_id = ?
+                """, (f"Attempt {row['attempts']} failed, retrying: {message}", now + delay, last_stage, job_id))
+                logger.warning(f"Job {job_id} attempt {row['attempts']} failed, retrying in {delay:.0f}s: {message}")
+                return "pending"
+
+            conn.execute("""
+                UPDATE jobs SET status = ?, message = ?, finished_at = ?, lease_until = NULL, last_stage = ?
+                WHERE job_id = ?
+            """, (status, message, now, last_stage, job_id))
+            return status
+
+    def release(self, job_id: str, worker_id: str) -> bool:
+        """Hand a job back without counting the attempt (worker shutting down)"""
+        with self._transaction() as conn:
+            cursor = conn.execute("""
+                UPDATE jobs SET status = 'pending', worker_id = NULL, lease_until = NULL,
+                                attempts = attempts - 1, available_at = ?
+                WHERE job_id = ? AND worker_id = ? AND status = 'processing'
+            """, (time.time(), job_id, worker_id))
+            return cursor.rowcount == 1
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """
+        Cancel a job: a queued job is dropped at once, a running job is
+        flagged and stopped by its worker at the next heartbeat
+
+        Returns:
+            "cancelled", "cancelling", the status of an already finished job,
+            or None if the job does not exist
+        """
+        with self._transaction() as conn:
+            row = conn.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row["status"] == "pending":
+                conn.execute(
+                    "UPDATE jobs SET status = 'cancelled', message = 'Job cancelled before it started', "
+                    "finished_at = ? WHERE job_id = ?", (time.time(), job_id)
+                )
+                return "cancelled"
+            if row["status"] == "processing":
+                conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE job_id = ?", (job_id,))
+                return "cancelling"
+            return row["status"]
+
+    def list_resumable(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recently failed, cancelled or timed-out jobs that reached a checkpointed stage"""
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT job_id, status, last_stage FROM jobs
+                WHERE status IN ('error', 'cancelled', 'timed_out') AND last_stage IS NOT NULL
+                ORDER BY finished_at DESC LIMIT ?
+            """, (limit,)).fetchall()
+        return [{"job_id": row["job_id"], "status": row["status"], "last_stage": row["last_stage"]}
+                for row in rows]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status of a job, in the shape of the API's job records"""
+        with self._connect() as conn:
+            row = conn.execute("""
+                SELECT status, message, priority, queue_wait_ms, last_stage, attempts, cancel_requested
+                FROM jobs WHERE job_id = ?
+            """, (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        status = row["status"]
+        if status == "processing" and row["cancel_requested"]:
+            status = "cancelling"
+        job = {
+            "status": status,
+            "message": row["message"],
+            "progress": _progress(status),
+            "priority": row["priority"],
+            "queue_wait_ms": row["queue_wait_ms"],
+            "attempts": row["attempts"]
+        }
+        if status in ("error", "cancelled", "timed_out"):
+            job["resumable"] = row["last_stage"] is not None
+            job["last_stage"] = row["last_stage"]
+        return job
+
+    def get_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Serialized result of a completed job"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT result FROM jobs WHERE job_id = ? AND status = 'completed'", (job_id,)
+            ).fetchone()
+        return json.loads(row["result"]) if row and row["result"] else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Job counts per priority class and status, and the oldest runnable job's age"""
+        now = time.time()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT priority, status, COUNT(*) AS jobs FROM jobs GROUP BY priority, status"
+            ).fetchall()
+            oldest = conn.execute(
+                "SELECT MIN(enqueued_at) FROM jobs WHERE status = 'pending' AND available_at <= ?", (now,)
+            ).fetchone()[0]
+
+        classes: Dict[str, Dict[str, int]] = {priority: {} for priority in PRIORITY_CLASSES}
+        for row in rows:
+            classes.setdefault(row["priority"], {})[row["status"]] = row["jobs"]
+        return {
+            "backend": "sqlite",
+            "lease_seconds": self.lease_seconds,
+            "max_attempts": self.max_attempts,
+            "classes": classes,
+            "oldest_pending_seconds": round(now - oldest, 1) if oldest else None
+        }
+
+    def _reclaim_expired(self, conn: sqlite3.Connection, now: float) -> None:
+        """Requeue jobs whose worker stopped heartbeating (caller holds the write lock)"""
+        expired = conn.execute(
+            "SELECT job_id, attempts, cancel_requested FROM jobs WHERE status = 'processing' AND lease_until < ?",
+            (now,)
+        ).fetchall()
+        for row in expired:
+            if row["cancel_requested"]:
+                conn.execute(
+                    "UPDATE jobs SET status = 'cancelled', message = 'Job cancelled', finished_at = ?, "
+                    "worker_id = NULL, lease_until = NULL WHERE job_id = ?", (now, row["job_id"])
+                )
+            elif row["attempts"] >= self.max_attempts:
+                conn.execute(
+                    "UPDATE jobs SET status = 'error', message = ?, finished_at = ?, worker_id = NULL, "
+                    "lease_until = NULL WHERE job_id = ?",
+                    (f"Worker lost after {row['attempts']} attempts", now, row["job_id"])
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = 'pending', message = 'Worker lost, requeued', worker_id = NULL, "
+                    "lease_until = NULL, available_at = ? WHERE job_id = ?", (now, row["job_id"])
+                )
+            logger.warning(f"Job {row['job_id']} lease expired (attempt {row['attempts']})")
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the subset of Redis commands RedisJobQueue uses
+
+    State lives in this process only, so workers must run in the same
+    process (JOB_EMBEDDED_WORKERS); use it for development and tests.
+    Transactions hold the store's lock for their whole duration, which gives
+    the same guarantees as WATCH/MULTI/EXEC on a real server.
+    """
+
+    def __init__(self):
+        self._hashes: Dict[str, Dict[str, str]] = {}
+        self._zsets: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.RLock()
+
+    def transaction(self, func: Callable[[Any], Any], *watches: str, value_from_callable: bool = False) -> Any:
+        """Run func(pipe) atomically; see redis.Redis.transaction"""
+        with self._lock:
+            value = func(_LocalPipeline(self))
+        return value if value_from_callable else []
+
+    def hset(self, name: str, mapping: Dict[str, Any]) -> int:
+        with self._lock:
+            fields = self._hashes.setdefault(name, {})
+            added = sum(1 for key in mapping if key not in fields)
+            fields.update({key: str(value) for key, value in mapping.items()})
+            return added
+
+    def hget(self, name: str, key: str) -> Optional[str]:
+        with self._lock:
+            return self._hashes.get(name, {}).get(key)
+
+    def hgetall(self, name: str) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._hashes.get(name, {}))
+
+    def hincrby(self, name: str, key: str, amount: int = 1) -> int:
+        with self._lock:
+            fields = self._hashes.setdefault(name, {})
+            value = int(fields.get(key, 0)) + amount
+            fields[key] = str(value)
+            return value
+
+    def zadd(self, name: str, mapping: Dict[str, float], xx: bool = False) -> int:
+        with self._lock:
+            members = self._zsets.setdefault(name, {})
+            added = 0
+            for member, score in mapping.items():
+                if xx and member not in members:
+                    continue
+                added += member not in members
+                members[member] = float(score)
+            return added
+
+    def zrem(self, name: str, *members: str) -> int:
+        with self._lock:
+            zset = self._zsets.get(name, {})
+            return sum(1 for member in members if zset.pop(member, None) is not None)
+
+    def zpopmin(self, name: str, count: int = 1) -> List[tuple]:
+        with self._lock:
+            zset = self._zsets.get(name, {})
+            popped = sorted(zset.items(), key=lambda item: (item[1], item[0]))[:count]
+            for member, _ in popped:
+                del zset[member]
+            return popped
+
+    def zrange(self, name: str, start: int, end: int, withscores: bool = False) -> List[Any]:
+        with self._lock:
+            items = sorted(self._zsets.get(name, {}).items(), key=lambda item: (item[1], item[0]))
+            items = items[start:None if end == -1 else end + 1]
+            return items if withscores else [member for member, _ in items]
+
+    def zrangebyscore(self, name: str, min: float, max: float) -> List[str]:
+        with self._lock:
+            zset = self._zsets.get(name, {})
+            return [member for member, score in sorted(zset.items(), key=lambda item: item[1])
+                    if min <= score <= max]
+
+    def zrevrange(self, name: str, start: int, end: int) -> List[str]:
+        with self._lock:
+            zset = self._zsets.get(name, {})
+            members = [member for member, _ in sorted(zset.items(), key=lambda item: item[1], reverse=True)]
+            return members[start:None if end == -1 else end + 1]
+
+    def zscore(self, name: str, member: str) -> Optional[float]:
+        with self._lock:
+            return self._zsets.get(name, {}).get(member)
+
+    def zcard(self, name: str) -> int:
+        with self._lock:
+            return len(self._zsets.get(name, {}))
+
+
+class _LocalPipeline:
+    """Pipeline handed to LocalRedis.transaction callables: commands run at once"""
+
+    def __init__(self, client: LocalRedis):
+        self._client = client
+
+    def multi(self) -> None:
+        pass
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+# Picks and claims the next job in one step (see RedisJobQueue.claim). It
+# builds key names from the prefix, so it needs a single (non-cluster) server.
+# ARGV: prefix, worker id, now, lease seconds, priority classes in rank order
+_CLAIM_SCRIPT = """
+local prefix, worker, now, lease = ARGV[1], ARGV[2], tonumber(ARGV[3]), tonumber(ARGV[4])
+local running_key = prefix .. ':running'
+for i = 5, #ARGV do
+    local priority = ARGV[i]
+    local clients_key = prefix .. ':clients:' .. priority
+    while true do
+        local best, best_running, best_score
+        for _, client in ipairs(redis.call('ZRANGE', clients_key, 0, -1)) do
+            local head = redis.call('ZRANGE', prefix .. ':ready:' .. priority .. ':' .. client, 0, 0, 'WITHSCORES')
+            if #head == 0 then
+                redis.call('ZREM', clients_key, client)
+            else
+                local running = tonumber(redis.call('HGET', running_key, client) or '0')
+                local score = tonumber(head[2])
+                if best == nil or running < best_running or (running == best_running and score < best_score) then
+                    best, best_running, best_score = client, running, score
+                end
+            end
+        end
+        if best == nil then
+            break
+        end
+
+        local client_ready_key = prefix .. ':ready:' .. priority .. ':' .. best
+        local job_id = redis.call('ZPOPMIN', client_ready_key)[1]
+        redis.call('ZREM', prefix .. ':ready:' .. priority, job_id)
+        if redis.call('ZCARD', client_ready_key) == 0 then
+            redis.call('ZREM', clients_key, best)
+        end
+
+        local job_key = prefix .. ':job:' .. job_id
+        if redis.call('HGET', job_key, 'status') == 'pending' then
+            local queue_wait_ms = redis.call('HGET', job_key, 'queue_wait_ms')
+            if not queue_wait_ms or queue_wait_ms == '' then
+                local enqueued_at = tonumber(redis.call('HGET', job_key, 'enqueued_at'))
+                queue_wait_ms = tostring(math.floor((now - enqueued_at) * 10000 + 0.5) / 10)
+            end
+            redis.call('HINCRBY', job_key, 'attempts', 1)
+            redis.call('HSET', job_key, 'status', 'processing', 'worker_id', worker, 'queue_wait_ms', queue_wait_ms)
+            redis.call('ZADD', prefix .. ':leases', now + lease, job_id)
+            redis.call('HINCRBY', running_key, best, 1)
+            local claimed = redis.call('HGETALL', job_key)
+            table.insert(claimed, 1, job_id)
+            return claimed
+        end
+        -- Cancelled while queued: drop it and pick again
+    end
+end
+return false
+"""
+
+
+class RedisJobQueue:
+    """
+    Job queue on Redis (or a compatible server such as Valkey or KeyDB)
+
+    Keys: one hash per job; per priority class, a ready sorted set per
+    client plus one over all clients (scored by enqueue time) and the set of
+    clients with queued jobs; a hash of running jobs per client; a delayed
+    set for retries (scored by due time), a lease set (scored by lease
+    expiry) and a set of resumable failed jobs (scored by finish time).
+
+    Claims run as one Lua script that picks the job the way the SQLite
+    store does (client with the fewest running jobs, then oldest), pops it
+    and records the claim, so a worker dying mid-claim never loses a job.
+    Every other status change reads the job hash and writes it back in one
+    transaction that WATCHes the hash (see _transaction), so a cancel, a
+    completion and a lease reclaim of the same job never interleave, like
+    the SQLite store's BEGIN IMMEDIATE transactions.
+    """
+
+    def __init__(self, client, prefix: str = "seo:jobs", lease_seconds: float = 60.0,
+                 max_attempts: int = 3, retry_backoff: float = 10.0):
+        """
+        Args:
+            client: redis.Redis with decode_responses=True, or a LocalRedis
+            prefix: Key prefix
+            lease_seconds: How long a claim lasts without a heartbeat
+            max_attempts: Attempts per job before it is marked as failed
+            retry_backoff: Delay before the first retry, doubled on each further one
+        """
+        self.client = client
+        self.prefix = prefix
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = retry_backoff
+        # LocalRedis runs the script's Python twin (_claim_local) instead
+        self._claim_script = None if isinstance(client, LocalRedis) else client.register_script(_CLAIM_SCRIPT)
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.prefix}:job:{job_id}"
+
+    def _ready_key(self, priority: str, client_id: Optional[str] = None) -> str:
+        key = f"{self.prefix}:ready:{priority}"
+        return key if client_id is None else f"{key}:{client_id}"
+
+    def _clients_key(self, priority: str) -> str:
+        return f"{self.prefix}:clients:{priority}"
+
+    @property
+    def _running_key(self) -> str:
+        return f"{self.prefix}:running"
+
+    @property
+    def _delayed_key(self) -> str:
+        return f"{self.prefix}:delayed"
+
+    @property
+    def _leases_key(self) -> str:
+        return f"{self.prefix}:leases"
+
+    @property
+    def _resumable_key(self) -> str:
+        return f"{self.prefix}:resumable"
+
+    def enqueue(self, job_id: str, kind: str, payload: Dict[str, Any], priority: str = "interactive",
+                client_id: str = "anonymous", timeout_seconds: Optional[float] = None) -> int:
+        """Queue a job; see SQLiteJobQueue.enqueue"""
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class: {priority}")
+
+        now = time.time()
+        ahead = self.client.zcard(self._ready_key(priority))
+        job = {
+            "kind": kind,
+            "payload": json.dumps(payload),
+            "priority": priority,
+            "client_id": client_id,
+            "status": "pending",
+            "message": "",
+            "attempts": 0,
+            "enqueued_at": now,
+            "deadline_at": now + timeout_seconds if timeout_seconds else "",
+            "worker_id": "",
+            "cancel_requested": 0,
+            "queue_wait_ms": "",
+            "last_stage": "",
+            "result": ""
+        }
+
+        def store(pipe) -> None:
+            pipe.multi()
+            pipe.hset(self._job_key(job_id), mapping=job)
+            pipe.zrem(self._resumable_key, job_id)
+            self._queue(pipe, job_id, job)
+
+        self.client.transaction(store)
+        return ahead
+
+    def claim(self, worker_id: str, priorities: Sequence[str] = PRIORITY_CLASSES) -> Optional[QueuedJob]:
+        """Claim the next runnable job; see SQLiteJobQueue.claim"""
+        now = time.time()
+        self._promote_delayed(now)
+        self._reclaim_expired(now)
+
+        ranked = sorted(priorities, key=_PRIORITY_RANK.get)
+        if self._claim_script is not None:
+            claimed = self._claim_script(args=[self.prefix, worker_id, now, self.lease_seconds, *ranked])
+            if not claimed:
+                return None
+            job_id, fields = claimed[0], claimed[1:]
+            job = dict(zip(fields[::2], fields[1::2]))
+        else:
+            claimed = self.client.transaction(
+                lambda pipe: self._claim_local(pipe, worker_id, now, ranked), value_from_callable=True
+            )
+            if claimed is None:
+                return None
+            job_id, job = claimed
+
+        return QueuedJob(job_id, job["kind"], json.loads(job["payload"]), job["priority"], int(job["attempts"]),
+                         float(job["deadline_at"]) if job.get("deadline_at") else None,
+                         float(job["queue_wait_ms"]))
+
+    def _claim_local(self, pipe, worker_id: str, now: float,
+                     priorities: Sequence[str]) -> Optional[tuple]:
+        """_CLAIM_SCRIPT for LocalRedis, run under its lock"""
+        for priority in priorities:
+            while True:
+                best = None
+                for client_id in pipe.zrange(self._clients_key(priority), 0, -1):
+                    head = pipe.zrange(self._ready_key(priority, client_id), 0, 0, withscores=True)
+                    if not head:
+                        pipe.zrem(self._clients_key(priority), client_id)
+                        continue
+                    rank = (int(pipe.hget(self._running_key, client_id) or 0), head[0][1])
+                    if best is None or rank < best[0]:
+                        best = (rank, client_id)
+                if best is None:
+                    break
+
+                client_id = best[1]
+                job_id = pipe.zpopmin(self._ready_key(priority, client_id))[0][0]
+                pipe.zrem(self._ready_key(priority), job_id)
+                if not pipe.zcard(self._ready_key(priority, client_id)):
+                    pipe.zrem(self._clients_key(priority), client_id)
+
+                job = pipe.hgetall(self._job_key(job_id))
+                if job.get("status") != "pending":
+                    # Cancelled while queued: drop it and pick again
+                    continue
+                queue_wait_ms = job.get("queue_wait_ms") or round((now - float(job["enqueued_at"])) * 1000, 1)
+                pipe.hincrby(self._job_key(job_id), "attempts", 1)
+                pipe.hset(self._job_key(job_id), mapping={
+                    "status": "processing",
+                    "worker_id": worker_id,
+                    "queue_wait_ms": queue_wait_ms
+                })
+                pipe.zadd(self._leases_key, {job_id: now + self.lease_seconds})
+                pipe.hincrby(self._running_key, client_id, 1)
+                return job_id, pipe.hgetall(self._job_key(job_id))
+        return None
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extend a claimed job's lease; False if the worker should stop"""
+        job = self.client.hgetall(self._job_key(job_id))
+        if job.get("worker_id") != worker_id or job.get("status") != "processing":
+            return False
+        # XX: never re-create a lease reclaimed since the read; the next heartbeat sees the new owner
+        self.client.zadd(self._leases_key, {job_id: time.time() + self.lease_seconds}, xx=True)
+        return job.get("cancel_requested") != "1"
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        """Ack a job with its serialized result"""
+        serialized = json.dumps(result, ensure_ascii=False)
+
+        def finish(pipe, job: Dict[str, str]) -> bool:
+            if not self._owned(job, worker_id):
+                return False
+            pipe.multi()
+            self._stop_running(pipe, job_id, job)
+            pipe.hset(self._job_key(job_id), mapping={"status": "completed", "message": "", "result": serialized})
+            return True
+
+        return self._transaction(job_id, finish)
+
+    def fail(self, job_id: str, worker_id: str, message: str, status: str = "error",
+             retry: bool = True, last_stage: Optional[str] = None) -> Optional[str]:
+        """Record a failed attempt; see SQLiteJobQueue.fail"""
+        def record(pipe, job: Dict[str, str]) -> Optional[str]:
+            if not self._owned(job, worker_id):
+                return None
+            now = time.time()
+            attempts = int(job["attempts"])
+            delay = self.retry_backoff * 2 ** (attempts - 1)
+            deadline_at = float(job["deadline_at"]) if job.get("deadline_at") else None
+            pipe.multi()
+            self._stop_running(pipe, job_id, job)
+            if retry and attempts < self.max_attempts and (deadline_at is None or now + delay < deadline_at):
+                pipe.hset(self._job_key(job_id), mapping={
+                    "status": "pending",
+                    "worker_id": "",
+                    "message": f"Attempt {attempts} failed, retrying: {message}",
+                    "last_stage": last_stage or ""
+                })
+                pipe.zadd(self._delayed_key, {job_id: now + delay})
+                logger.warning(f"Job {job_id} attempt {attempts} failed, retrying in {delay:.0f}s: {message}")
+                return "pending"
+
+            pipe.hset(self._job_key(job_id), mapping={
+                "status": status,
+                "message": message,
+                "last_stage": last_stage or ""
+            })
+            if last_stage:
+                pipe.zadd(self._resumable_key, {job_id: now})
+            return status
+
+        return self._transaction(job_id, record)
+
+    def release(self, job_id: str, worker_id: str) -> bool:
+        """Hand a job back without counting the attempt"""
+        def requeue(pipe, job: Dict[str, str]) -> bool:
+            if not self._owned(job, worker_id):
+                return False
+            pipe.multi()
+            self._stop_running(pipe, job_id, job)
+            pipe.hset(self._job_key(job_id), mapping={
+                "status": "pending",
+                "worker_id": "",
+                "attempts": int(job["attempts"]) - 1
+            })
+            self._queue(pipe, job_id, job)
+            return True
+
+        return self._transaction(job_id, requeue)
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """Cancel a job; see SQLiteJobQueue.cancel"""
+        def request(pipe, job: Dict[str, str]) -> Optional[str]:
+            if not job:
+                return None
+            if job["status"] == "pending":
+                # Claims pop and start a job in one script, so it is either still queued here
+                # or already processing
+                pipe.multi()
+                pipe.zrem(self._ready_key(job["priority"]), job_id)
+                pipe.zrem(self._ready_key(job["priority"], self._client_of(job)), job_id)
+                pipe.zrem(self._delayed_key, job_id)
+                pipe.hset(self._job_key(job_id), mapping={
+                    "status": "cancelled",
+                    "message": "Job cancelled before it started"
+                })
+                return "cancelled"
+            if job["status"] == "processing":
+                pipe.multi()
+                pipe.hset(self._job_key(job_id), mapping={"cancel_requested": 1})
+                return "cancelling"
+            return job["status"]
+
+        return self._transaction(job_id, request)
+
+    def list_resumable(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recently failed jobs that reached a checkpointed stage; see SQLiteJobQueue.list_resumable"""
+        jobs = []
+        for job_id in self.client.zrevrange(self._resumable_key, 0, limit - 1):
+            job = self.client.hgetall(self._job_key(job_id))
+            if job.get("status") in ("error", "cancelled", "timed_out") and job.get("last_stage"):
+                jobs.append({"job_id": job_id, "status": job["status"], "last_stage": job["last_stage"]})
+        return jobs
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status of a job, in the shape of the API's job records"""
+        job = self.client.hgetall(self._job_key(job_id))
+        if not job:
+            return None
+
+        status = job["status"]
+        if status == "processing" and job.get("cancel_requested") == "1":
+            status = "cancelling"
+        record = {
+            "status": status,
+            "message": job.get("message") or None,
+            "progress": _progress(status),
+            "priority": job["priority"],
+            "queue_wait_ms": float(job["queue_wait_ms"]) if job.get("queue_wait_ms") else None,
+            "attempts": int(job["attempts"])
+        }
+        if status in ("error", "cancelled", "timed_out"):
+            record["resumable"] = bool(job.get("last_stage"))
+            record["last_stage"] = job.get("last_stage") or None
+        return record
+
+    def get_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Serialized result of a completed job"""
+        job = self.client.hgetall(self._job_key(job_id))
+        if job.get("status") != "completed" or not job.get("result"):
+            return None
+        return json.loads(job["result"])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queued, delayed and leased job counts"""
+        return {
+            "backend": "redis",
+            "lease_seconds": self.lease_seconds,
+            "max_attempts": self.max_attempts,
+            "classes": {priority: {"pending": self.client.zcard(self._ready_key(priority))}
+                        for priority in PRIORITY_CLASSES},
+            "delayed": self.client.zcard(self._delayed_key),
+            "processing": self.client.zcard(self._leases_key)
+        }
+
+    def _transaction(self, job_id: str, func: Callable[[Any, Dict[str, str]], Any]) -> Any:
+        """
+        Run func(pipe, job) with the job's hash WATCHed: func reads the job,
+        calls pipe.multi() and queues its writes, which are applied only if no
+        one else wrote the hash in the meantime (otherwise func runs again)
+
+        Returns:
+            func's return value
+        """
+        key = self._job_key(job_id)
+        return self.client.transaction(lambda pipe: func(pipe, pipe.hgetall(key)), key, value_from_callable=True)
+
+    @staticmethod
+    def _owned(job: Dict[str, str], worker_id: str) -> bool:
+        return job.get("worker_id") == worker_id and job.get("status") == "processing"
+
+    @staticmethod
+    def _client_of(job: Dict[str, str]) -> str:
+        return job.get("client_id") or "anonymous"
+
+    def _queue(self, pipe, job_id: str, job: Dict[str, Any]) -> None:
+        """Queue writes that make a pending job claimable again"""
+        priority, client_id = job["priority"], self._client_of(job)
+        enqueued_at = float(job["enqueued_at"])
+        pipe.zadd(self._ready_key(priority), {job_id: enqueued_at})
+        pipe.zadd(self._ready_key(priority, client_id), {job_id: enqueued_at})
+        pipe.zadd(self._clients_key(priority), {client_id: 0})
+
+    def _stop_running(self, pipe, job_id: str, job: Dict[str, str]) -> None:
+        """Queue writes that take a processing job off its lease and its client's running count"""
+        pipe.zrem(self._leases_key, job_id)
+        pipe.hincrby(self._running_key, self._client_of(job), -1)
+
+    def _promote_delayed(self, now: float) -> None:
+        """Move retries that are due back to their ready sets"""
+        for job_id in self.client.zrangebyscore(self._delayed_key, 0, now):
+            def promote(pipe, job: Dict[str, str]) -> None:
+                if pipe.zscore(self._delayed_key, job_id) is None or job.get("status") != "pending":
+                    # Promoted by another worker or cancelled since the scan
+                    return
+                pipe.multi()
+                pipe.zrem(self._delayed_key, job_id)
+                self._queue(pipe, job_id, job)
+
+            self._transaction(job_id, promote)
+
+    def _reclaim_expired(self, now: float) -> None:
+        """Requeue jobs whose worker stopped heartbeating"""
+        for job_id in self.client.zrangebyscore(self._leases_key, 0, now):
+            def expire(pipe, job: Dict[str, str]) -> Optional[int]:
+                lease_until = pipe.zscore(self._leases_key, job_id)
+                if job.get("status") != "processing" or lease_until is None or lease_until > now:
+                    # Finished, heartbeated or reclaimed by another worker since the scan
+                    return None
+                attempts = int(job["attempts"])
+                pipe.multi()
+                self._stop_running(pipe, job_id, job)
+                if job.get("cancel_requested") == "1":
+                    pipe.hset(self._job_key(job_id), mapping={"status": "cancelled", "message": "Job cancelled"})
+                elif attempts >= self.max_attempts:
+                    pipe.hset(self._job_key(job_id), mapping={
+                        "status": "error",
+                        "message": f"Worker lost after {attempts} attempts"
+                    })
+                else:
+                    pipe.hset(self._job_key(job_id), mapping={
+                        "status": "pending",
+                        "worker_id": "",
+                        "message": "Worker lost, requeued"
+                    })
+                    self._queue(pipe, job_id, job)
+                return attempts
+
+            attempts = self._transaction(job_id, expire)
+            if attempts is not None:
+                logger.warning(f"Job {job_id} lease expired (attempt {attempts})")
+
+
+_local_redis: Optional[LocalRedis] = None
+
+
+def get_job_queue(backend: Optional[str] = None):
+    """
+    Build the job queue configured by JOB_BACKEND ("sqlite" or "redis"),
+    JOB_QUEUE_PATH, REDIS_URL, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS and
+    JOB_RETRY_BACKOFF_SECONDS
+    """
+    global _local_redis
+    backend = (backend or os.getenv("JOB_BACKEND", "sqlite")).lower()
+    options = {
+        "lease_seconds": float(os.getenv("JOB_LEASE_SECONDS", "60")),
+        "max_attempts": int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+        "retry_backoff": float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "10"))
+    }
+
+    if backend == "sqlite":
+        return SQLiteJobQueue(os.getenv("JOB_QUEUE_PATH", "jobs.db"), **options)
+
+    if backend == "redis":
+        url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        if url.startswith("local://"):
+            if _local_redis is None:
+                _local_redis = LocalRedis()
+            return RedisJobQueue(_local_redis, **options)
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("JOB_BACKEND=redis requires the redis package (pip install redis)")
+        return RedisJobQueue(redis.Redis.from_url(url, decode_responses=True), **options)
+
+    raise ValueError(f"Unknown JOB_BACKEND: {backend}")
@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Literal, Optional
+
+from agents.outline import Outline
 
 
 class BlogPostRequest(BaseModel):
@@ -7,6 +9,18 @@ class BlogPostRequest(BaseModel):
     topic: str = Field(..., description="The main topic for the blog post", min_length=1)
     keyword: str = Field(..., description="SEO keyword to target", min_length=1)
     tone: str = Field(default="professional", description="Writing tone (professional, casual, technical, etc.)")
+    priority: Literal["interactive", "batch"] = Field(
+        default="interactive",
+        description="Scheduling class: interactive jobs are served before batch jobs"
+    )
+    timeout_seconds: Optional[float] = Field(
+        default=None, gt=0,
+        description="Deadline for the whole job, counted from submission (defaults to JOB_DEADLINE_SECONDS)"
+    )
+    allow_duplicate: bool = Field(
+        default=False,
+        description="Generate even if a post on the same topic was already published"
+    )
 
 
 class CompetitorInfo(BaseModel):
@@ -38,16 +52,55 @@ class BlogPostResponse(BaseModel):
     tone: str
     final_post: str
     outline: str
+    parsed_outline: Optional[Outline] = Field(None, description="Validated, structured outline")
     competitive_analysis: CompetitiveAnalysis
     trending_topics: List[TrendingTopic]
     generation_id: str = Field(..., description="Unique identifier for this generation")
+    metrics: Optional[Dict[str, Any]] = Field(None, description="Pipeline latency and token metrics")
+    seo_score: Optional[Dict[str, Any]] = Field(
+        None, description="Local SEO score (0-100) with per-check scores and issues"
+    )
+    blog_slug: Optional[str] = Field(None, description="Slug of the published Astro post")
+    blog_url: Optional[str] = Field(None, description="URL of the published Astro post")
+    preview_url: Optional[str] = Field(
+        None, description="API URL of the rendered post, available before the Astro build finishes"
+    )
+
+    @classmethod
+    def from_result(cls, result: Dict[str, Any], generation_id: str) -> "BlogPostResponse":
+        """Build the response from a ManagerAgent result dict"""
+        return cls(
+            topic=result["topic"],
+            keyword=result["keyword"],
+            tone=result["tone"],
+            final_post=result["final_post"],
+            outline=result["outline"],
+            parsed_outline=result.get("parsed_outline"),
+            competitive_analysis=CompetitiveAnalysis(**result["competitive_analysis"]),
+            trending_topics=[TrendingTopic(**topic) for topic in result["trending_topics"]],
+            generation_id=generation_id,
+            metrics=result.get("metrics"),
+            seo_score=result.get("seo_score"),
+            blog_slug=result.get("blog_slug"),
+            blog_url=result.get("blog_url"),
+            preview_url=result.get("preview_url")
+        )
 
 
 class BlogPostStatus(BaseModel):
     """Status of blog post generation"""
-    status: str = Field(..., description="Status: pending, processing, completed, error")
+    status: str = Field(
+        ..., description="Status: pending, processing, cancelling, completed, cancelled, timed_out, error"
+    )
     message: Optional[str] = Field(None, description="Status message or error details")
     progress: Optional[int] = Field(None, description="Progress percentage (0-100)")
+    resumable: Optional[bool] = Field(None, description="Whether a failed job can be resumed from a checkpoint")
+    last_stage: Optional[str] = Field(None, description="Last checkpointed stage: research, outline, draft, final")
+    priority: Optional[str] = Field(None, description="Scheduling class: interactive or batch")
+    queue_wait_ms: Optional[float] = Field(None, description="Time the job waited in the scheduler queue")
+    attempts: Optional[int] = Field(None, description="Attempts made so far (worker mode, where failed jobs are retried)")
+    blog_slug: Optional[str] = Field(None, description="Slug of the post, once its preview is rendered")
+    preview_url: Optional[str] = Field(None, description="Rendered preview, available before the site build finishes")
 
 
 class HealthCheck(BaseModel):
@@ -1,8 +1,11 @@
+import os
 import uvicorn
 from dotenv import load_dotenv
 
 if __name__ == "__main__":
     load_dotenv()
+    # With auto-reload, build the ManagerAgent on first use instead of on every reload
+    os.environ.setdefault("WARMUP_ON_STARTUP", "false")
     uvicorn.run(
         "app:app",
         host="0.0.0.0",
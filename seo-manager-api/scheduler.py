@@ -0,0 +1,193 @@
+"""
+Generation job scheduler
+
+Jobs are queued per priority class (interactive, batch) and, inside a class,
+per client so one client submitting hundreds of topics cannot starve others:
+clients are served round-robin, one job at a time. Interactive jobs are always
+dispatched first, and some workers are reserved for them so a running batch
+cannot occupy the whole pool.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Any, List, Optional
+
+from agents.llm_pool import PRIORITY_INTERACTIVE, PRIORITY_BATCH, llm_priority
+from utils.logger_config import log_context
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_CLASSES = ("interactive", "batch")
+
+_LLM_PRIORITIES = {"interactive": PRIORITY_INTERACTIVE, "batch": PRIORITY_BATCH}
+
+# Queue-wait samples kept per class for percentile reporting
+_WAIT_SAMPLES = 500
+
+
+class _Job:
+    __slots__ = ("job_id", "run", "priority", "client_id", "enqueued_at")
+
+    def __init__(self, job_id: str, run: Callable[[float], None], priority: str, client_id: str):
+        self.job_id = job_id
+        self.run = run
+        self.priority = priority
+        self.client_id = client_id
+        self.enqueued_at = time.monotonic()
+
+
+def _percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return round(ordered[index], 1)
+
+
+class JobScheduler:
+    """Priority classes with per-client fair queuing over a fixed worker pool"""
+
+    def __init__(self, workers: int = 4, interactive_reserved: int = 1):
+        """
+        Args:
+            workers: Number of jobs that may run at once
+            interactive_reserved: Workers batch jobs may never occupy
+        """
+        self.workers = max(1, workers)
+        self.interactive_reserved = min(max(0, interactive_reserved), self.workers - 1)
+
+        # priority class -> client id -> queued jobs
+        self._queues: Dict[str, "OrderedDict[str, deque]"] = {
+            priority: OrderedDict() for priority in PRIORITY_CLASSES
+        }
+        self._queued_ids: Dict[str, _Job] = {}
+        self._running = {priority: 0 for priority in PRIORITY_CLASSES}
+        self._waits = {priority: deque(maxlen=_WAIT_SAMPLES) for priority in PRIORITY_CLASSES}
+        self._completed = {priority: 0 for priority in PRIORITY_CLASSES}
+
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+
+    @classmethod
+    def from_env(cls) -> "JobScheduler":
+        """Build a scheduler from SCHEDULER_WORKERS and SCHEDULER_INTERACTIVE_RESERVED"""
+        return cls(
+            workers=int(os.getenv("SCHEDULER_WORKERS", "4")),
+            interactive_reserved=int(os.getenv("SCHEDULER_INTERACTIVE_RESERVED", "1"))
+        )
+
+    def submit(self, job_id: str, run: Callable[[float], None], priority: str = "interactive",
+               client_id: str = "anonymous") -> int:
+        """
+        Queue a job
+
+        Args:
+            job_id: Job identifier
+            run: Callable receiving the job's queue wait in milliseconds
+            priority: "interactive" or "batch"
+            client_id: Submitting client, used for fair queuing
+
+        Returns:
+            Number of jobs ahead of this one in its priority class
+        """
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class: {priority}")
+
+        job = _Job(job_id, run, priority, client_id)
+        with self._cond:
+            self._ensure_workers()
+            ahead = sum(len(queue) for queue in self._queues[priority].values())
+            self._queues[priority].setdefault(client_id, deque()).append(job)
+            self._queued_ids[job_id] = job
+            self._cond.notify()
+        return ahead
+
+    def cancel(self, job_id: str) -> bool:
+        """Remove a job that has not started yet; returns whether it was queued"""
+        with self._cond:
+            job = self._queued_ids.pop(job_id, None)
+            if job is None:
+                return False
+            clients = self._queues[job.priority]
+            queue = clients[job.client_id]
+            queue.remove(job)
+            if not queue:
+                del clients[job.client_id]
+            return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, running jobs and queue-wait percentiles per priority class"""
+        with self._cond:
+            classes = {}
+            for priority in PRIORITY_CLASSES:
+                waits = list(self._waits[priority])
+                classes[priority] = {
+                    "queued": sum(len(queue) for queue in self._queues[priority].values()),
+                    "clients_queued": len(self._queues[priority]),
+                    "running": self._running[priority],
+                    "completed": self._completed[priority],
+                    "queue_wait_ms_p50": _percentile(waits, 0.5),
+                    "queue_wait_ms_p95": _percentile(waits, 0.95)
+                }
+            return {
+                "workers": self.workers,
+                "interactive_reserved": self.interactive_reserved,
+                "classes": classes
+            }
+
+    def _ensure_workers(self) -> None:
+        # Workers start on first submit so importing the app stays cheap
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._worker,
+                name=f"job-worker-{len(self._threads)}",
+                daemon=True
+            )
+            self._threads.append(thread)
+            thread.start()
+
+    def _next_job(self) -> Optional[_Job]:
+        """Pop the next dispatchable job (caller holds the lock)"""
+        if self._queues["interactive"]:
+            priority = "interactive"
+        elif self._queues["batch"] and self._running["batch"] < self.workers - self.interactive_reserved:
+            priority = "batch"
+        else:
+            return None
+
+        # Round-robin: take the first client's oldest job, then move the client to the back
+        clients = self._queues[priority]
+        client_id, queue = next(iter(clients.items()))
+        job = queue.popleft()
+        if queue:
+            clients.move_to_end(client_id)
+        else:
+            del clients[client_id]
+        del self._queued_ids[job.job_id]
+        return job
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job()
+                self._running[job.priority] += 1
+                wait_ms = (time.monotonic() - job.enqueued_at) * 1000
+                self._waits[job.priority].append(wait_ms)
+
+            try:
+                with llm_priority(_LLM_PRIORITIES[job.priority]), log_context(job_id=job.job_id):
+                    job.run(round(wait_ms, 1))
+            except Exception as e:
+                logger.error(f"Job {job.job_id} failed outside its handler: {e}")
+            finally:
+                with self._cond:
+                    self._running[job.priority] -= 1
+                    self._completed[job.priority] += 1
+                    # A freed worker may unblock a batch job held back by the reservation
+                    self._cond.notify_all()
@@ -0,0 +1,92 @@
+"""
+Score saved posts with the local SEO analyzer
+
+Reads every post directory under the output directory (post.md and
+post_metadata.json), scores them in one batch and prints the score
+distribution, the most frequent issues and the lowest-scoring posts.
+
+Usage:
+    python seo_report.py [output_hierarchical] [--worst 10] [--json]
+"""
+
+import argparse
+import json
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from agents.outline import Outline
+from agents.seo_score import score_posts
+
+
+def load_posts(output_dir: str) -> List[Dict]:
+    posts = []
+    for metadata_path in sorted(Path(output_dir).glob("*/post_metadata.json")):
+        try:
+            metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+            markdown = (metadata_path.parent / "post.md").read_text(encoding="utf-8")
+        except (OSError, json.JSONDecodeError):
+            continue
+        try:
+            outline = Outline.model_validate_json(metadata.get("outline") or "")
+        except ValueError:
+            outline = None
+        posts.append({
+            "path": str(metadata_path.parent),
+            "topic": metadata.get("topic", ""),
+            "markdown": markdown,
+            # Older metadata stored the keyword under a template placeholder
+            "keyword": metadata.get("keyword") or metadata.get("{{keyword}}", ""),
+            "outline": outline,
+            "questions": (metadata.get("competitive_analysis") or {}).get("people_also_ask", [])
+        })
+    return posts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score saved posts with the local SEO analyzer")
+    parser.add_argument("output_dir", nargs="?", default="./output_hierarchical")
+    parser.add_argument("--worst", type=int, default=10, help="Number of lowest-scoring posts to list")
+    parser.add_argument("--json", action="store_true", help="Print one JSON report per post instead")
+    args = parser.parse_args()
+
+    posts = load_posts(args.output_dir)
+    if not posts:
+        print(f"No posts found in {args.output_dir}")
+        return
+
+    start = time.perf_counter()
+    reports = score_posts(posts)
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        for post, report in zip(posts, reports):
+            print(json.dumps({"path": post["path"], "topic": post["topic"], **report}, ensure_ascii=False))
+        return
+
+    scores = np.array([report["score"] for report in reports])
+    print(f"Scored {len(reports)} posts in {elapsed:.2f}s")
+    print(f"score: mean {scores.mean():.1f}  p10 {np.percentile(scores, 10):.1f}  "
+          f"median {np.median(scores):.1f}  p90 {np.percentile(scores, 90):.1f}")
+    for check in reports[0]["checks"]:
+        values = np.array([report["checks"][check] for report in reports])
+        print(f"  {check:<12} {values.mean():.2f}")
+
+    # Group issues by kind (the text before the colon or parenthesis)
+    issues = Counter(
+        issue.split(":")[0].split(" (")[0] for report in reports for issue in report["issues"]
+    )
+    print("\nMost frequent issues:")
+    for issue, count in issues.most_common(10):
+        print(f"  {count:>6}  {issue}")
+
+    print("\nLowest scores:")
+    for i in np.argsort(scores)[:args.worst]:
+        print(f"  {scores[i]:>5.1f}  {posts[i]['topic'][:60]}  ({posts[i]['path']})")
+
+
+if __name__ == "__main__":
+    main()
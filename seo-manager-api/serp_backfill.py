@@ -0,0 +1,65 @@
+"""
+Replay the SERP archive and backfill the research caches from it
+
+The archive (serp_archive/) keeps every raw SerpAPI response. Replaying it
+re-runs extraction, so improved extraction code applies to past responses;
+backfilling writes the results into the research cache and the trending
+news tier without a single SerpAPI call. Backfills keep one entry per topic
+and never overwrite fresher data, so they can be re-run safely.
+
+Usage:
+    python serp_backfill.py backfill [--start 2024-01-01] [--end 2024-01-31]
+    python serp_backfill.py replay [--start 2024-01-01] [--end 2024-01-31] > extracted.jsonl
+    python serp_backfill.py stats
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from agents.serp_archive import SerpArchive
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the SERP archive and backfill the research caches")
+    parser.add_argument("command", choices=("backfill", "replay", "stats"))
+    parser.add_argument("--archive-dir", default="./serp_archive", help="SERP archive directory")
+    parser.add_argument("--cache-dir", default="./seo_cache", help="Chroma directory (embedded mode)")
+    parser.add_argument("--start", default=None, help="First ISO date to include (inclusive)")
+    parser.add_argument("--end", default=None, help="Last ISO date to include (inclusive)")
+    args = parser.parse_args()
+
+    load_dotenv()
+
+    archive = SerpArchive(args.archive_dir)
+    if args.command == "stats":
+        print(json.dumps(archive.get_archive_stats(), indent=2))
+        return
+
+    if args.command == "replay":
+        # One line per archived response: what extraction makes of it today
+        for record, extracted in archive.replay(args.start, args.end):
+            sys.stdout.write(json.dumps({
+                "kind": record.get("kind"),
+                "topic": record.get("topic"),
+                "fetched_at": record.get("fetched_at"),
+                "extracted": extracted
+            }, ensure_ascii=False) + "\n")
+        return
+
+    from agents.content_cache import SEOContentCache
+
+    # The backfill decides what goes in, not CACHE_SNAPSHOT_PATH
+    os.environ.pop("CACHE_SNAPSHOT_PATH", None)
+    cache = SEOContentCache(args.cache_dir, flush_interval=0)
+    start = time.perf_counter()
+    written = archive.backfill_cache(cache, args.start, args.end)
+    print(json.dumps({"written": written, "seconds": round(time.perf_counter() - start, 2)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
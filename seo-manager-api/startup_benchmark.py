@@ -0,0 +1,76 @@
+"""
+Startup benchmark for the API process
+
+Measures, in fresh interpreters:
+- import time of the `app` module
+- time until /health/live answers (process can serve traffic)
+- time until /health/ready answers (ManagerAgent and clients initialized)
+
+Usage:
+    python startup_benchmark.py [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter() - start
+
+from fastapi.testclient import TestClient
+with TestClient(app.app) as client:
+    client.get("/health/live")
+    live = time.perf_counter() - start
+    ready = None
+    while time.perf_counter() - start < 120:
+        if client.get("/health/ready").status_code == 200:
+            ready = time.perf_counter() - start
+            break
+        time.sleep(0.05)
+
+print(json.dumps({"import": imported, "live": live, "ready": ready}))
+"""
+
+
+def run_probe() -> dict:
+    """Run one startup measurement in a fresh interpreter"""
+    env = dict(os.environ, WARMUP_ON_STARTUP="true")
+    env.setdefault("GOOGLE_API_KEY", "benchmark")
+    env.setdefault("SERP_API_KEY", "benchmark")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(Path(__file__).parent), env.get("PYTHONPATH")]))
+
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API process startup time")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh-process runs")
+    args = parser.parse_args()
+
+    samples = [run_probe() for _ in range(args.runs)]
+
+    for metric in ("import", "live", "ready"):
+        values = [sample[metric] for sample in samples if sample[metric] is not None]
+        if not values:
+            print(f"{metric:>7}: not reached")
+            continue
+        print(f"{metric:>7}: median {statistics.median(values) * 1000:.0f} ms "
+              f"(min {min(values) * 1000:.0f} ms, max {max(values) * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
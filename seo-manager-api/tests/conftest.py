@@ -0,0 +1,64 @@
+"""
+Shared fixtures: the API package on sys.path, the offline LLM backend, and
+a ManagerAgent whose directories, research and site build are local
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+API_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(API_DIR))
+
+# Read when the agents modules and their process-wide singletons are first used
+os.environ["LLM_BACKEND"] = "fake"
+os.environ["FAKE_LLM_PROFILES"] = '{"*": {"latency": 0.0}}'
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("SERP_API_KEY", "test")
+os.environ["WARMUP_ON_STARTUP"] = "false"
+os.environ["PREVIEW_CACHE_DIR"] = tempfile.mkdtemp(prefix="preview_cache_")
+os.environ["NEWS_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="news_cache_"), "news.db")
+
+
+class FakeResearch:
+    """Research agent answering every keyword with the same small SERP"""
+
+    def competitive_analysis(self, keyword: str, num_results: int = 10):
+        return {
+            "top_competitors": [{"title": f"{keyword} guide", "snippet": "s", "link": "https://a.example", "position": 1}],
+            "people_also_ask": [f"What is {keyword}?"],
+            "related_searches": [f"{keyword} tips"],
+            "trending_topics": []
+        }
+
+    def trending_topics(self, base_keyword: str):
+        return [{"title": "news", "source": "s", "date": "d"}]
+
+
+@pytest.fixture
+def make_manager(tmp_path, monkeypatch):
+    """Build ManagerAgents on temporary directories (several share one output directory)"""
+    from agents.manager_agent import ManagerAgent
+
+    monkeypatch.chdir(tmp_path)
+
+    def make(**kwargs):
+        options = {
+            "output_dir": str(tmp_path / "output"),
+            "use_smart_cache": False,
+            "astro_blog_dir": str(tmp_path / "blog"),
+            "astro_project_dir": str(tmp_path / "site"),
+            "checkpoint_dir": str(tmp_path / "checkpoints"),
+            "manifest_path": str(tmp_path / "posts.jsonl"),
+            **kwargs
+        }
+        (tmp_path / "blog").mkdir(exist_ok=True)
+        manager = ManagerAgent(**options)
+        manager.researcher = FakeResearch()
+        manager._build_astro_project = lambda *args, **kwargs: True
+        return manager
+
+    return make
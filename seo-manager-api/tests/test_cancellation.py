@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+
+from agents.cancellation import (
+    CancelToken, DeadlineExceeded, JobCancelled, call_timeout, cancel_scope, check_cancelled
+)
+from agents.file_utils import file_lock
+
+
+def test_token_reports_cancellation_before_the_deadline():
+    token = CancelToken(timeout=0.01)
+    time.sleep(0.02)
+    with pytest.raises(DeadlineExceeded):
+        token.check("writing")
+
+    token.cancel()
+    with pytest.raises(JobCancelled, match="before writing"):
+        token.check("writing")
+
+
+def test_token_caps_blocking_timeouts_by_the_time_left():
+    assert CancelToken().timeout(30) == 30
+    assert CancelToken(timeout=5).timeout(30) <= 5
+
+
+def test_scope_makes_the_token_visible_to_nested_calls():
+    token = CancelToken()
+    check_cancelled("outside")
+    assert call_timeout(30) == 30
+
+    with cancel_scope(token):
+        check_cancelled("inside")
+        token.cancel()
+        with pytest.raises(JobCancelled):
+            check_cancelled("inside")
+        with pytest.raises(JobCancelled):
+            call_timeout(30)
+    # The scope is gone once the block ends
+    check_cancelled("after")
+
+
+def test_waiting_for_a_file_lock_stops_on_cancel(tmp_path):
+    lock_path = tmp_path / "publish.lock"
+    held, release = threading.Event(), threading.Event()
+
+    def hold():
+        with file_lock(lock_path):
+            held.set()
+            release.wait(10)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    held.wait(10)
+    try:
+        token = CancelToken()
+        threading.Timer(0.1, token.cancel).start()
+        with cancel_scope(token), pytest.raises(JobCancelled, match="publish.lock"):
+            with file_lock(lock_path):
+                pass
+    finally:
+        release.set()
+        holder.join()
+
+
+def test_cancelled_generation_stops_before_research(make_manager):
+    manager = make_manager()
+    manager.researcher = None  # Never reached
+    token = CancelToken()
+    token.cancel()
+
+    with pytest.raises(JobCancelled):
+        manager.generate_blog_post("Email marketing", "email marketing", "professional",
+                                   job_id="job-1", cancel_token=token)
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """The API app with an empty in-process job table"""
+    import app as app_module
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(app_module, "job_status", {})
+    monkeypatch.setattr(app_module, "job_tokens", {})
+    return app_module, TestClient(app_module.app)
+
+
+def test_cancel_unknown_job_is_not_found(api):
+    _, client = api
+    assert client.delete("/jobs/missing").status_code == 404
+
+
+def test_cancel_finished_job_conflicts(api):
+    app_module, client = api
+    app_module.job_status["job-1"] = {"status": "completed", "progress": 100}
+
+    response = client.delete("/jobs/job-1")
+    assert response.status_code == 409
+    assert app_module.job_status["job-1"]["status"] == "completed"
+
+
+def test_cancel_running_job_stops_it_at_the_next_check(api):
+    app_module, client = api
+    app_module.job_status["job-1"] = {"status": "processing", "progress": 10}
+    token = app_module.new_cancel_token("job-1")
+
+    response = client.delete("/jobs/job-1")
+    assert response.json()["status"] == "cancelling"
+    assert token.cancelled
+    assert client.get("/status/job-1").json()["status"] == "cancelling"
+
+    def generate(token):
+        token.check("writing")
+        return {}
+
+    app_module.run_generation_job("job-1", generate)
+    assert app_module.job_status["job-1"]["status"] == "cancelled"
+    assert "job-1" not in app_module.job_tokens
+    # Cancelling again is a conflict, not a second cancel
+    assert client.delete("/jobs/job-1").status_code == 409
@@ -0,0 +1,68 @@
+import pytest
+
+from agents.checkpoints import CheckpointStore
+
+
+def test_load_stops_at_the_first_missing_stage(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    store.save_request("job", {"topic": "t"})
+    store.save("job", "research", {"competitive_analysis": {}})
+    store.save("job", "draft", {"draft": "orphan"})
+
+    assert list(store.load("job")) == ["research"]
+    assert store.last_stage("job") == "research"
+    assert store.list_jobs() == [{"job_id": "job", "last_stage": "research"}]
+
+
+def test_unreadable_checkpoint_counts_as_missing(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    store.save("job", "research", {"competitive_analysis": {}})
+    (tmp_path / "job" / "outline.json").write_text("{truncated")
+
+    assert list(store.load("job")) == ["research"]
+
+
+@pytest.mark.parametrize("job_id", ["", "../job", "a/b", ".hidden"])
+def test_job_ids_cannot_escape_the_checkpoint_directory(tmp_path, job_id):
+    with pytest.raises(ValueError):
+        CheckpointStore(str(tmp_path)).save_request(job_id, {})
+
+
+def test_unknown_stage_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        CheckpointStore(str(tmp_path)).save("job", "publishing", {})
+
+
+def test_interrupted_job_resumes_after_its_last_stage(make_manager, monkeypatch):
+    manager = make_manager(pipeline_mode="standard")
+    enter_stage = manager._enter_stage
+
+    def crash_while_writing(stage):
+        if stage == "writing":
+            raise RuntimeError("worker lost")
+        enter_stage(stage)
+
+    monkeypatch.setattr(manager, "_enter_stage", crash_while_writing)
+    with pytest.raises(RuntimeError):
+        manager.generate_blog_post("Email marketing for ecommerce", "email marketing", "professional",
+                                   job_id="job-1")
+    assert manager.checkpoints.last_stage("job-1") == "outline"
+    assert manager.list_resumable_jobs() == [{"job_id": "job-1", "last_stage": "outline"}]
+
+    # Another worker picks the job up from its checkpoints
+    resumed = make_manager(pipeline_mode="standard")
+    resumed.researcher = None  # Research must not run again
+    result = resumed.resume_blog_post("job-1")
+
+    assert result["topic"] == "Email marketing for ecommerce"
+    assert result["metrics"]["resumed_stages"] == ["research", "outline"]
+    assert "planning" not in result["metrics"]["stage_seconds"]
+    assert result["final_post"]
+    # Finished jobs drop their checkpoints
+    assert resumed.checkpoints.load("job-1") == {}
+    assert resumed.find_output(job_id="job-1")["blog_slug"] == result["blog_slug"]
+
+
+def test_resume_without_checkpoints_fails(make_manager):
+    with pytest.raises(ValueError):
+        make_manager().resume_blog_post("missing")
@@ -0,0 +1,131 @@
+import gzip
+import json
+import subprocess
+import sys
+import zlib
+
+import numpy as np
+import pytest
+from chromadb import Documents, EmbeddingFunction, Embeddings
+
+from agents.content_cache import SEOContentCache
+from agents.serp_archive import SerpArchive
+from conftest import API_DIR
+
+OPEN_CACHE = "import sys; sys.path.insert(0, {api!r}); from agents.content_cache import SEOContentCache; SEOContentCache({path!r})"
+
+
+def test_embedded_store_is_refused_to_a_second_process(tmp_path):
+    cache_dir = str(tmp_path / "seo_cache")
+    SEOContentCache(cache_dir, mode="embedded", flush_interval=0)
+
+    result = subprocess.run(
+        [sys.executable, "-c", OPEN_CACHE.format(api=str(API_DIR), path=cache_dir)],
+        capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode != 0
+    assert "CACHE_MODE=http" in result.stderr
+
+
+def test_embedded_store_can_be_reopened_in_the_owning_process(tmp_path):
+    cache_dir = str(tmp_path / "seo_cache")
+    SEOContentCache(cache_dir, mode="embedded", flush_interval=0)
+    SEOContentCache(cache_dir, mode="embedded", flush_interval=0)
+
+
+def test_worker_refuses_several_processes_on_the_embedded_store(monkeypatch):
+    import worker
+
+    monkeypatch.setenv("CACHE_MODE", "embedded")
+    monkeypatch.setattr(sys, "argv", ["worker.py", "--processes", "2"])
+    with pytest.raises(SystemExit) as exit_info:
+        worker.main()
+    assert exit_info.value.code == 2
+
+
+class WordEmbedding(EmbeddingFunction):
+    """Offline embedding for tests: a bag of hashed words"""
+
+    def __init__(self):
+        pass
+
+    def __call__(self, input: Documents) -> Embeddings:
+        vectors = []
+        for text in input:
+            vector = np.zeros(64, dtype=np.float32)
+            for word in text.lower().split():
+                vector[zlib.crc32(word.encode()) % 64] += 1.0
+            vectors.append(vector / max(np.linalg.norm(vector), 1e-9))
+        return vectors
+
+    @staticmethod
+    def name() -> str:
+        return "test-words"
+
+    def get_config(self):
+        return {}
+
+    @staticmethod
+    def build_from_config(config):
+        return WordEmbedding()
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    """Embedded caches whose collection embeds offline"""
+    def make():
+        cache = SEOContentCache(str(tmp_path / "seo_cache"), mode="embedded", flush_interval=0)
+        cache.collection = cache.client.get_or_create_collection(
+            name="seo_topics_test", embedding_function=WordEmbedding(), metadata={"hnsw:space": "cosine"}
+        )
+        return cache
+
+    return make
+
+
+def write_archive(archive_dir, records):
+    archive_dir.mkdir(exist_ok=True)
+    for record in records:
+        with gzip.open(archive_dir / f"serp_{record['fetched_at'][:10]}.jsonl.gz", "at", encoding="utf-8") as f:
+            f.write(json.dumps({"kind": "search", "params": {}, **record}) + "\n")
+
+
+def search_results(title):
+    return {"organic_results": [{"title": title, "link": "https://a.example", "snippet": "s", "position": 1}]}
+
+
+def test_backfill_keeps_one_entry_per_topic_across_runs(tmp_path, make_cache):
+    cache = make_cache()
+    write_archive(tmp_path / "archive", [
+        {"topic": "email marketing", "fetched_at": "2024-01-01T10:00:00", "results": search_results("old")},
+        {"topic": "email marketing", "fetched_at": "2024-01-02T10:00:00", "results": search_results("new")},
+    ])
+    archive = SerpArchive(str(tmp_path / "archive"))
+
+    assert archive.backfill_cache(cache) == 1
+    assert archive.backfill_cache(cache) == 0
+    assert cache.collection.count() == 1
+    hit = cache.find_similar_analysis("email marketing")
+    assert hit["cached_date"] == "2024-01-02T10:00:00"
+    assert hit["competitors"][0]["title"] == "new"
+
+
+def test_backfill_never_replaces_a_fresher_live_entry(tmp_path, make_cache):
+    cache = make_cache()
+    cache.cache_serp_analysis("email marketing", {"top_competitors": [{"title": "live"}]}, [])
+    write_archive(tmp_path / "archive", [
+        {"topic": "email marketing", "fetched_at": "2024-01-01T10:00:00", "results": search_results("archived")},
+    ])
+
+    assert SerpArchive(str(tmp_path / "archive")).backfill_cache(cache) == 0
+    assert cache.collection.count() == 1
+    assert cache.find_similar_analysis("email marketing")["competitors"][0]["title"] == "live"
+
+
+def test_live_analyses_replace_the_topic_entry(make_cache):
+    cache = make_cache()
+    cache.cache_serp_analysis("email marketing", {"top_competitors": [{"title": "first"}]}, [])
+    cache.cache_serp_analysis("email marketing", {"top_competitors": [{"title": "second"}]}, [])
+
+    assert cache.collection.count() == 1
+    assert cache.find_similar_analysis("email marketing")["competitors"][0]["title"] == "second"
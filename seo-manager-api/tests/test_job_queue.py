@@ -0,0 +1,135 @@
+import time
+
+import pytest
+
+from job_queue import LocalRedis, RedisJobQueue, SQLiteJobQueue
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def make_queue(request, tmp_path):
+    """Build job queues on both stores (Redis through the in-process LocalRedis)"""
+    def make(**options):
+        if request.param == "sqlite":
+            return SQLiteJobQueue(str(tmp_path / "jobs.db"), **options)
+        return RedisJobQueue(LocalRedis(), **options)
+
+    return make
+
+
+def enqueue(queue, job_id, client_id="anonymous", priority="interactive"):
+    queue.enqueue(job_id, "generate", {"topic": job_id}, priority=priority, client_id=client_id)
+    # Distinct enqueue times keep the oldest-first order deterministic
+    time.sleep(0.002)
+
+
+def test_claim_prefers_interactive_then_oldest(make_queue):
+    queue = make_queue()
+    enqueue(queue, "batch-1", priority="batch")
+    enqueue(queue, "first")
+    enqueue(queue, "second")
+
+    assert [queue.claim("w").job_id for _ in range(3)] == ["first", "second", "batch-1"]
+    assert queue.claim("w") is None
+
+
+def test_claim_is_fair_between_clients(make_queue):
+    queue = make_queue()
+    for job_id in ("a-1", "a-2", "a-3"):
+        enqueue(queue, job_id, client_id="a")
+    enqueue(queue, "b-1", client_id="b")
+
+    first = queue.claim("w1")
+    assert first.job_id == "a-1"
+    # Client a has a job running, so b's newer job goes ahead of a's backlog
+    assert queue.claim("w2").job_id == "b-1"
+    assert queue.claim("w3").job_id == "a-2"
+
+    # Finished jobs no longer count against their client
+    queue.complete("a-1", "w1", {"ok": True})
+    queue.complete("a-2", "w3", {"ok": True})
+    enqueue(queue, "b-2", client_id="b")
+    assert queue.claim("w4").job_id == "a-3"
+
+
+def test_claim_records_attempt_and_lease(make_queue):
+    queue = make_queue()
+    enqueue(queue, "job")
+
+    job = queue.claim("w")
+    assert (job.kind, job.payload, job.attempts) == ("generate", {"topic": "job"}, 1)
+    assert job.queue_wait_ms >= 0
+    assert queue.get("job")["status"] == "processing"
+    assert queue.heartbeat("job", "w")
+    assert not queue.heartbeat("job", "other")
+
+
+def test_expired_lease_is_reclaimed_by_another_worker(make_queue):
+    queue = make_queue(lease_seconds=0.05)
+    enqueue(queue, "job")
+    assert queue.claim("crashed").job_id == "job"
+
+    time.sleep(0.1)
+    job = queue.claim("survivor")
+    assert job.job_id == "job"
+    assert job.attempts == 2
+    # The lost worker can no longer ack the job
+    assert not queue.complete("job", "crashed", {"ok": True})
+    assert queue.complete("job", "survivor", {"ok": True})
+    assert queue.get_result("job") == {"ok": True}
+
+
+def test_lease_expiry_gives_up_after_max_attempts(make_queue):
+    queue = make_queue(lease_seconds=0.05, max_attempts=1)
+    enqueue(queue, "job")
+    queue.claim("crashed")
+
+    time.sleep(0.1)
+    assert queue.claim("survivor") is None
+    assert queue.get("job")["status"] == "error"
+
+
+def test_failed_job_is_retried_then_fails(make_queue):
+    queue = make_queue(max_attempts=2, retry_backoff=0)
+    enqueue(queue, "job")
+
+    queue.claim("w")
+    assert queue.fail("job", "w", "boom") == "pending"
+    job = queue.claim("w")
+    assert job.attempts == 2
+    assert queue.fail("job", "w", "boom again", last_stage="outline") == "error"
+
+    record = queue.get("job")
+    assert (record["status"], record["resumable"], record["last_stage"]) == ("error", True, "outline")
+    assert [job["job_id"] for job in queue.list_resumable()] == ["job"]
+
+
+def test_cancelled_pending_job_is_never_claimed(make_queue):
+    queue = make_queue()
+    enqueue(queue, "cancelled", client_id="a")
+    enqueue(queue, "kept", client_id="a")
+
+    assert queue.cancel("cancelled") == "cancelled"
+    assert queue.claim("w").job_id == "kept"
+    assert queue.claim("w") is None
+
+
+def test_cancelling_a_running_job_stops_its_heartbeat(make_queue):
+    queue = make_queue()
+    enqueue(queue, "job")
+    queue.claim("w")
+
+    assert queue.cancel("job") == "cancelling"
+    assert queue.get("job")["status"] == "cancelling"
+    assert not queue.heartbeat("job", "w")
+    assert queue.fail("job", "w", "Job cancelled", status="cancelled", retry=False) == "cancelled"
+
+
+def test_released_job_keeps_its_attempt_count(make_queue):
+    queue = make_queue()
+    enqueue(queue, "job", client_id="a")
+    queue.claim("w")
+
+    assert queue.release("job", "w")
+    job = queue.claim("w")
+    assert job.job_id == "job"
+    assert job.attempts == 1
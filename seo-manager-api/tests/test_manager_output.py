@@ -0,0 +1,74 @@
+import hashlib
+import json
+
+
+def result_for(topic, tone, body):
+    return {
+        "topic": topic,
+        "keyword": topic.lower(),
+        "tone": tone,
+        "outline": "{}",
+        "competitive_analysis": {"top_competitors": []},
+        "trending_topics": [],
+        "final_post": body,
+        "content_hash": hashlib.sha256(body.encode("utf-8")).hexdigest()
+    }
+
+
+def test_posts_with_the_same_body_get_their_own_directories(make_manager):
+    manager = make_manager()
+    first = result_for("Email marketing", "professional", "Same body")
+    second = result_for("Newsletter tips", "casual", "Same body")
+
+    first_dir = manager._save_results(first, manager._blog_slug(first))
+    second_dir = manager._save_results(second, manager._blog_slug(second))
+
+    assert first_dir != second_dir
+    assert json.loads((first_dir / "post_metadata.json").read_text())["topic"] == "Email marketing"
+    assert json.loads((second_dir / "post_metadata.json").read_text())["topic"] == "Newsletter tips"
+
+
+def test_refreshed_versions_of_a_post_keep_their_directories(make_manager):
+    manager = make_manager()
+    original = result_for("Email marketing", "professional", "Original body")
+    slug = manager._blog_slug(original)
+    refreshed = result_for("Email marketing", "professional", "Refreshed body")
+
+    original_dir = manager._save_results(original, slug)
+    refreshed_dir = manager._save_results(refreshed, slug)
+
+    assert original_dir != refreshed_dir
+    assert (original_dir / "post.md").read_text() == "Original body"
+    assert (refreshed_dir / "post.md").read_text() == "Refreshed body"
+
+
+def test_generated_post_is_indexed_under_its_directory(make_manager):
+    manager = make_manager()
+    result = manager.generate_blog_post("Email marketing for ecommerce", "email marketing", "professional",
+                                        job_id="job-1")
+
+    entry = manager.find_output(job_id="job-1")
+    assert entry["output_dir"] == result["output_dir"]
+    assert entry["output_dir"].endswith(f"{result['blog_slug']}-{result['content_hash'][:16]}")
+
+
+def test_recent_index_entries_are_read_from_the_end(make_manager):
+    manager = make_manager()
+    # Enough entries to span several read blocks
+    for number in range(3000):
+        manager._append_to_index({"job_id": f"job-{number}", "output_dir": "x" * 40})
+
+    entries = manager._recent_index_entries(20)
+    assert [entry["job_id"] for entry in entries] == [f"job-{number}" for number in range(2980, 3000)]
+    assert len(manager._recent_index_entries(5000)) == 3000
+
+
+def test_recent_index_entries_of_a_missing_index(make_manager):
+    assert make_manager()._recent_index_entries(20) == []
+
+
+def test_token_savings_are_never_negative(make_manager):
+    manager = make_manager(pipeline_mode="combined")
+    metrics = manager.generate_blog_post("Email marketing for ecommerce", "email marketing", "professional")["metrics"]
+
+    assert metrics["estimated_tokens_saved"] == max(0, metrics["estimated_tokens_delta"])
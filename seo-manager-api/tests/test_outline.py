@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+from agents.outline import Outline, OutlineParseError, parse_outline, repair_outline, stitch_sections
+
+OUTLINE = {
+    "title": "Email Marketing",
+    "meta_description": "How to run it",
+    "sections": [{"heading": "Why it works", "bullets": ["ROI"]}, {"heading": "Getting started"}]
+}
+
+
+def test_parse_outline_accepts_fenced_json():
+    outline = parse_outline(f"```json\n{json.dumps(OUTLINE)}\n```")
+    assert outline.title == "Email Marketing"
+    assert [section.heading for section in outline.sections] == ["Why it works", "Getting started"]
+    assert outline.sections[1].bullets == []
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "   ",
+    "Here is your outline: " + json.dumps(OUTLINE),
+    json.dumps(OUTLINE)[:-1] + ",}",
+    json.dumps(["not", "an", "object"]),
+    json.dumps({"title": "No sections", "sections": []}),
+])
+def test_parse_outline_fails_fast(text):
+    with pytest.raises(OutlineParseError):
+        parse_outline(text)
+
+
+def test_repair_outline_fixes_prose_quotes_and_trailing_commas():
+    text = (
+        "Sure! Here is the outline:\n"
+        '{“title”: "Email Marketing", "sections": ['
+        '{"heading": "Why it works", "bullets": ["ROI",],},'
+        '{"heading": "  "},'
+        '{"heading": "Getting started", "bullets": "One bullet"},'
+        "]}\nLet me know if you need changes."
+    )
+    outline = repair_outline(text)
+    assert [section.heading for section in outline.sections] == ["Why it works", "Getting started"]
+    assert outline.sections[1].bullets == ["One bullet"]
+
+
+@pytest.mark.parametrize("text", ["", "No JSON here", '{"sections": [{"heading": ""}]}'])
+def test_repair_outline_gives_up_on_unrepairable_text(text):
+    with pytest.raises(OutlineParseError):
+        repair_outline(text)
+
+
+def test_stitch_sections_drops_restated_headings_and_demotes_stray_ones():
+    outline = Outline.model_validate(OUTLINE)
+    post = stitch_sections(outline, [
+        "## Why it works\n\nBecause it does.\n\n# Details\n\nMore.",
+        "```markdown\nStart small.\n```"
+    ])
+    assert post == (
+        "# Email Marketing\n\n"
+        "## Why it works\n\nBecause it does.\n\n### Details\n\nMore.\n\n"
+        "## Getting started\n\nStart small.\n"
+    )
+
+
+def make_planner(monkeypatch, outputs, repairs):
+    from agents import content_agents
+
+    planner = content_agents.PlannerAgent(max_retries=1)
+    outputs, repairs = iter(outputs), iter(repairs)
+    monkeypatch.setattr(planner, "generate_outline", lambda data: next(outputs))
+    monkeypatch.setattr(content_agents, "_invoke", lambda chain, inputs: next(repairs))
+    return planner
+
+
+def test_planner_escalates_from_local_repair_to_llm_repair_to_retry(monkeypatch):
+    planner = make_planner(monkeypatch, ["garbage", json.dumps(OUTLINE)], ["still garbage"])
+
+    raw, outline = planner.generate_structured_outline({})
+    assert outline.title == "Email Marketing"
+    stats = planner.outline_stats.snapshot()
+    assert (stats["planner_retries"], stats["parsed"], stats["llm_repairs"]) == (1, 1, 0)
+
+
+def test_planner_uses_the_llm_repair(monkeypatch):
+    planner = make_planner(monkeypatch, ["garbage"], [json.dumps(OUTLINE)])
+
+    raw, outline = planner.generate_structured_outline({})
+    assert raw == json.dumps(OUTLINE)
+    assert planner.outline_stats.snapshot()["llm_repairs"] == 1
+
+
+def test_planner_gives_up_after_its_retries(monkeypatch):
+    planner = make_planner(monkeypatch, ["garbage", "more garbage"], ["nope", "nope"])
+
+    with pytest.raises(OutlineParseError):
+        planner.generate_structured_outline({})
+    assert planner.outline_stats.snapshot()["failures"] == 1
@@ -0,0 +1,69 @@
+import hashlib
+
+from agents.post_index import MinHasher, PostIndex, jaccard, shingles, topic_tokens
+
+TEXT = " ".join(f"word{i} about email marketing for online stores" for i in range(60))
+
+
+def add(index, text, topic, keyword="email marketing", tone="casual", slug="post"):
+    index.add(text, hashlib.sha256(text.encode()).hexdigest(), topic, keyword, tone, slug, f"/out/{slug}", "")
+
+
+def test_topic_tokens_ignore_order_stop_words_and_plurals():
+    assert topic_tokens("Email marketing for ecommerce") == topic_tokens("ecommerce email marketings")
+    assert jaccard(topic_tokens("email marketing"), topic_tokens("email tools")) == 1 / 3
+
+
+def test_minhash_estimates_jaccard():
+    hasher = MinHasher(128)
+    a, b = shingles(TEXT), shingles(TEXT + " and a short new ending")
+    estimate = MinHasher.similarity(hasher.signature(a), hasher.signature(b))
+    assert abs(estimate - jaccard(a, b)) < 0.15
+    assert MinHasher.similarity(hasher.signature(a), hasher.signature(shingles("unrelated text here"))) < 0.2
+
+
+def test_empty_index_finds_nothing_then_finds_added_post(tmp_path):
+    index = PostIndex(tmp_path / "post_index.jsonl")
+    assert index.find_topic_duplicate("Email marketing for ecommerce", "email marketing", "casual") is None
+
+    add(index, TEXT, "Email marketing for ecommerce")
+    match = index.find_topic_duplicate("Ecommerce email marketing", "email marketing", "casual")
+    assert match["match"] == "topic" and match["slug"] == "post"
+    assert index.find_topic_duplicate("Ecommerce email marketing", "email marketing", "formal") is None
+
+
+def test_content_duplicates_exact_and_near(tmp_path):
+    index = PostIndex(tmp_path / "post_index.jsonl")
+    add(index, TEXT, "Topic one")
+    assert index.find_content_duplicate(TEXT)["match"] == "exact"
+    near = index.find_content_duplicate(TEXT.replace("word59", "wordx"))
+    assert near["match"] == "content" and near["similarity"] >= 0.8
+    assert index.find_content_duplicate("something else entirely " * 20) is None
+
+
+def test_entries_appended_by_another_instance_are_seen(tmp_path):
+    path = tmp_path / "post_index.jsonl"
+    reader, writer = PostIndex(path), PostIndex(path)
+    add(writer, TEXT, "Email marketing for ecommerce")
+    assert reader.find_content_duplicate(TEXT) is not None
+    assert reader.get_stats()["posts"] == 1
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    path = tmp_path / "post_index.jsonl"
+    add(PostIndex(path), TEXT, "Topic one")
+    with open(path, "a") as f:
+        f.write('{"content_hash": "x", "topic')
+    assert len(PostIndex(path)) == 1
+
+
+def test_manager_deduplicates_against_initially_empty_index(make_manager, tmp_path):
+    manager = make_manager()
+    first = manager.generate_blog_post("Email marketing for ecommerce", "email marketing", "casual")
+    assert (tmp_path / "output" / "post_index.jsonl").exists()
+    assert first["metrics"]["llm_calls"] > 0
+
+    second = manager.generate_blog_post("Ecommerce email marketing", "email marketing", "casual")
+    assert second["metrics"]["llm_calls"] == 0
+    assert second["blog_slug"] == first["blog_slug"]
+    assert second["metrics"]["duplicate"]["match"] == "topic"
@@ -0,0 +1,86 @@
+import html
+import json
+import os
+
+import pytest
+
+from agents.preview_cache import PreviewCache, render_post
+
+
+def render(markdown_text):
+    page = render_post(markdown_text, "Title", "Description", "/blog/post")
+    return page.split("<article>", 1)[1]
+
+
+@pytest.mark.parametrize("url", [
+    "javascript:alert(1)",
+    "java&#115;cript:alert(1)",
+    "JaVaScRiPt:alert(1)",
+    "&#x6A;avascript:alert(1)",
+    "java&#9;script:alert(1)",
+    "vbscript:msgbox(1)",
+    "data:text/html;base64,PHNjcmlwdD4=",
+])
+def test_script_links_are_neutralized(url):
+    body = render(f"[z]({url}) and ![i]({url})")
+    assert 'href="#"' in body
+    assert 'src="#"' in body
+    assert "alert" not in body and "msgbox" not in body and "base64" not in body
+
+
+@pytest.mark.parametrize("url", [
+    "https://example.com/a?b=1&c=2",
+    "http://example.com",
+    "mailto:team@example.com",
+    "/blog/other-post",
+    "#section",
+    "other-post",
+])
+def test_safe_links_are_kept(url):
+    assert f'href="{html.escape(url)}"' in render(f"[z]({url})")
+
+
+def test_raw_html_is_escaped():
+    body = render('<script>alert(1)</script>\n\n<a href="javascript:x">y</a>')
+    assert "<script>" not in body
+    assert "&lt;script&gt;" in body
+    assert "<a href" not in body
+
+
+def test_preview_is_revalidated_when_another_process_rewrites_it(tmp_path):
+    writer = PreviewCache(str(tmp_path), max_entries=4, max_files=10)
+    reader = PreviewCache(str(tmp_path), max_entries=4, max_files=10)
+
+    writer.put("post", "First version", "Post", "d", "hash-1")
+    assert "First version" in reader.get("post")["html"]
+    assert reader.get_stats()["disk_hits"] == 1
+    reader.get("post")
+    assert reader.get_stats()["memory_hits"] == 1
+
+    writer.put("post", "Second version", "Post", "d", "hash-2")
+    # Guard against coarse filesystem timestamps hiding the rewrite
+    path = tmp_path / "post.json"
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert "Second version" in reader.get("post")["html"]
+
+    path.unlink()
+    assert reader.get("post") is None
+
+
+def test_slug_for_job(tmp_path):
+    cache = PreviewCache(str(tmp_path), max_entries=4, max_files=10)
+    cache.put("post", "Body", "Post", "d", "hash", job_id="job-1")
+
+    assert cache.slug_for_job("job-1") == "post"
+    assert cache.slug_for_job("missing") is None
+    assert cache.slug_for_job("../post") is None
+
+    (tmp_path / "post.json").unlink()
+    assert cache.slug_for_job("job-1") is None
+
+
+def test_lookups_stay_inside_the_cache_directory(tmp_path):
+    cache = PreviewCache(str(tmp_path / "previews"), max_entries=4, max_files=10)
+    (tmp_path / "secret.json").write_text(json.dumps({"html": "secret"}))
+    assert cache.get("../secret") is None
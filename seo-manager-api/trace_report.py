@@ -0,0 +1,88 @@
+"""
+Summarize spans exported with TRACING_EXPORTER=json
+
+Prints latency percentiles per span name and, for the slowest jobs, the
+critical path: starting at the job span, repeatedly follow the child that
+finished last.
+
+Usage:
+    python trace_report.py [traces/spans.jsonl] [--jobs 5]
+"""
+
+import argparse
+import json
+import statistics
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+
+def load_spans(path: str) -> List[Dict]:
+    spans = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                spans.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return spans
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def critical_path(span: Dict, children: Dict[str, List[Dict]], depth: int = 0) -> List[Tuple[int, Dict]]:
+    """
+    Spans that determined when `span` finished: walking back from its end,
+    take the child that finished last, then the last one to finish before
+    that child started, and so on; then expand each of them the same way
+    """
+    chain = []
+    cursor = span["end_ns"]
+    while True:
+        candidates = [child for child in children.get(span["span_id"], []) if child["end_ns"] <= cursor]
+        if not candidates:
+            break
+        child = max(candidates, key=lambda candidate: candidate["end_ns"])
+        chain.append(child)
+        cursor = child["start_ns"]
+
+    path = [(depth, span)]
+    for child in reversed(chain):
+        path.extend(critical_path(child, children, depth + 1))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize exported trace spans")
+    parser.add_argument("path", nargs="?", default="traces/spans.jsonl", help="Span JSONL file")
+    parser.add_argument("--jobs", type=int, default=5, help="Number of slowest jobs to break down")
+    args = parser.parse_args()
+
+    spans = load_spans(args.path)
+
+    by_name = defaultdict(list)
+    children = defaultdict(list)
+    roots = []
+    for span in spans:
+        by_name[span["name"]].append(span["duration_ms"])
+        if span["parent_id"]:
+            children[span["parent_id"]].append(span)
+        else:
+            roots.append(span)
+
+    print(f"{'span':<24}{'count':>8}{'p50 ms':>12}{'p95 ms':>12}{'max ms':>12}")
+    for name, durations in sorted(by_name.items(), key=lambda item: -sum(item[1])):
+        print(f"{name:<24}{len(durations):>8}{statistics.median(durations):>12.1f}"
+              f"{percentile(durations, 0.95):>12.1f}{max(durations):>12.1f}")
+
+    for root in sorted(roots, key=lambda span: -span["duration_ms"])[:args.jobs]:
+        job_id = root["attributes"].get("job_id") or root["trace_id"]
+        print(f"\n{root['name']} {job_id}: {root['duration_ms']:.0f} ms, critical path:")
+        for depth, span in critical_path(root, children):
+            print(f"  {'  ' * depth}{span['name']} {span['duration_ms']:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
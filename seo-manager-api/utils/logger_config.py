@@ -2,17 +2,133 @@
 Centralized logging configuration for SEO Manager
 """
 
+import atexit
+import copy
+import itertools
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Any, Iterator, Optional
+
+# Fields (e.g. job_id, stage) attached to every record logged in the current context
+_log_context: ContextVar[Dict[str, Any]] = ContextVar("log_context", default={})
+
+# Attributes every LogRecord has; anything else was passed via `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+# Background listener of the queued (production) pipeline
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+@contextmanager
+def log_context(**fields: Any) -> Iterator[None]:
+    """Attach fields to all records logged inside the block (including by threads copying the context)"""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+def update_log_context(**fields: Any) -> None:
+    """Set fields for the rest of the enclosing log_context block"""
+    _log_context.set({**_log_context.get(), **fields})
+
+
+class ContextFilter(logging.Filter):
+    """Copy the current log context (job_id, stage, ...) onto each record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _log_context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keep one in every `every` DEBUG records per logger; other levels always pass"""
+
+    def __init__(self, every: int = 10):
+        super().__init__()
+        self.every = max(1, every)
+        self._counters: Dict[str, itertools.count] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        counter = self._counters.get(record.name)
+        if counter is None:
+            counter = self._counters.setdefault(record.name, itertools.count())
+        return next(counter) % self.every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including context and `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that leaves formatting to the listener thread
+
+    The standard handler formats each record in the calling thread; here only
+    the message is interpolated (so args can't change before the listener
+    runs) and exceptions are rendered to text.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def stop_logging_listener() -> None:
+    """Flush and stop the queued logging pipeline, if running"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
 
 
 def setup_logging(
     log_level: str = "INFO",
     log_file: Optional[str] = "seo_manager.log",
     console_output: bool = True,
-    log_format: Optional[str] = None
+    log_format: Optional[str] = None,
+    json_format: bool = False,
+    queued: bool = False,
+    max_bytes: int = 0,
+    backup_count: int = 5,
+    debug_sample_every: int = 1
 ):
     """
     Configure logging for the SEO Manager application
@@ -22,11 +138,18 @@ def setup_logging(
         log_file: Path to log file. None to disable file logging
         console_output: Whether to output logs to console
         log_format: Custom log format string
+        json_format: Write one JSON object per record instead of log_format
+        queued: Hand records to a background thread through a queue, so
+            logging calls never block on console or disk I/O
+        max_bytes: Rotate the log file at this size (0 disables rotation)
+        backup_count: Number of rotated log files to keep
+        debug_sample_every: Keep one in this many DEBUG records per logger
     """
 
     # Default log format
     if log_format is None:
         log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    formatter = JsonFormatter() if json_format else logging.Formatter(log_format)
 
     # Convert string level to logging constant
     numeric_level = getattr(logging, log_level.upper(), logging.INFO)
@@ -36,6 +159,8 @@ def setup_logging(
         log_path = Path(log_file)
         log_path.parent.mkdir(exist_ok=True)
 
+    stop_logging_listener()
+
     # Configure root logger
     handlers = []
 
@@ -43,16 +168,36 @@ def setup_logging(
     if console_output:
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setLevel(numeric_level)
-        console_handler.setFormatter(logging.Formatter(log_format))
+        console_handler.setFormatter(formatter)
         handlers.append(console_handler)
 
     # File handler
     if log_file:
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        if max_bytes:
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+            )
+        else:
+            file_handler = logging.FileHandler(log_file, encoding='utf-8')
         file_handler.setLevel(numeric_level)
-        file_handler.setFormatter(logging.Formatter(log_format))
+        file_handler.setFormatter(formatter)
         handlers.append(file_handler)
 
+    if queued:
+        # The writing handlers run on the listener thread; callers only enqueue
+        global _listener
+        log_queue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        queue_handler = _QueueHandler(log_queue)
+        handlers = [queue_handler]
+
+    # Context and sampling are applied in the calling thread, before the queue
+    for handler in handlers:
+        handler.addFilter(ContextFilter())
+        if debug_sample_every > 1:
+            handler.addFilter(DebugSamplingFilter(debug_sample_every))
+
     # Configure logging
     logging.basicConfig(
         level=numeric_level,
@@ -95,11 +240,19 @@ class LoggingConfig:
 
     @staticmethod
     def production():
-        """Production configuration with minimal console output"""
+        """
+        Production configuration: JSON records written by a background thread
+        to a size-rotated file, with sampled debug logs
+        """
         setup_logging(
-            log_level="INFO",
-            log_file="logs/seo_production.log",
-            console_output=False
+            log_level=os.getenv("LOG_LEVEL", "INFO"),
+            log_file=os.getenv("LOG_FILE", "logs/seo_production.log"),
+            console_output=False,
+            json_format=True,
+            queued=True,
+            max_bytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+            backup_count=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+            debug_sample_every=int(os.getenv("LOG_DEBUG_SAMPLE_EVERY", "10"))
         )
 
     @staticmethod
@@ -120,4 +273,24 @@ class LoggingConfig:
             log_file=None,
             console_output=True,
             log_format="%(levelname)s - %(message)s"
-        )
\ No newline at end of file
+        )
+
+    @staticmethod
+    def from_env():
+        """Apply the configuration named by LOG_MODE (no-op when unset)"""
+        mode = os.getenv("LOG_MODE", "").lower()
+        if not mode:
+            return
+        configure = {
+            "development": LoggingConfig.development,
+            "production": LoggingConfig.production,
+            "testing": LoggingConfig.testing,
+            "console": LoggingConfig.console_only
+        }.get(mode)
+        if configure is None:
+            raise ValueError(f"Unknown LOG_MODE: {mode}")
+        configure()
+
+
+# Flush queued records on interpreter exit
+atexit.register(stop_logging_listener)
\ No newline at end of file
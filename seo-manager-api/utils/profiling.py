@@ -0,0 +1,269 @@
+"""
+On-demand CPU and memory profiling of a running process
+
+The CPU profiler is a background thread that samples every thread's stack
+(sys._current_frames) at a fixed interval for a bounded window and counts
+folded stacks ("frame;frame;frame count", the input format of flamegraph.pl,
+speedscope and inferno). Frames are labelled module:qualname, so
+ManagerAgent stages, SEOContentCache calls and json/pydantic conversions show
+up by name. Samples are wall-clock: a thread blocked in a lock, a socket or
+sleep is counted in the frame that is waiting. The memory profiler wraps
+tracemalloc snapshots and diffs.
+
+Nothing runs while profiling is off: no sampler thread, no tracemalloc hooks.
+"""
+
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bounds on what an admin request can ask for
+MAX_CPU_SECONDS = 300.0
+MIN_INTERVAL_SECONDS = 0.001
+MAX_STACK_DEPTH = 128
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class CPUProfiler:
+    """Sampling profiler producing folded stacks over a time window"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stacks: Counter = Counter()
+        self._info: Dict[str, Any] = {}
+        self._last: Optional[Dict[str, Any]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float = 30.0, interval: float = 0.005) -> Dict[str, Any]:
+        """
+        Start sampling in the background; it stops on its own after `seconds`
+
+        Args:
+            seconds: Length of the window (capped at MAX_CPU_SECONDS)
+            interval: Seconds between samples
+
+        Returns:
+            The profile's status
+
+        Raises:
+            RuntimeError: If a profile is already running
+        """
+        with self._lock:
+            if self.running:
+                raise RuntimeError("A CPU profile is already running")
+            self._stop.clear()
+            self._stacks = Counter()
+            self._info = {
+                "started_at": datetime.now().isoformat(),
+                "seconds": min(max(seconds, 0.1), MAX_CPU_SECONDS),
+                "interval": max(interval, MIN_INTERVAL_SECONDS),
+                "samples": 0
+            }
+            self._thread = threading.Thread(target=self._run, name="cpu-profiler", daemon=True)
+            self._thread.start()
+        logger.info(f"CPU profile started ({self._info['seconds']}s at {self._info['interval'] * 1000:.1f}ms)")
+        return self.status()
+
+    def stop(self) -> Optional[Dict[str, Any]]:
+        """Stop the running profile early; returns the finished profile (or the last one)"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+        return self._last
+
+    def status(self) -> Dict[str, Any]:
+        if self.running:
+            return {"status": "running", **self._info}
+        if self._last is not None:
+            return {"status": "finished", **self._last["info"]}
+        return {"status": "idle"}
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        """Last finished profile: info and folded stack counts"""
+        return self._last
+
+    def folded(self) -> str:
+        """Last finished profile in folded-stack text format"""
+        if self._last is None:
+            return ""
+        return "".join(f"{stack} {count}\n" for stack, count in self._last["stacks"].most_common())
+
+    def top(self, limit: int = 25) -> Dict[str, List[Dict[str, Any]]]:
+        """Functions with the most samples on top of the stack (self) and anywhere on it (total)"""
+        if self._last is None:
+            return {"self": [], "total": []}
+        samples = max(self._last["info"]["samples"], 1)
+        own, total = Counter(), Counter()
+        for stack, count in self._last["stacks"].items():
+            frames = stack.split(";")[1:]  # first element is the thread name
+            if frames:
+                own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+
+        def rows(counter: Counter) -> List[Dict[str, Any]]:
+            return [{"function": function, "samples": count, "percent": round(100 * count / samples, 1)}
+                    for function, count in counter.most_common(limit)]
+
+        return {"self": rows(own), "total": rows(total)}
+
+    def _run(self) -> None:
+        info = self._info
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + info["seconds"]
+        next_sample = time.monotonic()
+        stacks = self._stacks
+
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                labels = []
+                while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(thread_id, str(thread_id)))
+                stacks[";".join(reversed(labels))] += 1
+            info["samples"] += 1
+
+            next_sample += info["interval"]
+            delay = next_sample - time.monotonic()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                # Fell behind (GIL contention): skip missed samples instead of bursting
+                next_sample = time.monotonic()
+
+        info["finished_at"] = datetime.now().isoformat()
+        info["stacks"] = len(stacks)
+        self._last = {"info": dict(info), "stacks": stacks}
+        logger.info(f"CPU profile finished: {info['samples']} samples, {len(stacks)} distinct stacks")
+
+
+class MemoryProfiler:
+    """tracemalloc snapshots and diffs against a baseline"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._started_by_us = False
+
+    @property
+    def running(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 10) -> Dict[str, Any]:
+        """Start tracing allocations and take the baseline snapshot"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(max(1, frames))
+                self._started_by_us = True
+            self._baseline = self._previous = self._take()
+        logger.info(f"tracemalloc started ({tracemalloc.get_traceback_limit()} frames)")
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        """Stop tracing and drop the snapshots"""
+        with self._lock:
+            if self._started_by_us and tracemalloc.is_tracing():
+                tracemalloc.stop()
+            self._started_by_us = False
+            self._baseline = self._previous = None
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            return {"status": "idle"}
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "status": "running",
+            "frames": tracemalloc.get_traceback_limit(),
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "overhead_bytes": tracemalloc.get_tracemalloc_memory()
+        }
+
+    def snapshot(self, limit: int = 25, group_by: str = "lineno", compare_to: str = "baseline") -> Dict[str, Any]:
+        """
+        Take a snapshot: top allocation sites and the growth since the baseline
+
+        Args:
+            limit: Rows per list
+            group_by: "lineno", "filename" or "traceback"
+            compare_to: "baseline" (taken at start) or "previous" (last snapshot)
+
+        Raises:
+            RuntimeError: If tracing is not running
+            ValueError: For an unknown group_by or compare_to
+        """
+        if group_by not in ("lineno", "filename", "traceback"):
+            raise ValueError("group_by must be lineno, filename or traceback")
+        if compare_to not in ("baseline", "previous"):
+            raise ValueError("compare_to must be baseline or previous")
+        with self._lock:
+            if not tracemalloc.is_tracing() or self._baseline is None:
+                raise RuntimeError("Memory profiling is not running")
+            snapshot = self._take()
+            reference = self._baseline if compare_to == "baseline" else self._previous
+            self._previous = snapshot
+
+        return {
+            **self.status(),
+            "top": [self._stat_row(stat) for stat in snapshot.statistics(group_by)[:limit]],
+            "diff": [self._stat_row(stat) for stat in snapshot.compare_to(reference, group_by)[:limit]],
+            "compared_to": compare_to
+        }
+
+    @staticmethod
+    def _take() -> tracemalloc.Snapshot:
+        # Leave out the import machinery and tracemalloc's own bookkeeping
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ))
+
+    @staticmethod
+    def _stat_row(stat) -> Dict[str, Any]:
+        row = {
+            "location": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            "size_bytes": stat.size,
+            "count": stat.count
+        }
+        if hasattr(stat, "size_diff"):
+            row.update(size_diff_bytes=stat.size_diff, count_diff=stat.count_diff)
+        return row
+
+
+_cpu_profiler = CPUProfiler()
+_memory_profiler = MemoryProfiler()
+
+
+def get_cpu_profiler() -> CPUProfiler:
+    """Process-wide CPU profiler"""
+    return _cpu_profiler
+
+
+def get_memory_profiler() -> MemoryProfiler:
+    """Process-wide memory profiler"""
+    return _memory_profiler
@@ -0,0 +1,291 @@
+"""
+Lightweight tracing for the generation pipeline
+
+Spans are timed blocks (a job, a stage, a cache lookup, a SerpAPI or LLM
+call, a file write) linked to their parent through a context variable, so
+spans opened in worker threads that copy the context join the job's trace.
+Finished spans are exported in batches by a background thread to a JSONL
+file or to an OTLP/HTTP collector (JSON encoding, e.g. an OpenTelemetry
+Collector or Jaeger on port 4318).
+
+Tracing is off unless TRACING_EXPORTER is set; spans are then no-ops.
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "seo-manager-api"
+
+
+class Span:
+    """A timed operation within a trace"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes",
+                 "start_ns", "end_ns", "status", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = "ok"
+        self.error = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+
+class _NoopSpan:
+    """Stand-in yielded when tracing is disabled"""
+
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, **attributes: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class JsonFileExporter:
+    """Append finished spans to a JSONL file"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def export(self, spans: List[Span]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n")
+
+
+class OTLPHttpExporter:
+    """Send finished spans to an OTLP/HTTP collector using the JSON encoding"""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.timeout = timeout
+
+    def export(self, spans: List[Span]) -> None:
+        import requests
+
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+                "scopeSpans": [{
+                    "scope": {"name": "seo-manager"},
+                    "spans": [self._span(span) for span in spans]
+                }]
+            }]
+        }
+        response = requests.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+    @staticmethod
+    def _span(span: Span) -> Dict[str, Any]:
+        encoded = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": _otlp_attributes(span.attributes),
+            # STATUS_CODE_OK = 1, STATUS_CODE_ERROR = 2
+            "status": {"code": 2, "message": span.error or ""} if span.status == "error" else {"code": 1}
+        }
+        if span.parent_id:
+            encoded["parentSpanId"] = span.parent_id
+        return encoded
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    encoded = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        encoded.append({"key": key, "value": typed})
+    return encoded
+
+
+class Tracer:
+    """Creates spans and exports finished ones from a background thread"""
+
+    def __init__(self, exporter=None, batch_size: int = 256, flush_interval: float = 2.0):
+        """
+        Args:
+            exporter: Object with export(spans), or None to disable tracing
+            batch_size: Spans sent per export call
+            flush_interval: Seconds between exports of a partial batch
+        """
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+        self._thread = None
+        self._stats = {"spans": 0, "exported": 0, "export_errors": 0}
+        if exporter is not None:
+            self._thread = threading.Thread(target=self._export_loop, name="span-exporter", daemon=True)
+            self._thread.start()
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    @contextmanager
+    def span(self, name: str, trace_key: Optional[str] = None, **attributes: Any) -> Iterator[Any]:
+        """
+        Time a block as a span, child of the current span if there is one
+
+        Args:
+            name: Span name
+            trace_key: For root spans, derive the trace id from this key (e.g.
+                a job id) so every run of a job lands in the same trace
+            attributes: Initial span attributes
+        """
+        if self.exporter is None:
+            yield _NOOP_SPAN
+            return
+
+        parent = self._current.get()
+        if parent is not None:
+            trace_id = parent.trace_id
+        elif trace_key:
+            trace_id = hashlib.sha256(trace_key.encode("utf-8")).hexdigest()[:32]
+        else:
+            trace_id = secrets.token_hex(16)
+
+        span = Span(name, trace_id, parent.span_id if parent else None, attributes)
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            self._current.reset(token)
+            self._stats["spans"] += 1
+            self._queue.put(span)
+
+    def current_span(self) -> Optional[Span]:
+        return self._current.get()
+
+    def flush(self) -> None:
+        """Export everything queued so far (blocks until done)"""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout=self.flush_interval + 10)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "exporter": type(self.exporter).__name__ if self.exporter else None,
+                **self._stats}
+
+    def _export_loop(self) -> None:
+        batch: List[Span] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            flush_event = None
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                if isinstance(item, threading.Event):
+                    flush_event = item
+                else:
+                    batch.append(item)
+            except queue.Empty:
+                pass
+
+            if batch and (flush_event or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                try:
+                    self.exporter.export(batch)
+                    self._stats["exported"] += len(batch)
+                except Exception as e:
+                    self._stats["export_errors"] += 1
+                    logger.warning(f"Span export failed ({len(batch)} spans dropped): {e}")
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+            if flush_event:
+                flush_event.set()
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """
+    Get the process-wide tracer, configured from the environment:
+    TRACING_EXPORTER ("json" or "otlp", unset disables), TRACING_FILE and
+    OTLP_ENDPOINT
+    """
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                mode = os.getenv("TRACING_EXPORTER", "").lower()
+                if mode == "json":
+                    exporter = JsonFileExporter(os.getenv("TRACING_FILE", "traces/spans.jsonl"))
+                elif mode == "otlp":
+                    exporter = OTLPHttpExporter(os.getenv("OTLP_ENDPOINT", "http://localhost:4318"))
+                elif not mode:
+                    exporter = None
+                else:
+                    raise ValueError(f"Unknown TRACING_EXPORTER: {mode}")
+                _tracer = Tracer(exporter)
+                if exporter is not None:
+                    atexit.register(_tracer.flush)
+    return _tracer
+
+
+def span(name: str, trace_key: Optional[str] = None, **attributes: Any):
+    """Open a span on the process-wide tracer"""
+    return get_tracer().span(name, trace_key=trace_key, **attributes)
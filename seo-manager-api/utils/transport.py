@@ -0,0 +1,139 @@
+"""
+Compact transport of finished results: serialize once, then serve field
+subsets with compression and ETag revalidation.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from typing import Dict, Any, Optional, Iterable, Tuple
+
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # Optional dependency: fall back to gzip
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_SIZE = 1000
+# Upper bound on memoized field-selection variants per payload
+MAX_VARIANTS = 8
+
+
+class CachedPayload:
+    """A finished result serialized once, with memoized encoded variants"""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+        self._variants: Dict[Tuple, Tuple[bytes, str]] = {}
+        self._encoded: Dict[Tuple, bytes] = {}
+        self._lock = threading.Lock()
+
+    def select(self, fields: Optional[Iterable[str]]) -> Tuple[bytes, str]:
+        """
+        Get the JSON body and ETag for a field selection
+
+        Args:
+            fields: Top-level fields to include, or None for all
+
+        Returns:
+            (body, etag)
+        """
+        key = tuple(sorted(set(fields))) if fields else ()
+        with self._lock:
+            variant = self._variants.get(key)
+        if variant is not None:
+            return variant
+
+        data = {name: self.data[name] for name in key} if key else self.data
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        variant = (body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+        with self._lock:
+            if len(self._variants) < MAX_VARIANTS:
+                self._variants[key] = variant
+        return variant
+
+    def encode(self, fields: Optional[Iterable[str]], encoding: Optional[str]) -> bytes:
+        """Get the (possibly compressed) body for a field selection"""
+        body, _ = self.select(fields)
+        if encoding is None:
+            return body
+
+        key = (tuple(sorted(set(fields))) if fields else (), encoding)
+        with self._lock:
+            encoded = self._encoded.get(key)
+        if encoded is not None:
+            return encoded
+
+        encoded = compress(body, encoding)
+
+        with self._lock:
+            if len(self._encoded) < MAX_VARIANTS:
+                self._encoded[key] = encoded
+        return encoded
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a body with an encoding picked by choose_encoding"""
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def choose_encoding(accept_encoding: str, size: int) -> Optional[str]:
+    """Pick the best supported content encoding for a body of the given size"""
+    if size < MIN_COMPRESS_SIZE or not accept_encoding:
+        return None
+
+    offered = {
+        part.split(";")[0].strip().lower()
+        for part in accept_encoding.split(",")
+        if not part.strip().endswith(";q=0")
+    }
+    if brotli is not None and "br" in offered:
+        return "br"
+    if "gzip" in offered:
+        return "gzip"
+    return None
+
+
+def encoding_etag(etag: str, encoding: Optional[str]) -> str:
+    """Strong ETag of one encoding of a body: each content coding is a different representation"""
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for it)"""
+    if if_none_match.strip() == "*":
+        return True
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    return etag in {tag[2:] if tag.startswith("W/") else tag for tag in tags}
+
+
+def payload_response(payload: CachedPayload, request: Request,
+                     fields: Optional[Iterable[str]] = None,
+                     cache_control: str = "private, max-age=3600") -> Response:
+    """
+    Build an HTTP response for a cached payload
+
+    Honors If-None-Match (304 without a body) and Accept-Encoding; the ETag
+    differs per content encoding.
+    """
+    body, etag = payload.select(fields)
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""), len(body))
+    headers = {"ETag": encoding_etag(etag, encoding), "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+    if etag_matches(request.headers.get("if-none-match", ""), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+
+    return Response(
+        content=payload.encode(fields, encoding),
+        media_type="application/json",
+        headers=headers
+    )
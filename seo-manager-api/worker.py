@@ -0,0 +1,261 @@
+"""
+Generation workers for JOB_BACKEND=sqlite or redis
+
+Each worker process builds its own ManagerAgent, claims jobs from the
+durable queue (see job_queue.py), heartbeats while a job runs and acks or
+fails it. Add processes (or run this on more hosts against a shared Redis)
+to raise throughput without touching the API; several processes need the
+research cache on a Chroma server (CACHE_MODE=http), since only one process
+may open the embedded store.
+
+On SIGTERM/SIGINT workers stop claiming and finish their current job; a
+second signal hands running jobs back to the queue, where the next worker
+resumes them from their checkpoints.
+
+Usage:
+    python worker.py [--processes N] [--priorities interactive,batch]
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+from dotenv import load_dotenv
+
+from agents.cancellation import CancelToken, JobCancelled, DeadlineExceeded
+from agents.llm_pool import PRIORITY_INTERACTIVE, PRIORITY_BATCH, llm_priority
+from job_queue import PRIORITY_CLASSES, QueuedJob, get_job_queue
+from models import BlogPostResponse
+from utils.logger_config import LoggingConfig, log_context
+
+logger = logging.getLogger(__name__)
+
+_LLM_PRIORITIES = {"interactive": PRIORITY_INTERACTIVE, "batch": PRIORITY_BATCH}
+
+
+class Worker:
+    """Claims jobs from the queue and runs them on a ManagerAgent"""
+
+    def __init__(self, queue, manager, worker_id: str, priorities: Sequence[str] = PRIORITY_CLASSES,
+                 poll_interval: float = 1.0):
+        """
+        Args:
+            queue: SQLiteJobQueue or RedisJobQueue
+            manager: ManagerAgent running the jobs
+            worker_id: Identifier recorded on claimed jobs
+            priorities: Priority classes this worker takes
+            poll_interval: Seconds to wait when the queue is empty
+        """
+        self.queue = queue
+        self.manager = manager
+        self.worker_id = worker_id
+        self.priorities = tuple(priorities)
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = max(1.0, queue.lease_seconds / 3)
+
+        self._stop = threading.Event()
+        self._release = threading.Event()
+        self._token: Optional[CancelToken] = None
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop.is_set()
+
+    def stop(self, release: bool = False) -> None:
+        """Stop claiming jobs; with release, also hand the running job back to the queue"""
+        self._stop.set()
+        if release:
+            self._release.set()
+            token = self._token
+            if token is not None:
+                token.cancel()
+
+    def run(self) -> None:
+        """Process jobs until stopped"""
+        logger.info(f"Worker {self.worker_id} started ({', '.join(self.priorities)})")
+        while not self._stop.is_set():
+            if not self.run_once():
+                self._stop.wait(self.poll_interval)
+        logger.info(f"Worker {self.worker_id} stopped")
+
+    def run_once(self) -> bool:
+        """Claim and run one job; returns False if there was nothing to run"""
+        try:
+            job = self.queue.claim(self.worker_id, self.priorities)
+        except Exception as e:
+            logger.error(f"Claiming a job failed: {e}")
+            return False
+        if job is None:
+            return False
+
+        with llm_priority(_LLM_PRIORITIES[job.priority]), \
+                log_context(job_id=job.job_id, worker_id=self.worker_id):
+            self._process(job)
+        return True
+
+    def _process(self, job: QueuedJob) -> None:
+        # The deadline is absolute, so retries get only what is left of it
+        remaining = job.remaining()
+        token = CancelToken(max(remaining, 0.001) if remaining is not None else None)
+        self._token = token
+
+        finished = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(job, token, finished), name="job-heartbeat", daemon=True
+        )
+        heartbeat.start()
+
+        logger.info(f"Running {job.kind} job {job.job_id} (attempt {job.attempts})")
+        try:
+            token.check("start")
+            if job.kind == "resume":
+                result = self.manager.resume_blog_post(job.job_id, cancel_token=token)
+            elif job.kind == "refresh":
+                result = self.manager.refresh_blog_post(job.payload["slug"], job_id=job.job_id, cancel_token=token)
+            else:
+                result = self.manager.generate_blog_post(
+                    topic=job.payload["topic"],
+                    keyword=job.payload["keyword"],
+                    tone=job.payload["tone"],
+                    job_id=job.job_id,
+                    cancel_token=token,
+                    allow_duplicate=job.payload.get("allow_duplicate", False)
+                )
+            result.setdefault("metrics", {})["queue_wait_ms"] = job.queue_wait_ms
+
+            response = BlogPostResponse.from_result(result, job.job_id)
+            if not self.queue.complete(job.job_id, self.worker_id, response.model_dump(mode="json")):
+                logger.warning(f"Job {job.job_id} was reassigned before it finished; result dropped")
+
+        except JobCancelled as e:
+            if self._release.is_set():
+                self.queue.release(job.job_id, self.worker_id)
+                logger.info(f"Released job {job.job_id} back to the queue")
+            else:
+                self.queue.fail(job.job_id, self.worker_id, str(e), status="cancelled", retry=False,
+                                last_stage=self._last_stage(job.job_id))
+        except DeadlineExceeded as e:
+            self.queue.fail(job.job_id, self.worker_id, str(e), status="timed_out", retry=False,
+                            last_stage=self._last_stage(job.job_id))
+        except Exception as e:
+            logger.error(f"Job {job.job_id} failed: {e}")
+            self.queue.fail(job.job_id, self.worker_id, str(e), last_stage=self._last_stage(job.job_id))
+
+        finally:
+            finished.set()
+            heartbeat.join()
+            self._token = None
+
+    def _heartbeat(self, job: QueuedJob, token: CancelToken, finished: threading.Event) -> None:
+        """Keep the job's lease alive; cancel the run if the job was cancelled or reassigned"""
+        while not finished.wait(self.heartbeat_interval):
+            try:
+                if not self.queue.heartbeat(job.job_id, self.worker_id):
+                    token.cancel()
+                    return
+            except Exception as e:
+                # Transient store errors: the lease outlives a couple of missed beats
+                logger.warning(f"Heartbeat for job {job.job_id} failed: {e}")
+
+    def _last_stage(self, job_id: str) -> Optional[str]:
+        checkpoints = self.manager.checkpoints
+        return checkpoints.last_stage(job_id) if checkpoints else None
+
+
+def _run_process(index: int, priorities: Sequence[str]) -> None:
+    """Entry point of one worker process"""
+    load_dotenv()
+    LoggingConfig.from_env()
+
+    # The parent forwards SIGINT as SIGTERM; ignore the terminal's copy
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from agents.manager_agent import ManagerAgent
+    worker = Worker(get_job_queue(), ManagerAgent(), f"{socket.gethostname()}-{os.getpid()}-{index}",
+                    priorities, poll_interval=float(os.getenv("WORKER_POLL_SECONDS", "1.0")))
+
+    def handle_signal(signum, frame):
+        # First signal drains, a second one releases the running job
+        worker.stop(release=worker.stopping)
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    worker.run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run generation workers against the durable job queue")
+    parser.add_argument("--processes", type=int, default=int(os.getenv("WORKER_PROCESSES", "1")),
+                        help="Number of worker processes (more than one needs CACHE_MODE=http)")
+    parser.add_argument("--priorities", default="interactive,batch",
+                        help="Comma-separated priority classes to take (e.g. interactive only)")
+    parser.add_argument("--stagger", type=float, default=2.0,
+                        help="Seconds between process starts (spreads out model and client loading)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    LoggingConfig.from_env()
+
+    if args.processes > 1 and os.getenv("CACHE_MODE", "embedded").lower() != "http":
+        # Each process would open the embedded Chroma store; only one may
+        parser.error("--processes > 1 requires CACHE_MODE=http (a shared Chroma server)")
+
+    priorities = [priority.strip() for priority in args.priorities.split(",") if priority.strip()]
+    unknown = [priority for priority in priorities if priority not in PRIORITY_CLASSES]
+    if unknown or not priorities:
+        parser.error(f"--priorities must be taken from {', '.join(PRIORITY_CLASSES)}")
+
+    # Create the queue's tables once before the workers race to do it
+    get_job_queue()
+
+    context = multiprocessing.get_context("spawn")
+    processes: Dict[int, multiprocessing.Process] = {}
+    started_at: Dict[int, float] = {}
+    stopping = threading.Event()
+
+    def start(index: int) -> None:
+        process = context.Process(target=_run_process, args=(index, priorities), name=f"seo-worker-{index}")
+        process.start()
+        processes[index] = process
+        started_at[index] = time.monotonic()
+
+    def handle_signal(signum, frame):
+        stopping.set()
+        for process in processes.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    for index in range(max(1, args.processes)):
+        start(index)
+        if index + 1 < args.processes:
+            time.sleep(args.stagger)
+    logger.info(f"Started {len(processes)} worker processes")
+
+    # Restart workers that crash later on; their jobs come back when the lease expires
+    while processes:
+        for index, process in list(processes.items()):
+            if process.is_alive():
+                continue
+            process.join()
+            if stopping.is_set() or process.exitcode == 0:
+                del processes[index]
+            elif time.monotonic() - started_at[index] < 30:
+                # Failing at startup (bad configuration): restarting would only loop
+                logger.error(f"Worker process {index} exited with {process.exitcode} during startup")
+                del processes[index]
+            else:
+                logger.warning(f"Worker process {index} exited with {process.exitcode}; restarting")
+                start(index)
+        time.sleep(1.0)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ export interface BlogPostRequest {
   topic: string;
   keyword: string;
   tone: string;
+  allow_duplicate?: boolean;
 }
 
 export interface CompetitorInfo {
@@ -26,23 +27,40 @@ export interface CompetitiveAnalysis {
   related_searches: string[];
 }
 
+export interface OutlineSection {
+  heading: string;
+  bullets: string[];
+}
+
+export interface Outline {
+  title: string;
+  meta_description: string;
+  sections: OutlineSection[];
+}
+
 export interface BlogPostResponse {
   topic: string;
   keyword: string;
   tone: string;
   final_post: string;
   outline: string;
+  parsed_outline?: Outline;
   competitive_analysis: CompetitiveAnalysis;
   trending_topics: TrendingTopic[];
   generation_id: string;
+  metrics?: Record<string, any>;
   blog_url?: string;
   blog_slug?: string;
+  // Path on the API (prefix API_BASE_URL); serves the post before the static build has it
+  preview_url?: string;
 }
 
 export interface BlogPostStatus {
   status: string;
   message?: string;
   progress?: number;
+  blog_slug?: string | null;
+  preview_url?: string | null;
 }
 
 export interface GenerateJobResponse {
@@ -79,8 +97,9 @@ class ApiService {
     return response.json();
   }
 
-  async getJobResult(jobId: string): Promise<BlogPostResponse> {
-    const response = await fetch(`${API_BASE_URL}/result/${jobId}`);
+  async getJobResult(jobId: string, fields?: (keyof BlogPostResponse)[]): Promise<BlogPostResponse> {
+    const query = fields && fields.length ? `?fields=${fields.join(',')}` : '';
+    const response = await fetch(`${API_BASE_URL}/result/${jobId}${query}`);
 
     if (!response.ok) {
       throw new Error(`API error: ${response.status} ${response.statusText}`);
@@ -135,6 +154,24 @@ class ApiService {
     throw new Error('Blog generation timed out');
   }
 
+  // The static post once the site build serves it, the API's preview until then
+  async resolvePostUrl(result: BlogPostResponse): Promise<string> {
+    if (result.blog_url) {
+      try {
+        const response = await fetch(result.blog_url, { method: 'HEAD' });
+        if (response.ok) {
+          return result.blog_url;
+        }
+      } catch {
+        // Not built yet; fall through to the preview
+      }
+    }
+    if (result.preview_url) {
+      return `${API_BASE_URL}${result.preview_url}`;
+    }
+    return result.blog_url || '/';
+  }
+
   async checkHealth(): Promise<{ status: string; message: string; timestamp: string }> {
     const response = await fetch(`${API_BASE_URL}/health`);
 
@@ -0,0 +1,80 @@
+import { existsSync, readFileSync } from 'node:fs';
+import { join } from 'node:path';
+
+// Written by the API's publisher: one JSON line per published post, newest last.
+// A refreshed post appends its slug again; it keeps the position of its first line
+const MANIFEST_PATH = join(process.cwd(), 'src', 'data', 'posts.jsonl');
+
+export const POSTS_PER_PAGE = 12;
+
+export interface ManifestPost {
+  slug: string;
+  title: string;
+  description?: string | null;
+  pubDate: string;
+  author?: string | null;
+  tags: string[];
+  hash?: string | null;
+}
+
+let cached: ManifestPost[] | null = null;
+
+/** All published posts, newest first, read once per build */
+export function getManifestPosts(): ManifestPost[] {
+  // The dev server re-reads so newly generated posts show up without a restart
+  if (cached && !import.meta.env.DEV) {
+    return cached;
+  }
+  if (!existsSync(MANIFEST_PATH)) {
+    return [];
+  }
+
+  const bySlug = new Map<string, ManifestPost>();
+  for (const line of readFileSync(MANIFEST_PATH, 'utf-8').split('\n')) {
+    if (!line.trim()) continue;
+    try {
+      const post = JSON.parse(line) as ManifestPost;
+      // A later line updates the post in place (Map keeps first insertion order)
+      bySlug.set(post.slug, { ...post, tags: post.tags ?? [] });
+    } catch {
+      // Torn last line from an interrupted append
+    }
+  }
+
+  // Lines are appended in publish order, so no sort is needed
+  cached = [...bySlug.values()].reverse();
+  return cached;
+}
+
+export interface TagGroup {
+  tag: string;
+  slug: string;
+  posts: ManifestPost[];
+}
+
+/** Posts grouped by tag slug, each group newest first */
+export function getTagGroups(): TagGroup[] {
+  const groups = new Map<string, TagGroup>();
+  for (const post of getManifestPosts()) {
+    for (const tag of post.tags) {
+      const slug = tagSlug(tag);
+      if (!slug) continue;
+      const group = groups.get(slug);
+      if (group) {
+        group.posts.push(post);
+      } else {
+        groups.set(slug, { tag, slug, posts: [post] });
+      }
+    }
+  }
+  return [...groups.values()];
+}
+
+export function tagSlug(tag: string): string {
+  return tag.toLowerCase().trim().replace(/\s+/g, '-').replace(/[^a-z0-9-]/g, '');
+}
+
+export function formatPubDate(pubDate: string): string {
+  const date = new Date(pubDate);
+  return `${date.toLocaleDateString()} ${date.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' })}`;
+}